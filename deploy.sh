@@ -162,6 +162,7 @@ deploy_application() {
     
     # Set up database
     print_warning "Setting up database..."
+    (cd $DEPLOY_PATH/$BACKEND_DIR && sudo -u $DEPLOY_USER FLASK_ENV=production $DEPLOY_PATH/$BACKEND_DIR/venv/bin/flask --app wsgi upgrade-db)
     sudo -u $DEPLOY_USER $DEPLOY_PATH/$BACKEND_DIR/venv/bin/python $DEPLOY_PATH/$BACKEND_DIR/src/database/seed_data.py
     
     print_success "Application deployed"
@@ -246,7 +247,7 @@ configure_supervisor() {
     # Create Supervisor configuration
     sudo tee /etc/supervisor/conf.d/$SERVICE_NAME.conf > /dev/null <<EOF
 [program:$SERVICE_NAME]
-command=$DEPLOY_PATH/$BACKEND_DIR/venv/bin/python $DEPLOY_PATH/$BACKEND_DIR/src/main.py
+command=$DEPLOY_PATH/$BACKEND_DIR/venv/bin/gunicorn -c $DEPLOY_PATH/$BACKEND_DIR/gunicorn.conf.py wsgi:app
 directory=$DEPLOY_PATH/$BACKEND_DIR
 user=$DEPLOY_USER
 autostart=true
@@ -0,0 +1,454 @@
+#!/usr/bin/env python3
+"""
+API benchmark suite.
+
+Generates seeded SQLite datasets at several scales (1k/10k/100k students by
+default) with src/database/seed_data.py, then for each scale:
+
+- drives every route in src/routes/students.py and src/routes/user.py
+  through the Flask test client, one request at a time, and
+- serves the app from a multi-threaded WSGI server and hits it with a mix
+  of reads and writes from concurrent client threads.
+
+Each scale runs in a fresh process against a copy of its dataset, so writes
+never leak between runs and peak RSS belongs to that scale alone (the load
+threads share the process with the server). Results are written as JSON
+for regression tracking; a summary goes to stderr. Generated datasets are
+kept in --data-dir and reused while the seed arguments match.
+
+Usage: python benchmarks/bench_api.py [--scales 1,10,100] [--days 30] [--requests 50]
+                                      [--concurrency 8] [--duration 10] [--output results.json]
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import resource
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from multiprocessing import get_context
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+SEED_SCRIPT = os.path.join(ROOT, 'src', 'database', 'seed_data.py')
+PERCENTILES = (50, 95, 99)
+ROSTER_ROWS = 100
+ATTENDANCE_BATCH = 100
+
+# Relative weights of the requests the concurrent load mixes together
+LOAD_MIX = {
+    'students_page': 10,
+    'student_detail': 10,
+    'student_profile': 5,
+    'students_search': 5,
+    'attendance_by_student': 5,
+    'progress_by_student': 5,
+    'dashboard': 5,
+    'attendance_trends': 2,
+    'fee_report': 2,
+    'users_list': 2,
+    'update_student': 3,
+    'mark_attendance': 1,
+}
+
+
+def percentile(ordered, p):
+    """Nearest-rank percentile of an already sorted list"""
+    if not ordered:
+        return None
+    rank = max(1, min(len(ordered), round(p / 100 * len(ordered) + 0.5)))
+    return ordered[rank - 1]
+
+
+def summarize(latencies, errors, elapsed):
+    """Latency percentiles in ms and throughput for one set of requests"""
+    ordered = sorted(latencies)
+    summary = {'requests': len(ordered), 'errors': errors}
+    for p in PERCENTILES:
+        value = percentile(ordered, p)
+        summary[f'p{p}_ms'] = round(value * 1000, 3) if value is not None else None
+    summary['mean_ms'] = round(sum(ordered) / len(ordered) * 1000, 3) if ordered else None
+    summary['throughput_rps'] = round(len(ordered) / elapsed, 1) if elapsed else None
+    return summary
+
+
+def peak_rss_mb():
+    # ru_maxrss is kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def dataset_path(data_dir, scale, days, seed):
+    return os.path.join(data_dir, f'students-{scale}k-days-{days}-seed-{seed}.db')
+
+
+def ensure_dataset(data_dir, scale, days, seed):
+    """Seed the dataset for a scale unless an identical one is already on disk"""
+    path = dataset_path(data_dir, scale, days, seed)
+    if os.path.exists(path):
+        return path
+    os.makedirs(data_dir, exist_ok=True)
+    partial = path + '.partial'
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(partial + suffix):
+            os.remove(partial + suffix)
+    print(f'Seeding {scale}k students, {days} days of attendance...', file=sys.stderr)
+    start = time.perf_counter()
+    subprocess.run(
+        [sys.executable, SEED_SCRIPT, '--scale', str(scale), '--days', str(days), '--seed', str(seed),
+         '--database', partial],
+        cwd=ROOT, check=True, stdout=subprocess.DEVNULL
+    )
+    # Fold the WAL back in so the dataset is a single file that copies cleanly
+    connection = sqlite3.connect(partial)
+    connection.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+    connection.execute('PRAGMA journal_mode=DELETE')
+    connection.close()
+    os.replace(partial, path)
+    print(f'  seeded in {time.perf_counter() - start:.1f} s', file=sys.stderr)
+    return path
+
+
+class Workload:
+    """Request factories for every benchmarked route, fed with ids from the dataset"""
+
+    def __init__(self, connection, seed):
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.counter = 0
+        self.student_ids = [row[0] for row in connection.execute('SELECT id FROM students ORDER BY id')]
+        self.user_ids = [
+            row[0] for row in connection.execute("SELECT id FROM users WHERE username NOT LIKE 'bench-delete-%' ORDER BY id")
+        ]
+        self.names = [row[0] for row in connection.execute('SELECT english_name FROM students LIMIT 1000')]
+        self.dates = [
+            date.fromisoformat(row[0][:10]) for row in connection.execute(
+                'SELECT DISTINCT date FROM attendance_records ORDER BY date DESC LIMIT 60'
+            )
+        ] or [date.today()]
+        # Benchmark writes land on days with no seeded attendance
+        self.next_day = max(self.dates) + timedelta(days=1)
+        self.created_students = []
+        self.created_users = []
+
+    def next_number(self):
+        with self.lock:
+            self.counter += 1
+            return self.counter
+
+    def student(self):
+        return self.random.choice(self.student_ids)
+
+    def scenarios(self):
+        """name -> factory returning (method, path, body, content_type)"""
+        r = self.random
+        return {
+            # Reads
+            'students_page': lambda: ('GET', f'/api/students?limit=100&after_id={self.student()}', None, None),
+            'students_filtered': lambda: (
+                'GET', f"/api/students?class_level={r.choice(['Beginner', 'Intermediate', 'Advanced'])}"
+                       f"&year_group=Year%20{r.randint(1, 11)}&status=Active&limit=100", None, None
+            ),
+            'students_search': lambda: (
+                'GET', f"/api/students?search={r.choice(self.names).split()[0][:3].lower()}&limit=20", None, None
+            ),
+            'students_ndjson': lambda: ('GET', '/api/students?format=ndjson&status=Active&limit=1000', None, None),
+            'student_detail': lambda: ('GET', f'/api/students/{self.student()}', None, None),
+            'student_profile': lambda: ('GET', f'/api/students/{self.student()}/profile', None, None),
+            'student_profiles_batch': lambda: (
+                'GET', '/api/students/profile?ids=' + ','.join(str(self.student()) for _ in range(10)), None, None
+            ),
+            'attendance_by_date': lambda: ('GET', f'/api/attendance?date={r.choice(self.dates).isoformat()}', None, None),
+            'attendance_by_student': lambda: ('GET', f'/api/attendance?student_id={self.student()}', None, None),
+            'progress_by_student': lambda: ('GET', f'/api/progress?student_id={self.student()}', None, None),
+            'progress_by_subject': lambda: (
+                'GET', f'/api/progress?student_id={self.student()}&subject=Quran', None, None
+            ),
+            'dashboard': lambda: ('GET', '/api/analytics/dashboard', None, None),
+            'attendance_trends': lambda: (
+                'GET', f"/api/analytics/attendance?granularity={r.choice(['day', 'week', 'month'])}&group_by=class_level",
+                None, None
+            ),
+            'fee_report': lambda: ('GET', '/api/analytics/fees', None, None),
+            'users_list': lambda: ('GET', '/api/users', None, None),
+            'user_detail': lambda: ('GET', f'/api/users/{r.choice(self.user_ids)}', None, None),
+            # Writes
+            'create_student': self.create_student,
+            'update_student': lambda: (
+                'PUT', f'/api/students/{self.student()}', {'phone': f'+44 7700 {r.randint(0, 999999):06d}'}, None
+            ),
+            'import_roster': self.import_roster,
+            'mark_attendance': self.mark_attendance,
+            'record_progress': lambda: (
+                'POST', '/api/progress',
+                {'student_id': self.student(), 'subject': 'Quran', 'progress_percentage': r.randint(0, 100)}, None
+            ),
+            'create_user': self.create_user,
+            'update_user': lambda: ('PUT', f'/api/users/{r.choice(self.user_ids)}', {}, None),
+            'delete_student': lambda: ('DELETE', f'/api/students/{self.created_students.pop()}', None, None),
+            'delete_user': lambda: ('DELETE', f'/api/users/{self.created_users.pop()}', None, None),
+        }
+
+    def create_student(self):
+        number = self.next_number()
+        return 'POST', '/api/students', {
+            'student_id': f'BENCH{number:07d}', 'english_name': f'Bench Student {number}', 'class_level': 'Beginner'
+        }, None
+
+    def import_roster(self):
+        number = self.next_number()
+        lines = ['student_id,english_name,class_level,year_group']
+        lines += [f'IMP{number:05d}{i:04d},Imported Student {i},Beginner,Year 1' for i in range(ROSTER_ROWS)]
+        return 'POST', '/api/students/import', ('\n'.join(lines) + '\n').encode('utf-8'), 'text/csv'
+
+    def mark_attendance(self):
+        with self.lock:
+            day = self.next_day
+            self.next_day += timedelta(days=1)
+        students = self.random.sample(self.student_ids, min(ATTENDANCE_BATCH, len(self.student_ids)))
+        return 'POST', '/api/attendance', {
+            'date': day.isoformat(),
+            'marked_by': 'Benchmark',
+            'records': [{'student_id': student_id, 'status': 'Present'} for student_id in students]
+        }, None
+
+    def create_user(self):
+        number = self.next_number()
+        return 'POST', '/api/users', {
+            'username': f'bench{number}', 'email': f'bench{number}@example.com', 'password': 'x'
+        }, None
+
+
+def record_created(workload, scenario, status, payload):
+    """Remember what create requests made so the delete scenarios have targets"""
+    if status >= 400 or not isinstance(payload, dict):
+        return
+    if scenario == 'create_student':
+        workload.created_students.append(payload['data']['id'])
+    elif scenario == 'create_user':
+        workload.created_users.append(payload['id'])
+
+
+def run_test_client(app, workload, requests):
+    """Every scenario in turn, `requests` times each, through app.test_client()"""
+    client = app.test_client()
+    factories = workload.scenarios()
+    results = {}
+    for scenario, factory in factories.items():
+        if scenario in ('delete_student', 'delete_user'):
+            targets = workload.created_students if scenario == 'delete_student' else workload.created_users
+            count = min(requests, len(targets))
+        else:
+            count = requests
+        latencies = []
+        errors = 0
+        elapsed = 0.0
+        for _ in range(count):
+            method, path, body, content_type = factory()
+            start = time.perf_counter()
+            if isinstance(body, bytes):
+                response = client.open(path, method=method, data=body, content_type=content_type)
+            else:
+                response = client.open(path, method=method, json=body)
+            response.get_data()
+            duration = time.perf_counter() - start
+            latencies.append(duration)
+            elapsed += duration
+            errors += response.status_code >= 400
+            if scenario in ('create_student', 'create_user'):
+                record_created(workload, scenario, response.status_code, response.get_json(silent=True))
+        results[scenario] = summarize(latencies, errors, elapsed)
+    return results
+
+
+def start_server(app):
+    """Serve the app from a threaded WSGI server on a free port; returns (server, base_url)"""
+    from werkzeug.serving import make_server
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_port}'
+
+
+def send(base_url, method, path, body, content_type):
+    """One HTTP request; returns the status code"""
+    if body is not None and not isinstance(body, bytes):
+        body, content_type = json.dumps(body).encode('utf-8'), 'application/json'
+    request = urllib.request.Request(base_url + path, data=body, method=method)
+    if content_type:
+        request.add_header('Content-Type', content_type)
+    try:
+        with urllib.request.urlopen(request, timeout=60) as response:
+            response.read()
+            return response.status
+    except urllib.error.HTTPError as e:
+        e.read()
+        return e.code
+
+
+def run_server_load(app, workload, concurrency, duration):
+    """Weighted request mix from `concurrency` client threads for `duration` seconds"""
+    server, base_url = start_server(app)
+    factories = workload.scenarios()
+    names = list(LOAD_MIX)
+    weights = [LOAD_MIX[name] for name in names]
+    latencies = {name: [] for name in names}
+    errors = {name: 0 for name in names}
+    deadline = time.perf_counter() + duration
+
+    def client(seed):
+        chooser = random.Random(seed)
+        while time.perf_counter() < deadline:
+            scenario = chooser.choices(names, weights)[0]
+            method, path, body, content_type = factories[scenario]()
+            start = time.perf_counter()
+            status = send(base_url, method, path, body, content_type)
+            latencies[scenario].append(time.perf_counter() - start)
+            if status >= 400:
+                errors[scenario] += 1
+
+    try:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(client, range(concurrency)))
+        elapsed = time.perf_counter() - start
+    finally:
+        server.shutdown()
+
+    overall = summarize([value for values in latencies.values() for value in values], sum(errors.values()), elapsed)
+    overall.update({
+        'concurrency': concurrency,
+        'duration_s': round(elapsed, 2),
+        'scenarios': {name: summarize(latencies[name], errors[name], elapsed) for name in names if latencies[name]}
+    })
+    return overall
+
+
+def run_scale(dataset, scale, requests, concurrency, duration, seed):
+    """Benchmark one dataset in this (fresh) process"""
+    from src.config import get_config
+    from src.main import create_app
+    from src.models.user import db
+    from src.database.migrations import migrate
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database = os.path.join(tmp, 'bench.db')
+        shutil.copy(dataset, database)
+        connection = sqlite3.connect(database)
+        # POST /api/users cannot set a password, so delete_user gets rows made here
+        connection.executemany(
+            "INSERT INTO users (username, email, password, role, is_active) VALUES (?, ?, 'x', 'user', 1)",
+            [(f'bench-delete-{i}', f'bench-delete-{i}@example.com') for i in range(requests)]
+        )
+        connection.commit()
+        workload = Workload(connection, seed)
+        workload.created_users = [
+            row[0] for row in connection.execute("SELECT id FROM users WHERE username LIKE 'bench-delete-%'")
+        ]
+        counts = {
+            table: connection.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+            for table in ('students', 'attendance_records', 'progress_records', 'fee_records', 'users')
+        }
+        connection.close()
+
+        config = type('BenchmarkConfig', (get_config('production'),), {
+            'SQLALCHEMY_DATABASE_URI': f'sqlite:///{database}'
+        })
+        app = create_app(config)
+        # Failing requests are counted as errors; their tracebacks would drown the summary
+        app.logger.setLevel(logging.CRITICAL)
+        with app.app_context():
+            migrate()
+            db.session.remove()
+        rss_before = peak_rss_mb()
+
+        start = time.perf_counter()
+        test_client = run_test_client(app, workload, requests)
+        test_client_seconds = time.perf_counter() - start
+        rss_test_client = peak_rss_mb()
+        server = run_server_load(app, workload, concurrency, duration)
+
+        return {
+            'scale': f'{scale}k',
+            'rows': counts,
+            'dataset_mb': round(os.path.getsize(dataset) / (1024 * 1024), 1),
+            'test_client': {'requests_per_route': requests, 'seconds': round(test_client_seconds, 2), 'routes': test_client},
+            'server': server,
+            'peak_rss_mb': {'after_startup': rss_before, 'after_test_client': rss_test_client, 'after_server': peak_rss_mb()}
+        }
+
+
+def print_summary(result):
+    out = sys.stderr
+    print(f"\n{result['scale']} students ({result['rows']['students']} students, "
+          f"{result['rows']['attendance_records']} attendance rows)", file=out)
+    print(f"  {'route':<24} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'req/s':>9} {'errors':>7}", file=out)
+    for name, summary in result['test_client']['routes'].items():
+        if summary['requests']:
+            print(f"  {name:<24} {summary['p50_ms']:>9.2f} {summary['p95_ms']:>9.2f} {summary['p99_ms']:>9.2f} "
+                  f"{summary['throughput_rps']:>9.1f} {summary['errors']:>7}", file=out)
+    server = result['server']
+    if server['requests']:
+        print(f"  server, {server['concurrency']} clients: {server['throughput_rps']} req/s, p50 {server['p50_ms']} ms, "
+              f"p95 {server['p95_ms']} ms, p99 {server['p99_ms']} ms, {server['errors']} errors", file=out)
+    print(f"  peak RSS {result['peak_rss_mb']['after_server']} MB", file=out)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scales', default='1,10,100', help='comma-separated thousands of synthetic students')
+    parser.add_argument('--days', type=int, default=30, help='days of attendance history per dataset')
+    parser.add_argument('--requests', type=int, default=50, help='test client requests per route')
+    parser.add_argument('--concurrency', type=int, default=8, help='client threads against the WSGI server')
+    parser.add_argument('--duration', type=float, default=10, help='seconds of concurrent load per scale')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--data-dir', default=os.path.join(tempfile.gettempdir(), 'dugsi-bench'),
+                        help='where generated datasets are kept between runs')
+    parser.add_argument('--output', help='write the JSON results here instead of stdout')
+    args = parser.parse_args()
+
+    scales = [int(scale) for scale in args.scales.split(',') if scale.strip()]
+    results = {
+        'generated_at': datetime.utcnow().isoformat() + 'Z',
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'platform': platform.platform(),
+        'settings': {
+            'days': args.days, 'requests_per_route': args.requests, 'concurrency': args.concurrency,
+            'duration_s': args.duration, 'seed': args.seed
+        },
+        'scales': []
+    }
+    for scale in scales:
+        dataset = ensure_dataset(args.data_dir, scale, args.days, args.seed)
+        # A fresh interpreter per scale keeps peak RSS and caches independent
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context('spawn')) as pool:
+            result = pool.submit(run_scale, dataset, scale, args.requests, args.concurrency, args.duration, args.seed).result()
+        print_summary(result)
+        results['scales'].append(result)
+
+    document = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as output:
+            output.write(document + '\n')
+        print(f'\nResults written to {args.output}', file=sys.stderr)
+    else:
+        print(document)
+
+
+if __name__ == '__main__':
+    main()
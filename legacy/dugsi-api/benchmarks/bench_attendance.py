@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Benchmark for POST /api/attendance.
+
+Compares the set-based upsert in mark_attendance with the original per-row
+SELECT-then-INSERT/UPDATE loop, on a temporary SQLite database. The bulk path
+is driven through the Flask test client, so its timings also include request
+handling.
+
+Usage: python benchmarks/bench_attendance.py [--students 500] [--repeat 5]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from datetime import date, datetime, timedelta
+from sqlalchemy import event
+from src.config import Config
+from src.main import create_app as create_application
+from src.models.user import db
+from src.models.student import Student, AttendanceRecord
+from src.database.migrations import migrate
+
+
+def create_app(database_path):
+    """Application bound to a throwaway database"""
+    class BenchmarkConfig(Config):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{database_path}'
+    return create_application(BenchmarkConfig)
+
+
+def legacy_mark_attendance(data):
+    """The per-row loop mark_attendance used before the bulk upsert"""
+    attendance_date = datetime.strptime(data['date'], '%Y-%m-%d').date()
+    for record in data.get('records', []):
+        existing = AttendanceRecord.query.filter_by(
+            student_id=record['student_id'],
+            date=attendance_date
+        ).first()
+        if existing:
+            existing.status = record['status']
+            existing.notes = record.get('notes', '')
+            existing.marked_by = data.get('marked_by', 'System')
+        else:
+            db.session.add(AttendanceRecord(
+                student_id=record['student_id'],
+                date=attendance_date,
+                status=record['status'],
+                notes=record.get('notes', ''),
+                marked_by=data.get('marked_by', 'System')
+            ))
+    db.session.commit()
+
+
+def payload(student_ids, day, status):
+    return {
+        'date': day.isoformat(),
+        'marked_by': 'Benchmark',
+        'records': [{'student_id': student_id, 'status': status} for student_id in student_ids]
+    }
+
+
+def count_statements(engine):
+    counter = {'statements': 0}
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        counter['statements'] += 1
+
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    return counter
+
+
+def run(students, repeat):
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app(os.path.join(tmp, 'bench.db'))
+        with app.app_context():
+            migrate()
+            db.session.execute(Student.__table__.insert(), [
+                {'student_id': f'B{i:06d}', 'english_name': f'Student {i}'} for i in range(students)
+            ])
+            db.session.commit()
+            student_ids = [student_id for (student_id,) in db.session.query(Student.id)]
+            counter = count_statements(db.engine)
+
+            results = {}
+            client = app.test_client()
+            for label in ('legacy', 'bulk'):
+                timings = {'insert': [], 'update': []}
+                statements = {}
+                for i in range(repeat):
+                    # Separate dates per run so each round starts with an empty register
+                    day = date(2000, 1, 1) + timedelta(days=i + (0 if label == 'legacy' else 1000))
+                    for phase, status in (('insert', 'Present'), ('update', 'Absent')):
+                        counter['statements'] = 0
+                        start = time.perf_counter()
+                        if label == 'legacy':
+                            legacy_mark_attendance(payload(student_ids, day, status))
+                        else:
+                            response = client.post('/api/attendance', json=payload(student_ids, day, status))
+                            assert response.status_code == 200, response.get_json()
+                        timings[phase].append(time.perf_counter() - start)
+                        statements[phase] = counter['statements']
+                results[label] = {
+                    phase: {
+                        'best_ms': round(min(values) * 1000, 2),
+                        'statements': statements[phase]
+                    }
+                    for phase, values in timings.items()
+                }
+            return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--students', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    results = run(args.students, args.repeat)
+    print(f'Marking attendance for {args.students} students (best of {args.repeat})')
+    for label, phases in results.items():
+        for phase, result in phases.items():
+            print(f"  {label:<7} {phase:<7} {result['best_ms']:>9.2f} ms  {result['statements']:>6} statements")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Cold start benchmark.
+
+Starts fresh interpreters that import src.main and call create_app(), the
+work every gunicorn worker spawn or restart pays. Reports wall time per
+phase and, from `python -X importtime`, the slowest modules by cumulative
+import time.
+
+Usage: python benchmarks/bench_startup.py [--runs 5] [--top 15]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = '''
+import json, sys, time
+start = time.perf_counter()
+sys.path.insert(0, {root!r})
+from src.main import create_app
+imported = time.perf_counter()
+app = create_app('production')
+created = time.perf_counter()
+print(json.dumps({{'import_ms': (imported - start) * 1000, 'create_app_ms': (created - imported) * 1000}}))
+'''
+
+
+def run_probe(importtime=False):
+    command = [sys.executable]
+    if importtime:
+        command += ['-X', 'importtime']
+    command += ['-c', PROBE.format(root=ROOT)]
+    result = subprocess.run(command, capture_output=True, text=True, cwd=ROOT, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1]), result.stderr
+
+
+def parse_importtime(stderr):
+    """(module, cumulative microseconds) for every module in the importtime log"""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative_us, name = line.split('|')
+        modules.append((name.strip(), int(cumulative_us)))
+    return modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=15)
+    args = parser.parse_args()
+
+    timings = [run_probe()[0] for _ in range(args.runs)]
+    print(f'Cold start over {args.runs} runs (median)')
+    for phase in ('import_ms', 'create_app_ms'):
+        print(f'  {phase:<14} {statistics.median(t[phase] for t in timings):8.1f} ms')
+
+    _, stderr = run_probe(importtime=True)
+    modules = parse_importtime(stderr)
+    print('\nSlowest imports (cumulative, -X importtime)')
+    for name, cumulative_us in sorted(modules, key=lambda m: m[1], reverse=True)[:args.top]:
+        print(f'  {cumulative_us / 1000:8.1f} ms  {name}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,25 @@
+"""
+Gunicorn settings for the API (gunicorn -c gunicorn.conf.py wsgi:app).
+
+Threads share one SQLite connection pool per worker; with WAL enabled,
+reads proceed while a write is in progress and writers queue on
+busy_timeout rather than failing with "database is locked".
+"""
+
+import multiprocessing
+import os
+
+bind = os.environ.get('BIND', '0.0.0.0:4545')
+workers = int(os.environ.get('WEB_CONCURRENCY', min(multiprocessing.cpu_count(), 4)))
+worker_class = 'gthread'
+threads = int(os.environ.get('THREADS', 8))
+timeout = 60
+graceful_timeout = 30
+keepalive = 5
+# Recycle workers occasionally to bound memory growth
+max_requests = 5000
+max_requests_jitter = 500
+accesslog = '-'
+# Import and build the app once in the master, then fork workers from it.
+# Safe because create_app() opens no database connections.
+preload_app = True
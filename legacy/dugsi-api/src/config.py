@@ -0,0 +1,132 @@
+"""
+Application configuration profiles.
+
+Select one with create_app('production') or the FLASK_ENV environment
+variable (the supervisor unit in deploy.sh sets FLASK_ENV=production).
+DATABASE_URL selects the database; see src/database/backends.py.
+"""
+
+import os
+
+DATABASE_PATH = os.path.join(os.path.dirname(__file__), 'database', 'app.db')
+
+
+def database_url():
+    """DATABASE_URL, or the bundled SQLite file when it is unset"""
+    url = os.environ.get('DATABASE_URL')
+    if not url:
+        return f"sqlite:///{DATABASE_PATH}"
+    # Heroku-style URLs use the scheme SQLAlchemy dropped in 1.4
+    if url.startswith('postgres://'):
+        url = 'postgresql://' + url[len('postgres://'):]
+    return url
+
+
+class Config:
+    SECRET_KEY = os.environ.get('SECRET_KEY', 'madrasah-management-secret-key-2025')
+    DEBUG = False
+    
+    SQLALCHEMY_DATABASE_URI = database_url()
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # The default engine serves writes; SQLite admits one writer at a time, so a
+    # small pool queues mutations here instead of in busy_timeout retries
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_size': 2,
+        'max_overflow': 1,
+        'pool_timeout': 30,
+        # sqlite3's own busy wait, in seconds; matches busy_timeout below
+        'connect_args': {'timeout': 5},
+    }
+    
+    # Used instead of the SQLite options above when DATABASE_URL is PostgreSQL. Every
+    # worker holds up to pool_size + max_overflow connections, so nodes x workers x
+    # that must stay under the server's max_connections
+    POSTGRES_ENGINE_OPTIONS = {
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 5)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 5)),
+        'pool_timeout': 30,
+        'pool_pre_ping': True,     # drop connections the server or a proxy closed
+        'pool_recycle': 1800,
+    }
+    
+    # GET requests read through a read-only engine with its own pool (src/database/routing.py)
+    READ_ENGINE_ENABLED = True
+    READ_ENGINE_OPTIONS = {
+        'pool_size': 5,
+        'max_overflow': 5,
+        'pool_timeout': 30,
+        'connect_args': {'timeout': 5},
+    }
+    
+    # Applied to every new SQLite connection, in this order
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',       # readers never block behind the writer
+        'synchronous': 'NORMAL',     # durable at checkpoints; safe with WAL
+        'busy_timeout': 5000,        # wait for the write lock instead of failing
+        'cache_size': -64000,        # 64 MB page cache per connection
+        'mmap_size': 268435456,      # 256 MB memory-mapped reads
+        'temp_store': 'MEMORY',
+    }
+    
+    # Background jobs (src/services/jobs.py). Web workers run them in-process unless
+    # JOBS_RUN_IN_PROCESS is off and `flask run-jobs` runs them instead
+    JOBS_RUN_IN_PROCESS = os.environ.get('JOBS_RUN_IN_PROCESS', 'true').lower() in ('1', 'true')
+    JOBS_INLINE = False          # run each job inside submit(), for scripts and checks
+    JOB_WORKERS = 1              # threads per runner; SQLite admits one writer anyway
+    JOB_POLL_SECONDS = 5         # how soon a job queued by another process is noticed
+    JOB_MAX_ATTEMPTS = 3
+    JOB_RETRY_SECONDS = 10       # doubled after each failed attempt
+    JOB_LOCK_TIMEOUT_SECONDS = 1800   # a job running this long is assumed abandoned
+    JOB_SWEEP_SECONDS = 60
+    JOB_RETENTION_DAYS = 7
+    
+    # Query counts, Server-Timing and /metrics (src/services/instrumentation.py); off unless asked for
+    INSTRUMENTATION_ENABLED = os.environ.get('INSTRUMENTATION_ENABLED', '').lower() in ('1', 'true')
+    N_PLUS_ONE_THRESHOLD = 10    # same statement with this many distinct parameter sets in one request is logged
+    SLOW_REQUEST_MS = 500
+    # Sampled requests are profiled into this directory when it is set
+    PROFILE_DIR = os.environ.get('PROFILE_DIR')
+    PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', 0))
+    # ?profile=1 profiles a request on demand; always honoured in debug mode, otherwise only when set
+    PROFILE_ON_REQUEST = os.environ.get('PROFILE_ON_REQUEST', '').lower() in ('1', 'true')
+    PROFILER = os.environ.get('PROFILER', 'cprofile')   # or 'pyinstrument', when installed
+
+
+class DevelopmentConfig(Config):
+    DEBUG = True
+
+
+class ProductionConfig(Config):
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_size': 2,
+        'max_overflow': 2,
+        'pool_timeout': 30,
+        'connect_args': {'timeout': 15},
+    }
+    READ_ENGINE_OPTIONS = {
+        # Each worker keeps a warm read pool sized for its request threads
+        'pool_size': 8,
+        'max_overflow': 8,
+        'pool_timeout': 30,
+        'connect_args': {'timeout': 15},
+    }
+    # Sized for the gthread worker's request threads
+    POSTGRES_ENGINE_OPTIONS = dict(
+        Config.POSTGRES_ENGINE_OPTIONS,
+        pool_size=int(os.environ.get('DB_POOL_SIZE', 8)),
+        max_overflow=int(os.environ.get('DB_MAX_OVERFLOW', 4))
+    )
+    SQLITE_PRAGMAS = dict(Config.SQLITE_PRAGMAS, busy_timeout=15000)
+
+
+CONFIGS = {
+    'development': DevelopmentConfig,
+    'production': ProductionConfig,
+}
+
+
+def get_config(name=None):
+    """Resolve a config name (or FLASK_ENV) to a config class"""
+    if name is None or isinstance(name, str):
+        return CONFIGS[name or os.environ.get('FLASK_ENV', 'development')]
+    return name
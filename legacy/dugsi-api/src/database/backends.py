@@ -0,0 +1,28 @@
+"""
+Database backend selection.
+
+SQLALCHEMY_DATABASE_URI (from DATABASE_URL) decides the backend. SQLite,
+the default, keeps the database in one file on one host: connections get
+the SQLITE_PRAGMAS profile and GET requests read through the read-only
+engine. PostgreSQL (postgresql://..., with psycopg2 installed) lets several
+app nodes share one database; its engines use POSTGRES_ENGINE_OPTIONS.
+Upserts are built for the connection's dialect by src.database.bulk, and
+the FTS5 student search falls back to substring matching off SQLite.
+"""
+
+from sqlalchemy.engine import make_url
+
+SUPPORTED_BACKENDS = ('sqlite', 'postgresql')
+
+
+def backend_name(url):
+    return make_url(url).get_backend_name()
+
+
+def configure_backend(app):
+    """Pick the engine options for the configured backend; call before db.init_app"""
+    backend = backend_name(app.config['SQLALCHEMY_DATABASE_URI'])
+    if backend not in SUPPORTED_BACKENDS:
+        raise ValueError(f"Unsupported database backend '{backend}'; expected one of {', '.join(SUPPORTED_BACKENDS)}")
+    if backend == 'postgresql':
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = app.config['POSTGRES_ENGINE_OPTIONS']
@@ -0,0 +1,39 @@
+"""
+Set-based write helpers shared by routes and seeding scripts
+
+SQLite and PostgreSQL spell INSERT ... ON CONFLICT the same way but
+SQLAlchemy builds it from a dialect-specific insert(), so the statement
+builders take the dialect of the connection they will run on.
+"""
+
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+DIALECT_INSERTS = {
+    'sqlite': sqlite_insert,
+    'postgresql': postgresql_insert,
+}
+
+
+def insert_for(dialect, table):
+    """An INSERT supporting on_conflict_do_update() for the given dialect"""
+    if dialect.name not in DIALECT_INSERTS:
+        raise NotImplementedError(f'Upserts are not supported on {dialect.name}')
+    return DIALECT_INSERTS[dialect.name](table)
+
+
+def upsert_statement(dialect, table, index_elements, update_columns):
+    """Build an INSERT ... ON CONFLICT DO UPDATE statement for executemany use"""
+    stmt = insert_for(dialect, table)
+    return stmt.on_conflict_do_update(
+        index_elements=index_elements,
+        set_={column: stmt.excluded[column] for column in update_columns}
+    )
+
+
+def increment_statement(dialect, table, index_elements, counter_columns, replace_columns=()):
+    """Build an INSERT ... ON CONFLICT DO UPDATE that adds to existing counters"""
+    stmt = insert_for(dialect, table)
+    set_ = {column: table.c[column] + stmt.excluded[column] for column in counter_columns}
+    set_.update({column: stmt.excluded[column] for column in replace_columns})
+    return stmt.on_conflict_do_update(index_elements=index_elements, set_=set_)
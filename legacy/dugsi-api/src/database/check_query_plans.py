@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Query plan check for the API routes.
+
+Drives every route through the Flask test client against a throwaway
+database, captures each SQL statement the routes run and prints
+EXPLAIN QUERY PLAN for it. Exits non-zero if a filtered statement falls
+back to a full table scan, so a missing index fails CI instead of showing
+up as a slow endpoint once history accumulates.
+"""
+
+import os
+import re
+import sys
+import tempfile
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from datetime import date
+from sqlalchemy import event
+from src.config import Config
+from src.main import create_app as create_application
+from src.models.user import db, User
+from src.models.student import Student, ProgressRecord, FeeRecord
+from src.models.communication import Message
+from src.database.migrations import migrate
+
+TODAY = date.today().isoformat()
+
+# (method, url, body, expected) for every route, with each filter exercised; bytes bodies are posted
+# as CSV. expected maps dotted paths into the decoded response (JSON, NDJSON documents or CSV rows)
+# to the values route_matrix requires on every backend, given seed() and the requests before it
+ROUTE_REQUESTS = [
+    ('GET', '/api/users', None, {'0.username': 'plan'}),
+    ('GET', '/api/users/1', None, {'email': 'plan@example.com'}),
+    ('PUT', '/api/users/1', {'email': 'plan.check@example.com'}, {'email': 'plan.check@example.com'}),
+    ('GET', '/api/students', None, {'count': 1, 'data.0.student_id': 'PLAN1', 'data.0.outstanding_fees': 100.0}),
+    ('GET', '/api/students?limit=50&after_id=1', None, {'count': 0, 'next_after_id': None}),
+    ('GET', '/api/students?class_level=Beginner', None, {'count': 1, 'data.0.class_level': 'Beginner'}),
+    ('GET', '/api/students?year_group=Year 5', None, {'count': 1, 'data.0.year_group': 'Year 5'}),
+    ('GET', '/api/students?status=Active', None, {'count': 1, 'data.0.status': 'Active'}),
+    ('GET', '/api/students?class_level=Beginner&year_group=Year 5&status=Active&limit=50&after_id=1', None, {'count': 0}),
+    ('GET', '/api/students?search=plan', None, {'count': 1, 'data.0.student_id': 'PLAN1'}),
+    ('GET', '/api/students?format=ndjson&status=Active', None, {'0.student_id': 'PLAN1'}),
+    ('POST', '/api/students', {'student_id': 'PLAN2', 'english_name': 'Plan Two'}, {'data.student_id': 'PLAN2'}),
+    ('POST', '/api/students/import', b'student_id,english_name,class_level\nPLAN1,Plan One,Beginner\nPLAN3,Plan Three,Beginner\n',
+     {'data.created': 1, 'data.updated': 1, 'data.failed': 0}),
+    ('GET', '/api/students/1', None, {'data.student_id': 'PLAN1', 'data.outstanding_fees': 100.0}),
+    ('GET', '/api/students/1/profile', None, {'data.student_id': 'PLAN1', 'data.progress.0.subject': 'Quran'}),
+    ('GET', '/api/students/profile?ids=1,2&days=30', None, {'data.0.student_id': 'PLAN1', 'data.1.student_id': 'PLAN2'}),
+    ('PUT', '/api/students/1', {'status': 'Active', 'english_name': 'Plan One'}, {'data.english_name': 'Plan One'}),
+    ('GET', '/api/attendance', None, {'count': 0}),
+    ('GET', f'/api/attendance?date={TODAY}', None, {'count': 0}),
+    ('GET', '/api/attendance?student_id=1', None, {'count': 0}),
+    ('GET', f'/api/attendance?date={TODAY}&student_id=1', None, {'count': 0}),
+    ('POST', '/api/attendance', {'date': TODAY, 'records': [{'student_id': 1, 'status': 'Present'}]},
+     {'created': 1, 'updated': 0}),
+    ('GET', '/api/progress', None, {'count': 1, 'data.0.subject': 'Quran'}),
+    ('GET', '/api/progress?student_id=1', None, {'count': 1, 'data.0.student_id': 1}),
+    ('GET', '/api/progress?subject=Quran', None, {'count': 1, 'data.0.subject': 'Quran'}),
+    ('GET', '/api/progress?student_id=1&subject=Quran', None, {'count': 1}),
+    ('POST', '/api/progress', {'student_id': 1, 'subject': 'Quran', 'progress_percentage': 50},
+     {'data.progress_percentage': 50.0}),
+    ('GET', '/api/analytics/dashboard', None, {'data': {
+        'total_students': 3, 'active_students': 3, 'present_today': 1, 'attendance_rate': 100.0, 'total_outstanding_fees': 100.0
+    }}),
+    ('GET', '/api/analytics/attendance', None, {'count': 1, 'data.0.present': 1, 'data.0.attendance_rate': 100.0}),
+    ('POST', '/api/fees/payments/batch', {'payments': [
+        {'fee_record_id': 1, 'amount': 40, 'reference': 'PLAN-1'},
+        {'fee_record_id': 1, 'amount': 10, 'reference': 'PLAN-2'}
+    ]}, {'data.applied': 2, 'data.amount_applied': 50.0, 'data.statuses': {'Pending': 1}}),
+    ('POST', '/api/fees/payments/batch', {'payments': [{'fee_record_id': 1, 'amount': 40, 'reference': 'PLAN-1'}]},
+     {'data.applied': 0, 'data.duplicates': ['PLAN-1']}),
+    ('GET', '/api/analytics/fees', None, {
+        'data.totals': {'records': 1, 'open_records': 1, 'billed': 100.0, 'paid': 50.0, 'outstanding': 50.0},
+        'data.aging.0': {'bucket': 'current', 'open_records': 1, 'outstanding': 50.0}
+    }),
+    ('GET', f'/api/analytics/fees?as_of={TODAY}', None, {'data.as_of': TODAY, 'data.totals.outstanding': 50.0}),
+    ('GET', f'/api/analytics/attendance?from={TODAY}&to={TODAY}&granularity=week&group_by=class_level,year_group', None,
+     {'count': 1, 'data.0.class_level': 'Beginner', 'data.0.year_group': 'Year 5', 'data.0.marked': 1}),
+    ('GET', '/api/export/attendance_records.csv', None, {'0.3': 'status', '1.3': 'Present'}),
+    ('GET', f'/api/export/attendance_records.csv?from={TODAY}&to={TODAY}', None, {'1.2': TODAY}),
+    ('GET', f'/api/export/progress_records.csv.gz?from={TODAY}', None, {'0.2': 'subject', '2.2': 'Quran'}),
+    ('GET', f'/api/export/fee_records.csv?to={TODAY}', None, {'0.8': 'status', '1.8': 'Pending'}),
+    ('GET', '/api/export/fee_records.csv?student_id=1', None, {'1.1': '1'}),
+    ('POST', '/api/announcements', {'title': 'Plan', 'content': 'Plan check', 'author_id': 1}, {'data.status': 'draft'}),
+    ('POST', '/api/announcements', {
+        'title': 'Class', 'content': 'Plan check', 'author_id': 1, 'target_audience': 'specific_class',
+        'target_class_level': 'Beginner', 'publish': True
+    }, {'data.status': 'published', 'data.target_class_level': 'Beginner'}),
+    ('POST', '/api/announcements/1/publish', None, {'data.status': 'published'}),
+    ('GET', '/api/announcements', None, {'count': 2, 'data.0.title': 'Class'}),
+    ('GET', '/api/announcements?status=published', None, {'count': 2}),
+    ('GET', '/api/announcements/1', None, {'data.title': 'Plan', 'data.status': 'published'}),
+    ('GET', '/api/users/1/unread-count', None, {'data': {'notifications': 1, 'messages': 1, 'total': 2}}),
+    ('GET', '/api/users/1/notifications', None, {'count': 1, 'data.0.related_id': 1, 'next_before_id': None}),
+    ('GET', '/api/users/1/notifications?unread=true&before_id=100&limit=10', None, {'count': 1}),
+    ('GET', '/api/users/1/messages', None, {'count': 1, 'data.0.subject': 'Plan'}),
+    ('GET', '/api/users/1/messages?unread=true&before_id=100', None, {'count': 1}),
+    ('POST', '/api/notifications/1/read', None, {'data.is_read': True}),
+    ('POST', '/api/messages/1/read', None, {'data.status': 'read'}),
+    ('POST', '/api/users/1/notifications/read-all', {'up_to_id': 100}, {'data.marked_read': 0}),
+    ('POST', '/api/users/1/notifications/read-all', None, {'data.marked_read': 0}),
+    ('POST', '/api/students/import?async=1', b'student_id,english_name\nPLAN4,Plan Four\n',
+     {'data.status': 'succeeded', 'data.result.created': 1}),
+    ('POST', '/api/jobs', {'name': 'rollups.recompute'}, {'data.status': 'succeeded', 'data.result': 0}),
+    ('POST', '/api/jobs', {'name': 'fee_ledger.mark_overdue'}, {'data.status': 'succeeded', 'data.result': 0}),
+    ('GET', '/api/jobs', None, {'count': 5, 'data.0.name': 'fee_ledger.mark_overdue'}),
+    ('GET', '/api/jobs?status=succeeded&limit=10', None, {'count': 5}),
+    ('GET', '/api/jobs/1', None, {'data.name': 'announcements.fan_out', 'data.status': 'succeeded'}),
+    ('DELETE', '/api/students/2', None, {'success': True}),
+]
+
+FULL_SCAN = re.compile(r'\bSCAN (\w+)\b(?! USING| VIRTUAL TABLE)')
+CHECKED_STATEMENTS = ('SELECT', 'UPDATE', 'DELETE')
+
+
+def create_app(database_path):
+    """Application bound to a throwaway database"""
+    class BenchmarkConfig(Config):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{database_path}'
+        # Jobs run in the request so their statements are captured too
+        JOBS_INLINE = True
+    return create_application(BenchmarkConfig)
+
+
+def seed(session):
+    """Just enough rows for every route to reach its queries"""
+    session.add(User(username='plan', email='plan@example.com', password='x', role='admin'))
+    session.add(Student(student_id='PLAN1', english_name='Plan One', class_level='Beginner', year_group='Year 5'))
+    session.flush()
+    session.add(ProgressRecord(student_id=1, subject='Quran'))
+    session.add(FeeRecord(student_id=1, fee_type='Tuition', amount=100, due_date=date.today()))
+    session.add(Message(sender_id=1, recipient_id=1, subject='Plan', content='Plan check'))
+    session.commit()
+
+
+def capture_statements(app):
+    """Run every route request and return the distinct statements it executed"""
+    statements = {}
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(CHECKED_STATEMENTS):
+            statements.setdefault(statement, parameters[0] if executemany else parameters)
+
+    client = app.test_client()
+    with app.app_context():
+        # GET requests run on the reader engine when it is enabled, so listen on every bind
+        for engine in db.engines.values():
+            event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            for method, url, body, _ in ROUTE_REQUESTS:
+                if isinstance(body, bytes):
+                    response = client.open(url, method=method, data=body, content_type='text/csv')
+                else:
+                    response = client.open(url, method=method, json=body)
+                response.get_data()
+                if response.status_code >= 400:
+                    raise RuntimeError(f'{method} {url} returned {response.status_code}: {response.get_data(as_text=True)}')
+        finally:
+            for engine in db.engines.values():
+                event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+    return statements
+
+
+def full_scans(plan, statement):
+    """Tables a filtered statement reads without an index"""
+    if ' WHERE ' not in ' '.join(statement.upper().split()):
+        # Unfiltered listings read the whole table by definition
+        return []
+    return [match.group(1) for line in plan for match in FULL_SCAN.finditer(line)]
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app(os.path.join(tmp, 'plans.db'))
+        with app.app_context():
+            migrate()
+            seed(db.session)
+
+        statements = capture_statements(app)
+        failures = 0
+        with app.app_context():
+            connection = db.session.connection()
+            for statement, parameters in statements.items():
+                plan = [row[-1] for row in connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters)]
+                scans = full_scans(plan, statement)
+                failures += bool(scans)
+                print('FULL SCAN ' + ', '.join(scans) if scans else 'ok')
+                print('  ' + ' '.join(statement.split()))
+                for line in plan:
+                    print(f'    {line}')
+
+        print(f'\n{len(statements)} statements checked, {failures} with full table scans')
+        return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,106 @@
+"""
+Schema creation and upgrades.
+
+Run explicitly with `flask --app wsgi upgrade-db` before starting workers;
+app startup never touches the schema. db.create_all() only creates missing
+tables, so nullable columns and indexes added to existing tables are
+created by upgrade().
+"""
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateColumn
+from src.models.user import db, User
+from src.models.student import Student, AttendanceRecord, ProgressRecord, FeeRecord, FeePayment
+from src.models.communication import Message, Announcement, Notification
+from src.models.stats import DashboardStat, TableVersion, AttendanceDailySummary, FeeLedgerSummary
+from src.models.job import Job
+from src.services.stats import rebuild
+from src.services.cache import bump
+from src.services.search import create_search_index
+from src.services import attendance_summary, fee_ledger, rollups
+
+
+def dedupe_attendance(connection):
+    """Keep the newest attendance record per (student_id, date)"""
+    connection.execute(text(
+        'DELETE FROM attendance_records WHERE id NOT IN '
+        '(SELECT MAX(id) FROM attendance_records GROUP BY student_id, date)'
+    ))
+
+
+def backfill_classes(connection, table, columns):
+    """Stamp records written before they carried a class with their student's current class; returns how many"""
+    students = Student.__table__
+    current = {
+        column: db.func.coalesce(
+            db.select(students.c[column]).where(students.c.id == table.c.student_id).scalar_subquery(), ''
+        )
+        for column in columns
+    }
+    return connection.execute(table.update().where(table.c[columns[0]].is_(None)).values(current)).rowcount
+
+
+def add_missing_columns(connection, existing_columns):
+    """ALTER TABLE ... ADD COLUMN for nullable model columns an existing table lacks"""
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing_columns:
+            continue
+        for column in table.columns:
+            if column.name not in existing_columns[table.name] and column.nullable:
+                definition = CreateColumn(column).compile(dialect=connection.dialect)
+                connection.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {definition}'))
+
+
+def upgrade(engine):
+    """Create any columns and indexes declared on the models that the database is missing"""
+    existing = {
+        table: {index['name'] for index in inspect(engine).get_indexes(table)}
+        for table in inspect(engine).get_table_names()
+    }
+    existing_columns = {
+        table: {column['name'] for column in inspect(engine).get_columns(table)}
+        for table in inspect(engine).get_table_names()
+    }
+    with engine.begin() as connection:
+        add_missing_columns(connection, existing_columns)
+        if 'uq_attendance_student_date' not in existing.get('attendance_records', set()):
+            dedupe_attendance(connection)
+        for table in db.metadata.sorted_tables:
+            for index in table.indexes:
+                if index.name not in existing.get(table.name, set()):
+                    index.create(bind=connection, checkfirst=True)
+        if engine.dialect.name == 'sqlite':
+            create_search_index(connection)
+        # The summaries were keyed by each student's class at the time of every change; regroup them by the stamped class
+        if backfill_classes(connection, FeeRecord.__table__, ['class_level']):
+            fee_ledger.rebuild(connection)
+        if backfill_classes(connection, AttendanceRecord.__table__, ['class_level', 'year_group']):
+            attendance_summary.rebuild(connection)
+        # Seed the dashboard counters the first time they are needed
+        if not connection.execute(db.select(DashboardStat.name).limit(1)).first():
+            rebuild(connection)
+        if (not connection.execute(db.select(AttendanceDailySummary.date).limit(1)).first()
+                and connection.execute(db.select(AttendanceRecord.id).limit(1)).first()):
+            attendance_summary.rebuild(connection)
+        if (not connection.execute(db.select(FeeLedgerSummary.due_date).limit(1)).first()
+                and connection.execute(db.select(FeeRecord.id).limit(1)).first()):
+            fee_ledger.rebuild(connection)
+        # Rollups only follow writes made since they were maintained; bring every student up to date once
+        if rollups.stale(connection) and rollups.refresh(connection):
+            bump(connection, ['students'])
+
+
+def migrate():
+    """Create missing tables, then upgrade indexes and derived data"""
+    db.create_all()
+    upgrade(db.engine)
+
+
+@click.command('upgrade-db')
+@with_appcontext
+def upgrade_db_command():
+    """Create or upgrade the database schema."""
+    migrate()
+    click.echo('Database schema is up to date')
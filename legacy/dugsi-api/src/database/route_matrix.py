@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Run the route suite against each database backend.
+
+Every request in check_query_plans.ROUTE_REQUESTS is sent through the test
+client against a freshly migrated and seeded database, once per backend:
+
+- sqlite: a temporary database file
+- postgresql: the server at --postgres-url (an empty database the suite
+  may write to), or else a throwaway cluster made with initdb and started
+  with pg_ctl, listening only on a Unix socket in a temporary directory
+
+Any route answering 4xx/5xx, or whose response differs from the fields
+its entry expects, fails the run; the expectations are the same on every
+backend, so a dialect difference in results shows up as well as one in
+SQL. The postgresql leg needs
+psycopg2 and the server binaries (on PATH or in PG_BIN); initdb refuses
+to run as root. When they are missing the leg is skipped with a message,
+or fails with --require-postgres.
+
+Usage: python -m src.database.route_matrix [--backend sqlite] [--backend postgresql]
+                                           [--postgres-url URL] [--require-postgres]
+"""
+
+import argparse
+import csv
+import glob
+import gzip
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from contextlib import contextmanager
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from sqlalchemy import text
+from src.config import Config
+from src.main import create_app as create_application
+from src.models.user import db
+from src.database.migrations import migrate
+from src.database.check_query_plans import ROUTE_REQUESTS, seed
+
+BACKENDS = ('sqlite', 'postgresql')
+
+
+class BackendUnavailable(Exception):
+    pass
+
+
+def create_app(database_url):
+    """Application bound to a throwaway database"""
+    class MatrixConfig(Config):
+        SQLALCHEMY_DATABASE_URI = database_url
+        JOBS_INLINE = True
+    return create_application(MatrixConfig)
+
+
+def postgres_binaries():
+    """Directory holding initdb and pg_ctl"""
+    candidates = [os.environ.get('PG_BIN')]
+    if shutil.which('initdb'):
+        candidates.append(os.path.dirname(shutil.which('initdb')))
+    candidates += sorted(glob.glob('/usr/lib/postgresql/*/bin'), reverse=True)
+    for directory in filter(None, candidates):
+        if os.path.exists(os.path.join(directory, 'initdb')) and os.path.exists(os.path.join(directory, 'pg_ctl')):
+            return directory
+    raise BackendUnavailable('initdb/pg_ctl not found; install the PostgreSQL server or set PG_BIN')
+
+
+@contextmanager
+def temporary_cluster():
+    """Start a private PostgreSQL cluster; yields its SQLAlchemy URL and removes it afterwards"""
+    try:
+        import psycopg2  # noqa: F401
+    except ImportError:
+        raise BackendUnavailable('psycopg2 is not installed (pip install psycopg2-binary)')
+    binaries = postgres_binaries()
+    with tempfile.TemporaryDirectory(prefix='pg') as directory:
+        data = os.path.join(directory, 'data')
+        initdb = subprocess.run(
+            [os.path.join(binaries, 'initdb'), '-D', data, '-U', 'postgres', '-A', 'trust', '-E', 'UTF8', '--no-sync'],
+            capture_output=True, text=True
+        )
+        if initdb.returncode:
+            raise BackendUnavailable(f'initdb failed: {initdb.stderr.strip()}')
+        pg_ctl = os.path.join(binaries, 'pg_ctl')
+        subprocess.run([
+            pg_ctl, '-D', data, '-l', os.path.join(directory, 'server.log'), '-w',
+            '-o', f"-F -k {directory} -c listen_addresses=''", 'start'
+        ], check=True, stdout=subprocess.DEVNULL)
+        try:
+            yield f'postgresql+psycopg2://postgres@/postgres?host={directory}'
+        finally:
+            subprocess.run([pg_ctl, '-D', data, '-m', 'fast', '-w', 'stop'], stdout=subprocess.DEVNULL)
+
+
+@contextmanager
+def database(backend, postgres_url=None):
+    if backend == 'sqlite':
+        with tempfile.TemporaryDirectory() as directory:
+            yield f"sqlite:///{os.path.join(directory, 'routes.db')}"
+    elif postgres_url:
+        yield postgres_url
+    else:
+        with temporary_cluster() as url:
+            yield url
+
+
+def decode(response):
+    """The response body as data: parsed JSON, a list of NDJSON documents or a list of CSV rows"""
+    body = response.get_data()
+    if response.mimetype == 'application/gzip':
+        body = gzip.decompress(body)
+    if response.mimetype == 'application/x-ndjson':
+        return [json.loads(line) for line in body.splitlines()]
+    if response.mimetype in ('text/csv', 'application/gzip'):
+        return list(csv.reader(io.StringIO(body.decode('utf-8'))))
+    return json.loads(body)
+
+
+def mismatches(document, expected):
+    """Descriptions of each dotted path in expected whose value differs in document"""
+    found = []
+    for path, value in expected.items():
+        actual = document
+        try:
+            for key in path.split('.'):
+                actual = actual[int(key) if isinstance(actual, list) else key]
+        except (KeyError, IndexError, TypeError, ValueError):
+            found.append(f'{path} is missing')
+            continue
+        if actual != value:
+            found.append(f'{path} is {actual!r}, expected {value!r}')
+    return found
+
+
+def run_routes(database_url):
+    """Migrate, seed and send every route request; returns the failures"""
+    app = create_app(database_url)
+    with app.app_context():
+        migrate()
+        seed(db.session)
+        dialect = db.engine.dialect.name
+        version = db.session.execute(text(
+            'SELECT sqlite_version()' if dialect == 'sqlite' else 'SHOW server_version'
+        )).scalar()
+    print(f'  {dialect} {version}')
+
+    failures = []
+    client = app.test_client()
+    for method, url, body, expected in ROUTE_REQUESTS:
+        if isinstance(body, bytes):
+            response = client.open(url, method=method, data=body, content_type='text/csv')
+        else:
+            response = client.open(url, method=method, json=body)
+        response.get_data()
+        if response.status_code >= 400:
+            failures.append(f'{method} {url} returned {response.status_code}: {response.get_data(as_text=True)[:300]}')
+            continue
+        problems = mismatches(decode(response), expected)
+        if problems:
+            failures.append(f"{method} {url}: {'; '.join(problems)}")
+    with app.app_context():
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--backend', action='append', choices=BACKENDS, help='repeatable; default: all backends')
+    parser.add_argument('--postgres-url', default=os.environ.get('TEST_POSTGRES_URL'),
+                        help='use this PostgreSQL database instead of starting a temporary cluster')
+    parser.add_argument('--require-postgres', action='store_true', help='fail instead of skipping when PostgreSQL is unavailable')
+    args = parser.parse_args()
+
+    failed = False
+    for backend in args.backend or BACKENDS:
+        print(f'{backend}:')
+        try:
+            with database(backend, args.postgres_url) as url:
+                failures = run_routes(url)
+        except BackendUnavailable as e:
+            print(f'  skipped: {e}')
+            failed = failed or args.require_postgres
+            continue
+        for failure in failures:
+            print(f'  FAIL {failure}')
+        print(f'  {len(ROUTE_REQUESTS) - len(failures)} of {len(ROUTE_REQUESTS)} requests succeeded')
+        failed = failed or bool(failures)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""
+Read/write engine routing.
+
+When READ_ENGINE_ENABLED is set, a second engine is registered under the
+'reader' bind: the same SQLite file opened with mode=ro and the query_only
+pragma, with its own (larger) pool from READ_ENGINE_OPTIONS. RoutingSession
+sends statements made while handling GET/HEAD/OPTIONS requests to it, so
+analytics and list reads run on reader connections (which WAL lets proceed
+alongside a write) while the small default pool is left to mutations,
+background tasks and the CLI. Flushes and INSERT/UPDATE/DELETE statements
+always go to the writer; a read request that needs to write through
+session.connection() calls use_writer() first.
+"""
+
+import os
+
+from flask import has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy.engine import make_url
+
+READ_BIND = 'reader'
+READ_METHODS = {'GET', 'HEAD', 'OPTIONS'}
+# Pragmas a read-only connection can neither set nor needs
+WRITER_ONLY_PRAGMAS = {'journal_mode', 'synchronous'}
+
+
+class RoutingSession(Session):
+    """Session that reads through the 'reader' engine while serving read-only requests"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and self.reads_from_reader(clause):
+            return self._db.engines[READ_BIND]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def reads_from_reader(self, clause):
+        if READ_BIND not in self._db.engines or self._flushing or self.info.get('use_writer'):
+            return False
+        if clause is not None and getattr(clause, 'is_dml', False):
+            return False
+        return has_request_context() and request.method in READ_METHODS
+
+
+def use_writer(session):
+    """Route the rest of this session's work to the writer, e.g. for a write made during a GET"""
+    session.info['use_writer'] = True
+
+
+def read_only_url(url, instance_path):
+    """The mode=ro URI form of a file-backed SQLite URL, or None for anything else"""
+    url = make_url(url)
+    if url.get_backend_name() != 'sqlite' or url.database in (None, '', ':memory:') or url.query.get('uri'):
+        return None
+    # Flask-SQLAlchemy resolves relative SQLite paths against the instance folder; URI filenames it leaves alone
+    path = url.database if os.path.isabs(url.database) else os.path.join(instance_path, url.database)
+    return url.set(database=f'file:{path}', query=dict(url.query, mode='ro', uri='true'))
+
+
+def configure_read_engine(app):
+    """Register the 'reader' bind from READ_ENGINE_OPTIONS; call before db.init_app"""
+    if not app.config.get('READ_ENGINE_ENABLED'):
+        return
+    url = read_only_url(app.config['SQLALCHEMY_DATABASE_URI'], app.instance_path)
+    if url is None:
+        return
+    binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+    binds[READ_BIND] = dict(app.config['READ_ENGINE_OPTIONS'], url=url)
+    app.config['SQLALCHEMY_BINDS'] = binds
+
+
+def reader_pragmas(pragmas):
+    """The pragma profile for reader connections"""
+    pragmas = {name: value for name, value in pragmas.items() if name not in WRITER_ONLY_PRAGMAS}
+    pragmas['query_only'] = 1
+    return pragmas
@@ -2,17 +2,65 @@
 """
 Database seeding script for Madrasah Management Platform
 This script populates the database with sample data for testing and demonstration
+
+Rows are generated in memory, deduplicated against keys preloaded with one
+query per table, and written with executemany in chunked transactions.
+--scale adds synthetic students for load testing:
+
+    python src/database/seed_data.py --scale 100 --days 60   # 100k students, ~6M attendance rows
 """
 
+import argparse
 import os
+import random
 import sys
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 
 from datetime import datetime, date, timedelta
+from itertools import islice
 from src.models.user import db, User
 from src.models.student import Student, AttendanceRecord, ProgressRecord, FeeRecord
 from src.models.communication import Message, Announcement, Notification
-from src.main import app
+from src.config import get_config
+from src.main import create_app
+from src.database.migrations import migrate
+from src.services import stats, rollups, attendance_summary, fee_ledger
+from src.services.cache import touch
+
+CHUNK_SIZE = 10000
+SUBJECTS = ['Quran', 'Arabic', 'Aqeedah', 'Fiqh', 'Seerah', 'Hadith']
+FEE_TYPES = ['Tuition', 'Books', 'Activities', 'Transport']
+ATTENDANCE_STATUSES = ['Present', 'Late', 'Absent', 'Excused']
+ATTENDANCE_WEIGHTS = [85, 5, 7, 3]
+
+# (English, Arabic) name parts for synthetic students
+FIRST_NAMES = [
+    ('Fatima', 'فاطمة'), ('Omar', 'عمر'), ('Aisha', 'عائشة'), ('Ali', 'علي'), ('Maryam', 'مريم'),
+    ('Yusuf', 'يوسف'), ('Khadija', 'خديجة'), ('Ibrahim', 'إبراهيم'), ('Zainab', 'زينب'), ('Hamza', 'حمزة'),
+    ('Safiya', 'صفية'), ('Bilal', 'بلال'), ('Ruqayyah', 'رقية'), ('Idris', 'إدريس'), ('Hafsa', 'حفصة'),
+]
+FAMILY_NAMES = [
+    ('Hassan', 'حسن'), ('Ahmed', 'أحمد'), ('Siddique', 'الصديق'), ('Al-Rashid', 'الرشيد'), ('Mahmoud', 'محمود'),
+    ('Khan', 'خان'), ('Abdullah', 'عبدالله'), ('Osman', 'عثمان'), ('Farah', 'فرح'), ('Yusuf', 'يوسف'),
+]
+CLASS_LEVELS = ['Beginner', 'Intermediate', 'Advanced']
+
+
+def chunked(rows, size=CHUNK_SIZE):
+    """Split an iterable of rows into lists of at most size rows"""
+    rows = iter(rows)
+    while chunk := list(islice(rows, size)):
+        yield chunk
+
+
+def insert_chunked(table, rows):
+    """executemany rows into table, committing one chunk per transaction"""
+    total = 0
+    for chunk in chunked(rows):
+        db.session.execute(table.insert(), chunk)
+        db.session.commit()
+        total += len(chunk)
+    return total
 
 def seed_users():
     """Create sample users"""
@@ -59,11 +107,10 @@ def seed_users():
         }
     ]
     
+    existing = {username for (username,) in db.session.query(User.username)}
     for user_data in users:
-        existing_user = User.query.filter_by(username=user_data['username']).first()
-        if not existing_user:
-            user = User(**user_data)
-            db.session.add(user)
+        if user_data['username'] not in existing:
+            db.session.add(User(**user_data))
     
     db.session.commit()
     print("✓ Users seeded successfully")
@@ -173,109 +220,151 @@ def seed_students():
         }
     ]
     
+    existing = {student_id for (student_id,) in db.session.query(Student.student_id)}
     for student_data in students:
-        existing_student = Student.query.filter_by(student_id=student_data['student_id']).first()
-        if not existing_student:
-            student = Student(**student_data)
-            db.session.add(student)
+        if student_data['student_id'] not in existing:
+            db.session.add(Student(**student_data))
     
     db.session.commit()
     print("✓ Students seeded successfully")
 
-def seed_attendance():
-    """Create sample attendance records"""
-    students = Student.query.all()
+def synthetic_students(count):
+    """Generate count realistic student rows with unique student IDs"""
+    now = datetime.utcnow()
+    for n in range(1, count + 1):
+        first, first_ar = random.choice(FIRST_NAMES)
+        family, family_ar = random.choice(FAMILY_NAMES)
+        guardian, _ = random.choice(FIRST_NAMES)
+        year = random.randint(1, 11)
+        yield {
+            'student_id': f'SYN{n:07d}',
+            'english_name': f'{first} {family}',
+            'arabic_name': f'{first_ar} {family_ar}',
+            'date_of_birth': date(2020 - year, random.randint(1, 12), random.randint(1, 28)),
+            'gender': random.choice(['Male', 'Female']),
+            'class_level': CLASS_LEVELS[min((year - 1) // 4, 2)],
+            'year_group': f'Year {year}',
+            'enrollment_date': date.today() - timedelta(days=random.randint(0, 1500)),
+            'status': 'Active' if random.random() < 0.95 else 'Inactive',
+            'guardian_name': f'{guardian} {family}',
+            'guardian_phone': f'+44 7700 {random.randint(0, 999999):06d}',
+            'guardian_relationship': random.choice(['Father', 'Mother', 'Guardian']),
+            'quran_progress': 0.0,
+            'attendance_rate': 0.0,
+            'outstanding_fees': 0.0,
+            'created_at': now,
+            'updated_at': now
+        }
+
+def seed_synthetic_students(count):
+    """Bulk-load synthetic students for load testing"""
+    existing = {student_id for (student_id,) in db.session.query(Student.student_id)}
+    rows = (row for row in synthetic_students(count) if row['student_id'] not in existing)
+    inserted = insert_chunked(Student.__table__, rows)
+    print(f"✓ {inserted} synthetic students seeded successfully")
+
+def student_ids():
+    return [student_id for (student_id,) in db.session.query(Student.id).order_by(Student.id)]
+
+def seed_attendance(days=30):
+    """Create attendance records for the last `days` days"""
+    ids = student_ids()
+    start = date.today() - timedelta(days=days - 1)
+    existing = set(db.session.query(AttendanceRecord.student_id, AttendanceRecord.date).filter(
+        AttendanceRecord.date >= start
+    ))
+    classes = {
+        student_id: (class_level or '', year_group or '')
+        for student_id, class_level, year_group in db.session.query(Student.id, Student.class_level, Student.year_group)
+    }
+    now = datetime.utcnow()
     
-    # Create attendance for the last 30 days
-    for i in range(30):
-        attendance_date = date.today() - timedelta(days=i)
-        
-        for student in students:
-            # 90% chance of being present
-            import random
-            status_options = ['Present'] * 9 + ['Absent']
-            status = random.choice(status_options)
-            
-            existing_record = AttendanceRecord.query.filter_by(
-                student_id=student.id,
-                date=attendance_date
-            ).first()
-            
-            if not existing_record:
-                record = AttendanceRecord(
-                    student_id=student.id,
-                    date=attendance_date,
-                    status=status,
-                    notes='Family emergency' if status == 'Absent' else '',
-                    marked_by='System'
-                )
-                db.session.add(record)
+    def rows():
+        for i in range(days):
+            attendance_date = start + timedelta(days=i)
+            statuses = random.choices(ATTENDANCE_STATUSES, ATTENDANCE_WEIGHTS, k=len(ids))
+            for student_id, status in zip(ids, statuses):
+                if (student_id, attendance_date) in existing:
+                    continue
+                yield {
+                    'student_id': student_id,
+                    'date': attendance_date,
+                    'status': status,
+                    'class_level': classes[student_id][0],
+                    'year_group': classes[student_id][1],
+                    'notes': 'Family emergency' if status == 'Absent' else '',
+                    'marked_by': 'System',
+                    'created_at': now
+                }
     
-    db.session.commit()
-    print("✓ Attendance records seeded successfully")
+    inserted = insert_chunked(AttendanceRecord.__table__, rows())
+    print(f"✓ {inserted} attendance records seeded successfully")
 
 def seed_progress():
     """Create sample progress records"""
-    students = Student.query.all()
-    subjects = ['Quran', 'Arabic', 'Aqeedah', 'Fiqh', 'Seerah', 'Hadith']
+    existing = set(db.session.query(ProgressRecord.student_id, ProgressRecord.subject))
+    now = datetime.utcnow()
     
-    for student in students:
-        for subject in subjects:
-            existing_record = ProgressRecord.query.filter_by(
-                student_id=student.id,
-                subject=subject
-            ).first()
-            
-            if not existing_record:
-                import random
-                progress = ProgressRecord(
-                    student_id=student.id,
-                    subject=subject,
-                    progress_type='Assessment',
-                    current_level=f'{subject} Level {random.randint(1, 5)}',
-                    progress_percentage=random.uniform(60, 95),
-                    grade=random.choice(['A', 'B', 'C']),
-                    notes=f'Good progress in {subject}',
-                    assessed_by='Ustadh Muhammad',
-                    assessment_date=date.today() - timedelta(days=random.randint(1, 30))
-                )
-                db.session.add(progress)
+    def rows():
+        for student_id in student_ids():
+            for subject in SUBJECTS:
+                if (student_id, subject) in existing:
+                    continue
+                yield {
+                    'student_id': student_id,
+                    'subject': subject,
+                    'progress_type': 'Assessment',
+                    'current_level': f'{subject} Level {random.randint(1, 5)}',
+                    'progress_percentage': random.uniform(60, 95),
+                    'grade': random.choice(['A', 'B', 'C']),
+                    'notes': f'Good progress in {subject}',
+                    'assessed_by': 'Ustadh Muhammad',
+                    'assessment_date': date.today() - timedelta(days=random.randint(1, 30)),
+                    'created_at': now
+                }
     
-    db.session.commit()
-    print("✓ Progress records seeded successfully")
+    inserted = insert_chunked(ProgressRecord.__table__, rows())
+    print(f"✓ {inserted} progress records seeded successfully")
 
 def seed_fees():
     """Create sample fee records"""
-    students = Student.query.all()
-    fee_types = ['Tuition', 'Books', 'Activities', 'Transport']
+    existing = set(db.session.query(FeeRecord.student_id, FeeRecord.fee_type))
+    classes = dict(db.session.query(Student.id, Student.class_level))
+    now = datetime.utcnow()
     
-    for student in students:
-        for fee_type in fee_types:
-            existing_record = FeeRecord.query.filter_by(
-                student_id=student.id,
-                fee_type=fee_type
-            ).first()
-            
-            if not existing_record:
-                import random
+    def rows():
+        for student_id in student_ids():
+            for fee_type in FEE_TYPES:
+                if (student_id, fee_type) in existing:
+                    continue
                 amount = random.choice([100, 150, 200, 250, 300])
                 paid_amount = random.uniform(0, amount)
-                
-                fee = FeeRecord(
-                    student_id=student.id,
-                    fee_type=fee_type,
-                    amount=amount,
-                    due_date=date.today() + timedelta(days=30),
-                    paid_amount=paid_amount,
-                    payment_date=date.today() - timedelta(days=random.randint(1, 15)) if paid_amount > 0 else None,
-                    payment_method=random.choice(['Cash', 'Card', 'Bank Transfer']) if paid_amount > 0 else None,
-                    status='Paid' if paid_amount >= amount else 'Pending',
-                    notes=f'{fee_type} fee for current term'
-                )
-                db.session.add(fee)
+                yield {
+                    'student_id': student_id,
+                    'fee_type': fee_type,
+                    'amount': amount,
+                    'due_date': date.today() + timedelta(days=30),
+                    'paid_amount': paid_amount,
+                    'payment_date': date.today() - timedelta(days=random.randint(1, 15)) if paid_amount > 0 else None,
+                    'payment_method': random.choice(['Cash', 'Card', 'Bank Transfer']) if paid_amount > 0 else None,
+                    'status': 'Paid' if paid_amount >= amount else 'Pending',
+                    'class_level': classes.get(student_id) or '',
+                    'notes': f'{fee_type} fee for current term',
+                    'created_at': now
+                }
     
+    inserted = insert_chunked(FeeRecord.__table__, rows())
+    print(f"✓ {inserted} fee records seeded successfully")
+
+def refresh_derived_data():
+    """Bulk inserts bypass the ORM hooks, so rebuild what they maintain"""
+    stats.rebuild(db.session.connection())
+    attendance_summary.rebuild(db.session.connection())
+    fee_ledger.rebuild(db.session.connection())
+    rollups.refresh(db.session.connection())
+    touch(db.session, ['students', 'attendance_records', 'progress_records', 'fee_records'])
     db.session.commit()
-    print("✓ Fee records seeded successfully")
+    print("✓ Dashboard counters and student rollups rebuilt")
 
 def seed_announcements():
     """Create sample announcements"""
@@ -314,31 +403,50 @@ def seed_announcements():
         }
     ]
     
+    existing = {title for (title,) in db.session.query(Announcement.title)}
     for announcement_data in announcements:
-        existing_announcement = Announcement.query.filter_by(title=announcement_data['title']).first()
-        if not existing_announcement:
-            announcement = Announcement(**announcement_data)
-            db.session.add(announcement)
+        if announcement_data['title'] not in existing:
+            db.session.add(Announcement(**announcement_data))
     
     db.session.commit()
     print("✓ Announcements seeded successfully")
 
+def parse_args():
+    parser = argparse.ArgumentParser(description='Seed the database with sample or load-test data')
+    parser.add_argument('--scale', type=int, default=0,
+                        help='add this many thousand synthetic students (default: samples only)')
+    parser.add_argument('--days', type=int, default=30, help='days of attendance history to generate')
+    parser.add_argument('--seed', type=int, help='random seed for reproducible datasets')
+    parser.add_argument('--database', help='seed this SQLite file instead of the configured database')
+    return parser.parse_args()
+
 def main():
     """Main seeding function"""
+    args = parse_args()
+    random.seed(args.seed)
+    config = get_config()
+    if args.database:
+        config = type('SeedConfig', (config,), {
+            'SQLALCHEMY_DATABASE_URI': f'sqlite:///{os.path.abspath(args.database)}'
+        })
+    app = create_app(config)
     with app.app_context():
         print("🌱 Starting database seeding...")
         
-        # Create all tables
-        db.create_all()
+        # Create or upgrade all tables
+        migrate()
         print("✓ Database tables created")
         
         # Seed data
         seed_users()
         seed_students()
-        seed_attendance()
+        if args.scale:
+            seed_synthetic_students(args.scale * 1000)
+        seed_attendance(args.days)
         seed_progress()
         seed_fees()
         seed_announcements()
+        refresh_derived_data()
         
         print("🎉 Database seeding completed successfully!")
         print("\n📊 Summary:")
@@ -0,0 +1,30 @@
+"""
+Per-connection SQLite tuning.
+"""
+
+from sqlalchemy import event
+
+
+def configure_sqlite(engine, pragmas):
+    """Apply the pragma profile to every connection the engine opens"""
+    if engine.dialect.name != 'sqlite':
+        return
+
+    @event.listens_for(engine, 'connect')
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f'PRAGMA {name} = {value}')
+        finally:
+            cursor.close()
+
+
+def begin_immediate(connection):
+    """Start the connection's transaction holding the write lock, so rows read next cannot change before commit.
+    
+    Call it before the transaction's first statement; once pysqlite has begun
+    a transaction this is a no-op.
+    """
+    if connection.dialect.name == 'sqlite' and not connection.connection.dbapi_connection.in_transaction:
+        connection.exec_driver_sql('BEGIN IMMEDIATE')
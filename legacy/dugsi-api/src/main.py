@@ -3,38 +3,76 @@ import sys
 # DON'T CHANGE THIS !!!
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
-from flask import Flask, send_from_directory
-from flask_cors import CORS
-from src.models.user import db
-from src.routes.user import user_bp
-from src.routes.students import students_bp
+from flask import Flask, current_app, send_from_directory
+from src.config import get_config
 
-app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
-app.config['SECRET_KEY'] = 'madrasah-management-secret-key-2025'
+def create_app(config=None):
+    """Build the application for a config name, config class or FLASK_ENV.
+    
+    Blueprints, models and services are imported by the first call rather than
+    at module import, which keeps `import src.main` cheap but does not make the
+    first create_app() any lighter. What the factory saves on every worker start
+    is the schema work: run `flask upgrade-db` as a deploy step. Optional extras
+    (openpyxl, orjson, pyinstrument, cProfile) are imported on first use.
+    """
+    from flask_cors import CORS
+    from src.models.user import db
+    from src.routes.user import user_bp
+    from src.routes.students import students_bp
+    from src.routes.exports import exports_bp
+    from src.routes.fees import fees_bp
+    from src.routes.communication import communication_bp
+    from src.routes.jobs import jobs_bp
+    from src.services.stats import rebuild_stats_command
+    from src.services.rollups import recompute_rollups_command
+    from src.services.attendance_summary import rebuild_attendance_summary_command
+    from src.services.fee_ledger import mark_overdue_fees_command, rebuild_fee_ledger_command
+    from src.services.jobs import run_jobs_command
+    from src.database.migrations import upgrade_db_command
+    from src.database.sqlite import configure_sqlite
+    from src.database.routing import READ_BIND, configure_read_engine, reader_pragmas
+    from src.database.backends import configure_backend
+    from src.services import instrumentation, jobs
+    
+    app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
+    app.config.from_object(get_config(config))
+    
+    # Enable CORS for all routes
+    CORS(app, origins="*")
+    
+    # Register blueprints
+    app.register_blueprint(user_bp, url_prefix='/api')
+    app.register_blueprint(students_bp, url_prefix='/api')
+    app.register_blueprint(exports_bp, url_prefix='/api')
+    app.register_blueprint(fees_bp, url_prefix='/api')
+    app.register_blueprint(communication_bp, url_prefix='/api')
+    app.register_blueprint(jobs_bp, url_prefix='/api')
+    
+    # Database configuration; GET requests read through the 'reader' bind when it is enabled
+    configure_backend(app)
+    configure_read_engine(app)
+    db.init_app(app)
+    with app.app_context():
+        configure_sqlite(db.engine, app.config['SQLITE_PRAGMAS'])
+        if READ_BIND in db.engines:
+            configure_sqlite(db.engines[READ_BIND], reader_pragmas(app.config['SQLITE_PRAGMAS']))
+        instrumentation.init_app(app, db.engines.values())
+    jobs.init_app(app)
+    
+    app.cli.add_command(upgrade_db_command)
+    app.cli.add_command(rebuild_stats_command)
+    app.cli.add_command(recompute_rollups_command)
+    app.cli.add_command(rebuild_attendance_summary_command)
+    app.cli.add_command(rebuild_fee_ledger_command)
+    app.cli.add_command(mark_overdue_fees_command)
+    app.cli.add_command(run_jobs_command)
+    
+    app.add_url_rule('/', 'serve', serve, defaults={'path': ''})
+    app.add_url_rule('/<path:path>', 'serve', serve)
+    return app
 
-# Enable CORS for all routes
-CORS(app, origins="*")
-
-# Register blueprints
-app.register_blueprint(user_bp, url_prefix='/api')
-app.register_blueprint(students_bp, url_prefix='/api')
-
-# Database configuration
-app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-db.init_app(app)
-
-# Import all models to ensure they're registered
-from src.models.student import Student, AttendanceRecord, ProgressRecord, FeeRecord
-from src.models.communication import Message, Announcement, Notification
-
-with app.app_context():
-    db.create_all()
-
-@app.route('/', defaults={'path': ''})
-@app.route('/<path:path>')
 def serve(path):
-    static_folder_path = app.static_folder
+    static_folder_path = current_app.static_folder
     if static_folder_path is None:
             return "Static folder not configured", 404
 
@@ -49,4 +87,10 @@ def serve(path):
 
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=4545, debug=True)
+    from src.database.migrations import migrate
+    
+    app = create_app()
+    # The development server keeps the schema current on start for convenience
+    with app.app_context():
+        migrate()
+    app.run(host='0.0.0.0', port=4545, debug=app.config['DEBUG'])
@@ -4,6 +4,14 @@ from src.models.user import db
 
 class Message(db.Model):
     __tablename__ = 'messages'
+    __table_args__ = (
+        db.Index('ix_messages_recipient_id', 'recipient_id'),
+        # Partial covering index of unread messages only, so unread counts do not grow with history
+        db.Index(
+            'ix_messages_recipient_unread', 'recipient_id', 'read_at', 'status',
+            sqlite_where=db.text('read_at IS NULL'), postgresql_where=db.text('read_at IS NULL')
+        ),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     sender_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -38,12 +46,16 @@ class Message(db.Model):
 
 class Announcement(db.Model):
     __tablename__ = 'announcements'
+    __table_args__ = (
+        db.Index('ix_announcements_status', 'status'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
     content = db.Column(db.Text, nullable=False)
     author_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     target_audience = db.Column(db.String(50))  # all, parents, teachers, students, specific_class
+    target_class_level = db.Column(db.String(20))  # class_level for specific_class announcements
     priority = db.Column(db.String(20), default='normal')
     status = db.Column(db.String(20), default='draft')  # draft, published, archived
     publish_date = db.Column(db.DateTime)
@@ -62,6 +74,7 @@ class Announcement(db.Model):
             'content': self.content,
             'author_id': self.author_id,
             'target_audience': self.target_audience,
+            'target_class_level': self.target_class_level,
             'priority': self.priority,
             'status': self.status,
             'publish_date': self.publish_date.isoformat() if self.publish_date else None,
@@ -73,6 +86,15 @@ class Announcement(db.Model):
 
 class Notification(db.Model):
     __tablename__ = 'notifications'
+    __table_args__ = (
+        db.Index('ix_notifications_user_id', 'user_id'),
+        db.Index('ix_notifications_type_related_id', 'notification_type', 'related_id'),
+        # Partial covering index of unread notifications; queries must say is_read = false() to use it
+        db.Index(
+            'ix_notifications_user_unread', 'user_id', 'is_read',
+            sqlite_where=db.text('is_read = 0'), postgresql_where=db.text('is_read = false')
+        ),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -0,0 +1,81 @@
+from datetime import datetime
+from src.models.user import db
+
+class DashboardStat(db.Model):
+    __tablename__ = 'dashboard_stats'
+    
+    # students_total, students_active, fees_outstanding,
+    # attendance_marked:<date>, attendance_present:<date>
+    name = db.Column(db.String(64), primary_key=True)
+    value = db.Column(db.Float, nullable=False, default=0.0)
+    
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'value': self.value
+        }
+
+class TableVersion(db.Model):
+    __tablename__ = 'table_versions'
+    
+    # Bumped by every transaction that writes to the named table
+    name = db.Column(db.String(64), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'version': self.version,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+class AttendanceDailySummary(db.Model):
+    __tablename__ = 'attendance_daily_summary'
+    
+    # One row per day per class; '' stands in for a student with no class_level/year_group
+    date = db.Column(db.Date, primary_key=True)
+    class_level = db.Column(db.String(20), primary_key=True, default='')
+    year_group = db.Column(db.String(20), primary_key=True, default='')
+    marked = db.Column(db.Integer, nullable=False, default=0)
+    present = db.Column(db.Integer, nullable=False, default=0)
+    absent = db.Column(db.Integer, nullable=False, default=0)
+    late = db.Column(db.Integer, nullable=False, default=0)
+    excused = db.Column(db.Integer, nullable=False, default=0)
+    
+    def to_dict(self):
+        return {
+            'date': self.date.isoformat() if self.date else None,
+            'class_level': self.class_level or None,
+            'year_group': self.year_group or None,
+            'marked': self.marked,
+            'present': self.present,
+            'absent': self.absent,
+            'late': self.late,
+            'excused': self.excused
+        }
+
+class FeeLedgerSummary(db.Model):
+    __tablename__ = 'fee_ledger_summary'
+    
+    # One row per due date per fee type per class; aging is derived from due_date at read time
+    due_date = db.Column(db.Date, primary_key=True)
+    fee_type = db.Column(db.String(50), primary_key=True)
+    class_level = db.Column(db.String(20), primary_key=True, default='')
+    records = db.Column(db.Integer, nullable=False, default=0)
+    open_records = db.Column(db.Integer, nullable=False, default=0)
+    billed = db.Column(db.Float, nullable=False, default=0.0)
+    paid = db.Column(db.Float, nullable=False, default=0.0)
+    outstanding = db.Column(db.Float, nullable=False, default=0.0)
+    
+    def to_dict(self):
+        return {
+            'due_date': self.due_date.isoformat() if self.due_date else None,
+            'fee_type': self.fee_type,
+            'class_level': self.class_level or None,
+            'records': self.records,
+            'open_records': self.open_records,
+            'billed': self.billed,
+            'paid': self.paid,
+            'outstanding': self.outstanding
+        }
@@ -4,6 +4,12 @@ from src.models.user import db
 
 class Student(db.Model):
     __tablename__ = 'students'
+    __table_args__ = (
+        # Roster filters; each index ends in the rowid, so keyset order needs no sort
+        db.Index('ix_students_status', 'status'),
+        db.Index('ix_students_class_level', 'class_level'),
+        db.Index('ix_students_year_group', 'year_group'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     student_id = db.Column(db.String(20), unique=True, nullable=False)
@@ -71,11 +77,22 @@ class Student(db.Model):
 
 class AttendanceRecord(db.Model):
     __tablename__ = 'attendance_records'
+    __table_args__ = (
+        # One record per student per day; also the conflict target for bulk upserts
+        db.Index('uq_attendance_student_date', 'student_id', 'date', unique=True),
+        # Covers the per-day status counts on the dashboard
+        db.Index('ix_attendance_date_status', 'date', 'status'),
+        # Covers the per-student attendance_rate rollup
+        db.Index('ix_attendance_student_status', 'student_id', 'status'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     student_id = db.Column(db.Integer, db.ForeignKey('students.id'), nullable=False)
     date = db.Column(db.Date, nullable=False)
     status = db.Column(db.String(20), nullable=False)  # Present, Absent, Late, Excused
+    # The student's class when first marked; '' for none
+    class_level = db.Column(db.String(20))
+    year_group = db.Column(db.String(20))
     notes = db.Column(db.Text)
     marked_by = db.Column(db.String(100))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -86,6 +103,8 @@ class AttendanceRecord(db.Model):
             'student_id': self.student_id,
             'date': self.date.isoformat() if self.date else None,
             'status': self.status,
+            'class_level': self.class_level,
+            'year_group': self.year_group,
             'notes': self.notes,
             'marked_by': self.marked_by,
             'created_at': self.created_at.isoformat() if self.created_at else None
@@ -93,6 +112,11 @@ class AttendanceRecord(db.Model):
 
 class ProgressRecord(db.Model):
     __tablename__ = 'progress_records'
+    __table_args__ = (
+        db.Index('ix_progress_student_subject', 'student_id', 'subject'),
+        db.Index('ix_progress_subject', 'subject'),
+        db.Index('ix_progress_assessment_date', 'assessment_date'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     student_id = db.Column(db.Integer, db.ForeignKey('students.id'), nullable=False)
@@ -123,6 +147,12 @@ class ProgressRecord(db.Model):
 
 class FeeRecord(db.Model):
     __tablename__ = 'fee_records'
+    __table_args__ = (
+        # Covers the outstanding balance sum without touching the table
+        db.Index('ix_fee_records_status_balance', 'status', 'amount', 'paid_amount'),
+        db.Index('ix_fee_records_student_fee_type', 'student_id', 'fee_type'),
+        db.Index('ix_fee_records_due_date', 'due_date'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     student_id = db.Column(db.Integer, db.ForeignKey('students.id'), nullable=False)
@@ -133,6 +163,7 @@ class FeeRecord(db.Model):
     payment_date = db.Column(db.Date)
     payment_method = db.Column(db.String(50))  # Cash, Card, Bank Transfer
     status = db.Column(db.String(20), default='Pending')  # Pending, Paid, Overdue
+    class_level = db.Column(db.String(20))  # the student's class when the fee was billed; '' for none
     notes = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
@@ -147,7 +178,36 @@ class FeeRecord(db.Model):
             'payment_date': self.payment_date.isoformat() if self.payment_date else None,
             'payment_method': self.payment_method,
             'status': self.status,
+            'class_level': self.class_level,
             'notes': self.notes,
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
 
+
+class FeePayment(db.Model):
+    __tablename__ = 'fee_payments'
+    __table_args__ = (
+        db.Index('ix_fee_payments_fee_record_id', 'fee_record_id'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    fee_record_id = db.Column(db.Integer, db.ForeignKey('fee_records.id'), nullable=False)
+    # Bank or receipt reference; posting the same reference twice is a no-op
+    reference = db.Column(db.String(100), unique=True, nullable=False)
+    amount = db.Column(db.Float, nullable=False)
+    payment_date = db.Column(db.Date, nullable=False)
+    payment_method = db.Column(db.String(50))
+    notes = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'fee_record_id': self.fee_record_id,
+            'reference': self.reference,
+            'amount': self.amount,
+            'payment_date': self.payment_date.isoformat() if self.payment_date else None,
+            'payment_method': self.payment_method,
+            'notes': self.notes,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
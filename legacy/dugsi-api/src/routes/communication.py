@@ -0,0 +1,237 @@
+from flask import Blueprint, request, jsonify, url_for
+from src.models.user import db
+from src.models.communication import Announcement, Message, Notification
+from src.services.notifications import validate_audience, publish, notified_count
+from src.services.cache import cached_response, touch
+from src.services.serialization import json_response
+from datetime import datetime
+
+communication_bp = Blueprint('communication', __name__)
+
+# Inbox pages, newest first
+INBOX_PAGE_SIZE = 50
+MAX_INBOX_PAGE_SIZE = 200
+
+# Written exactly as the partial indexes' WHERE clauses, or SQLite will not use them
+UNREAD_NOTIFICATION = Notification.is_read == db.false()
+UNREAD_MESSAGE = Message.read_at.is_(None)
+
+def inbox_page(query, model):
+    """Newest-first keyset page of an inbox query; returns (items, next_before_id)"""
+    before_id = request.args.get('before_id', type=int)
+    limit = max(1, min(request.args.get('limit', INBOX_PAGE_SIZE, type=int), MAX_INBOX_PAGE_SIZE))
+    if before_id is not None:
+        query = query.filter(model.id < before_id)
+    
+    # Fetch one extra row to know whether another page follows
+    items = query.order_by(model.id.desc()).limit(limit + 1).all()
+    has_more = len(items) > limit
+    items = items[:limit]
+    return items, items[-1].id if has_more else None
+
+@communication_bp.route('/announcements', methods=['GET'])
+@cached_response('announcements')
+def get_announcements():
+    """Get announcements, newest first, optionally filtered by status"""
+    try:
+        query = Announcement.query
+        if request.args.get('status'):
+            query = query.filter(Announcement.status == request.args['status'])
+        announcements = query.order_by(Announcement.id.desc()).all()
+        
+        return json_response({
+            'success': True,
+            'data': [announcement.to_dict() for announcement in announcements],
+            'count': len(announcements)
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@communication_bp.route('/announcements/<int:announcement_id>', methods=['GET'])
+@cached_response('announcements', 'notifications')
+def get_announcement(announcement_id):
+    """Get an announcement with the number of users notified so far"""
+    try:
+        announcement = db.session.get(Announcement, announcement_id)
+        if announcement is None:
+            return jsonify({'success': False, 'error': 'Announcement not found'}), 404
+        data = announcement.to_dict()
+        data['notified'] = notified_count(announcement.id)
+        return json_response({'success': True, 'data': data})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@communication_bp.route('/announcements', methods=['POST'])
+def create_announcement():
+    """Create an announcement; with "publish": true it is published straight away"""
+    try:
+        data = request.get_json() or {}
+        
+        # Validate required fields
+        for field in ('title', 'content', 'author_id'):
+            if not data.get(field):
+                return jsonify({'success': False, 'error': f'{field} is required'}), 400
+        target_audience = data.get('target_audience', 'all')
+        validate_audience(target_audience, data.get('target_class_level'))
+        
+        announcement = Announcement(
+            title=data['title'],
+            content=data['content'],
+            author_id=data['author_id'],
+            target_audience=target_audience,
+            target_class_level=data.get('target_class_level'),
+            priority=data.get('priority', 'normal'),
+            expiry_date=datetime.fromisoformat(data['expiry_date']) if data.get('expiry_date') else None
+        )
+        db.session.add(announcement)
+        db.session.commit()
+        
+        if data.get('publish'):
+            fan_out = publish(announcement)
+            return jsonify({
+                'success': True,
+                'data': announcement.to_dict(),
+                'job_id': fan_out.id,
+                'message': 'Announcement published; notifications are being sent'
+            }), 202, {'Location': url_for('jobs.get_job', job_id=fan_out.id)}
+        return jsonify({'success': True, 'data': announcement.to_dict(), 'message': 'Announcement created'}), 201
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@communication_bp.route('/announcements/<int:announcement_id>/publish', methods=['POST'])
+def publish_announcement(announcement_id):
+    """Publish an announcement and fan its notifications out in the background"""
+    try:
+        announcement = db.session.get(Announcement, announcement_id)
+        if announcement is None:
+            return jsonify({'success': False, 'error': 'Announcement not found'}), 404
+        if announcement.status == 'archived':
+            return jsonify({'success': False, 'error': 'Archived announcements cannot be published'}), 400
+        
+        # Publishing again is safe: the fan-out only adds notifications that are missing
+        fan_out = publish(announcement)
+        return jsonify({
+            'success': True,
+            'data': announcement.to_dict(),
+            'job_id': fan_out.id,
+            'message': 'Announcement published; notifications are being sent'
+        }), 202, {'Location': url_for('jobs.get_job', job_id=fan_out.id)}
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@communication_bp.route('/users/<int:user_id>/unread-count', methods=['GET'])
+def get_unread_count(user_id):
+    """Unread notifications and messages for a user, counted from the partial unread indexes"""
+    try:
+        notifications = db.session.query(db.func.count()).select_from(Notification).filter(
+            Notification.user_id == user_id, UNREAD_NOTIFICATION
+        ).scalar()
+        messages = db.session.query(db.func.count()).select_from(Message).filter(
+            Message.recipient_id == user_id, UNREAD_MESSAGE, Message.status != 'draft'
+        ).scalar()
+        
+        return jsonify({
+            'success': True,
+            'data': {'notifications': notifications, 'messages': messages, 'total': notifications + messages}
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@communication_bp.route('/users/<int:user_id>/notifications', methods=['GET'])
+def get_user_notifications(user_id):
+    """A user's notifications, newest first, with ?unread=true and before_id/limit paging"""
+    try:
+        query = Notification.query.filter(Notification.user_id == user_id)
+        if request.args.get('unread', '').lower() in ('1', 'true'):
+            query = query.filter(UNREAD_NOTIFICATION)
+        notifications, next_before_id = inbox_page(query, Notification)
+        
+        return json_response({
+            'success': True,
+            'data': [notification.to_dict() for notification in notifications],
+            'count': len(notifications),
+            'next_before_id': next_before_id
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@communication_bp.route('/users/<int:user_id>/messages', methods=['GET'])
+def get_user_messages(user_id):
+    """A user's received messages, newest first, with ?unread=true and before_id/limit paging"""
+    try:
+        query = Message.query.filter(Message.recipient_id == user_id, Message.status != 'draft')
+        if request.args.get('unread', '').lower() in ('1', 'true'):
+            query = query.filter(UNREAD_MESSAGE)
+        messages, next_before_id = inbox_page(query, Message)
+        
+        return json_response({
+            'success': True,
+            'data': [message.to_dict() for message in messages],
+            'count': len(messages),
+            'next_before_id': next_before_id
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@communication_bp.route('/users/<int:user_id>/notifications/read-all', methods=['POST'])
+def mark_all_notifications_read(user_id):
+    """Mark every unread notification (up to an optional up_to_id) read in one UPDATE"""
+    try:
+        data = request.get_json(silent=True) or {}
+        query = Notification.__table__.update().where(Notification.user_id == user_id, UNREAD_NOTIFICATION)
+        if data.get('up_to_id') is not None:
+            # Leave notifications that arrived after the client rendered its list
+            query = query.where(Notification.id <= int(data['up_to_id']))
+        result = db.session.execute(query.values(is_read=True, read_at=datetime.utcnow()))
+        if result.rowcount:
+            touch(db.session, ['notifications'])
+        db.session.commit()
+        
+        return jsonify({
+            'success': True,
+            'data': {'marked_read': result.rowcount},
+            'message': f'{result.rowcount} notifications marked read'
+        })
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@communication_bp.route('/notifications/<int:notification_id>/read', methods=['POST'])
+def mark_notification_read(notification_id):
+    """Mark one notification read"""
+    try:
+        notification = db.session.get(Notification, notification_id)
+        if notification is None:
+            return jsonify({'success': False, 'error': 'Notification not found'}), 404
+        if not notification.is_read:
+            notification.is_read = True
+            notification.read_at = datetime.utcnow()
+            db.session.commit()
+        return jsonify({'success': True, 'data': notification.to_dict()})
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@communication_bp.route('/messages/<int:message_id>/read', methods=['POST'])
+def mark_message_read(message_id):
+    """Mark one message read"""
+    try:
+        message = db.session.get(Message, message_id)
+        if message is None:
+            return jsonify({'success': False, 'error': 'Message not found'}), 404
+        if message.read_at is None:
+            message.status = 'read'
+            message.read_at = datetime.utcnow()
+            db.session.commit()
+        return jsonify({'success': True, 'data': message.to_dict()})
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
@@ -0,0 +1,106 @@
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from src.models.user import db
+from src.models.student import AttendanceRecord, ProgressRecord, FeeRecord
+from src.services.serialization import requested_fields
+from sqlalchemy import select, type_coerce, Date, DateTime, String
+from datetime import datetime
+import csv
+import io
+import zlib
+
+exports_bp = Blueprint('exports', __name__)
+
+# Rows fetched from the cursor per round trip, and written out as one chunk
+EXPORT_BATCH_SIZE = 2000
+GZIP_LEVEL = 6
+
+# table name -> (model, date column the from/to range applies to)
+EXPORTS = {
+    'attendance_records': (AttendanceRecord, AttendanceRecord.date),
+    'progress_records': (ProgressRecord, ProgressRecord.assessment_date),
+    'fee_records': (FeeRecord, FeeRecord.due_date),
+}
+
+def parse_date(name):
+    value = request.args.get(name)
+    return datetime.strptime(value, '%Y-%m-%d').date() if value else None
+
+def export_columns(model, fields):
+    """Columns to select; dates are read as the ISO text SQLite stores rather than parsed and re-formatted"""
+    columns = []
+    for field in fields:
+        column = getattr(model, field)
+        if isinstance(column.type, (Date, DateTime)):
+            column = type_coerce(column, String).label(field)
+        columns.append(column)
+    return columns
+
+def stream_csv(statement, fields):
+    """Yield the CSV header and then one chunk of encoded rows per fetched batch"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    result = db.session.execute(statement.execution_options(yield_per=EXPORT_BATCH_SIZE))
+    for rows in result.partitions():
+        writer.writerows(rows)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue().encode('utf-8')
+
+def gzip_chunks(chunks):
+    """Compress a byte stream into a single gzip member as it is produced"""
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+def export_table(table, compress):
+    """Stream a history table as CSV, optionally filtered to a date range and student"""
+    if table not in EXPORTS:
+        return jsonify({'success': False, 'error': f"Unknown export '{table}'; expected one of {', '.join(EXPORTS)}"}), 404
+    model, date_column = EXPORTS[table]
+    try:
+        # Validate everything before the first byte goes out; a streamed response cannot change its status
+        fields = requested_fields(model)
+        date_from = parse_date('from')
+        date_to = parse_date('to')
+        student_id = request.args.get('student_id', type=int)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    statement = select(*export_columns(model, fields))
+    if date_from:
+        statement = statement.where(date_column >= date_from)
+    if date_to:
+        statement = statement.where(date_column <= date_to)
+    if student_id is not None:
+        statement = statement.where(model.student_id == student_id)
+    # Date order follows the date index, so the cursor streams without sorting the whole range
+    statement = statement.order_by(date_column, model.id)
+    
+    filename = table
+    if date_from or date_to:
+        filename += f"_{date_from or 'start'}_{date_to or 'end'}"
+    chunks = stream_csv(statement, fields)
+    if compress:
+        chunks = gzip_chunks(chunks)
+        filename, mimetype = filename + '.csv.gz', 'application/gzip'
+    else:
+        filename, mimetype = filename + '.csv', 'text/csv'
+    
+    response = Response(stream_with_context(chunks), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+@exports_bp.route('/export/<table>.csv', methods=['GET'])
+def export_csv(table):
+    """Stream a table's history as CSV"""
+    return export_table(table, compress=False)
+
+@exports_bp.route('/export/<table>.csv.gz', methods=['GET'])
+def export_csv_gzip(table):
+    """Stream a table's history as gzipped CSV"""
+    return export_table(table, compress=True)
@@ -0,0 +1,30 @@
+from flask import Blueprint, request, jsonify
+from sqlalchemy.exc import IntegrityError
+from src.models.user import db
+from src.services.payments import post_payments
+
+fees_bp = Blueprint('fees', __name__)
+
+@fees_bp.route('/fees/payments/batch', methods=['POST'])
+def post_payment_batch():
+    """Record a batch of fee payments, skipping references already posted"""
+    try:
+        data = request.get_json() or {}
+        try:
+            report = post_payments(data.get('payments'), data)
+        except IntegrityError:
+            # Another request posted one of these references first; the retry reports it as a duplicate
+            db.session.rollback()
+            report = post_payments(data.get('payments'), data)
+        
+        return jsonify({
+            'success': True,
+            'data': report,
+            'message': f"Applied {report['applied']} payments totalling {report['amount_applied']:.2f}"
+        })
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
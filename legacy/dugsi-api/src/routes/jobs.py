@@ -0,0 +1,60 @@
+from flask import Blueprint, request, jsonify, url_for
+from src.models.user import db
+from src.models.job import Job
+from src.services.jobs import API_JOBS, submit
+
+jobs_bp = Blueprint('jobs', __name__)
+
+# Job listings, newest first
+JOBS_PAGE_SIZE = 50
+MAX_JOBS_PAGE_SIZE = 200
+
+@jobs_bp.route('/jobs', methods=['GET'])
+def get_jobs():
+    """Recent jobs, newest first, optionally filtered by status"""
+    try:
+        limit = max(1, min(request.args.get('limit', JOBS_PAGE_SIZE, type=int), MAX_JOBS_PAGE_SIZE))
+        query = Job.query
+        if request.args.get('status'):
+            query = query.filter(Job.status == request.args['status'])
+        jobs = query.order_by(Job.id.desc()).limit(limit).all()
+        
+        return jsonify({
+            'success': True,
+            'data': [job.to_dict() for job in jobs],
+            'count': len(jobs)
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@jobs_bp.route('/jobs/<int:job_id>', methods=['GET'])
+def get_job(job_id):
+    """A job's status, and its result or last error"""
+    try:
+        job = db.session.get(Job, job_id)
+        if job is None:
+            return jsonify({'success': False, 'error': 'Job not found'}), 404
+        return jsonify({'success': True, 'data': job.to_dict()})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@jobs_bp.route('/jobs', methods=['POST'])
+def create_job():
+    """Queue a maintenance job such as rollups.recompute or fee_ledger.rebuild"""
+    try:
+        data = request.get_json() or {}
+        if data.get('name') not in API_JOBS:
+            return jsonify({
+                'success': False,
+                'error': f"name must be one of {', '.join(sorted(API_JOBS))}"
+            }), 400
+        
+        job = submit(data['name'])
+        return jsonify({
+            'success': True,
+            'data': job.to_dict(),
+            'message': f"{data['name']} queued"
+        }), 202, {'Location': url_for('jobs.get_job', job_id=job.id)}
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
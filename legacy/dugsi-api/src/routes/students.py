@@ -1,20 +1,54 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify, stream_with_context, url_for
 from src.models.user import db
 from src.models.student import Student, AttendanceRecord, ProgressRecord, FeeRecord
-from datetime import datetime, date
-import json
+from src.database.bulk import upsert_statement
+from src.services import stats, rollups, attendance_summary, fee_ledger
+from src.services.search import search_students
+from src.services.roster_import import RosterImportError, csv_rows, xlsx_rows, import_students
+from src.services.cache import cached_response, touch
+from src.services.jobs import submit
+from src.services.serialization import dumps, json_response, requested_fields, project, rows_to_dicts
+from sqlalchemy.orm import selectinload
+from datetime import datetime, date, timedelta
+import base64
+import io
 
 students_bp = Blueprint('students', __name__)
 
+# Keyset pagination / streaming settings for list endpoints
+MAX_PAGE_LIMIT = 1000
+STREAM_BATCH_SIZE = 500
+
+# Student profiles: history window in days, and students per batched request
+PROFILE_HISTORY_DAYS = 90
+MAX_PROFILE_HISTORY_DAYS = 366
+MAX_PROFILE_IDS = 100
+
+# Attendance trends cover this many days when no range is given
+ANALYTICS_DEFAULT_DAYS = 90
+
+# Largest roster ?async=1 will queue; the file is stored in the job's payload
+MAX_QUEUED_IMPORT_BYTES = 16 * 1024 * 1024
+
+def stream_ndjson(query, fields):
+    """Yield one JSON document per row, fetching rows in batches"""
+    for row in query.yield_per(STREAM_BATCH_SIZE):
+        yield dumps(dict(zip(fields, row))) + b'\n'
+
 @students_bp.route('/students', methods=['GET'])
+@cached_response('students')
 def get_students():
-    """Get all students with optional filtering"""
+    """Get students with optional filtering, keyset pagination and NDJSON streaming"""
     try:
         # Get query parameters
+        fields = requested_fields(Student)
         class_level = request.args.get('class_level')
         year_group = request.args.get('year_group')
         status = request.args.get('status')
         search = request.args.get('search')
+        after_id = request.args.get('after_id', type=int)
+        limit = request.args.get('limit', type=int)
+        response_format = request.args.get('format')
         
         # Build query
         query = Student.query
@@ -25,19 +59,46 @@ def get_students():
             query = query.filter(Student.year_group == year_group)
         if status:
             query = query.filter(Student.status == status)
+        
         if search:
-            query = query.filter(
-                (Student.english_name.contains(search)) |
-                (Student.arabic_name.contains(search)) |
-                (Student.student_id.contains(search))
-            )
+            # Search results come back by relevance, so the id cursor does not apply
+            query = search_students(query, search)
+        else:
+            # Keyset pagination: rows strictly after the cursor, in primary key order
+            query = query.order_by(Student.id)
+            if after_id is not None:
+                query = query.filter(Student.id > after_id)
+        if limit is not None:
+            limit = max(1, min(limit, MAX_PAGE_LIMIT))
         
-        students = query.all()
-        return jsonify({
+        # Select plain row tuples; the id rides along at the end for the cursor
+        query = project(query, Student, fields if 'id' in fields else fields + ['id'])
+        
+        if response_format == 'ndjson':
+            if limit is not None:
+                query = query.limit(limit)
+            return Response(stream_with_context(stream_ndjson(query, fields)), mimetype='application/x-ndjson')
+        
+        if limit is None:
+            rows = query.all()
+            return json_response({
+                'success': True,
+                'data': rows_to_dicts(fields, rows),
+                'count': len(rows)
+            })
+        
+        # Fetch one extra row to know whether another page exists
+        rows = query.limit(limit + 1).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        return json_response({
             'success': True,
-            'data': [student.to_dict() for student in students],
-            'count': len(students)
+            'data': rows_to_dicts(fields, rows),
+            'count': len(rows),
+            'next_after_id': rows[-1].id if has_more and not search else None
         })
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -77,7 +138,124 @@ def create_student():
         db.session.rollback()
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@students_bp.route('/students/import', methods=['POST'])
+def import_roster():
+    """Import students from a CSV (or XLSX) roster, upserting by student_id; ?async=1 queues it as a job"""
+    try:
+        upload = request.files.get('file')
+        if upload is not None:
+            stream, filename, mimetype = upload.stream, upload.filename or '', upload.mimetype
+        else:
+            # Raw request body, e.g. curl --data-binary @roster.csv -H 'Content-Type: text/csv'
+            stream, filename, mimetype = io.BufferedReader(request.stream), '', request.mimetype
+        is_xlsx = filename.lower().endswith('.xlsx') or mimetype.endswith('spreadsheetml.sheet')
+        
+        if request.args.get('async', '').lower() in ('1', 'true'):
+            content = stream.read(MAX_QUEUED_IMPORT_BYTES + 1)
+            if not content:
+                return jsonify({'success': False, 'error': 'The file is empty'}), 400
+            if len(content) > MAX_QUEUED_IMPORT_BYTES:
+                return jsonify({'success': False, 'error': 'The file is too large to queue'}), 413
+            queued = submit(
+                'students.import_roster',
+                content=base64.b64encode(content).decode('ascii'),
+                file_format='xlsx' if is_xlsx else 'csv'
+            )
+            return jsonify({
+                'success': True,
+                'data': queued.to_dict(),
+                'message': 'Roster import queued'
+            }), 202, {'Location': url_for('jobs.get_job', job_id=queued.id)}
+        
+        if is_xlsx:
+            if not stream.seekable():
+                stream = io.BytesIO(stream.read())
+            header, rows = xlsx_rows(stream)
+        else:
+            header, rows = csv_rows(stream)
+        
+        report = import_students(header, rows)
+        return jsonify({
+            'success': True,
+            'data': report,
+            'message': f"Imported {report['created'] + report['updated']} of {report['processed']} rows"
+        })
+    except RosterImportError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+def load_profiles(student_ids):
+    """Students with their recent history, in one query per table however many students"""
+    days = request.args.get('days', PROFILE_HISTORY_DAYS, type=int)
+    since = date.today() - timedelta(days=max(1, min(days, MAX_PROFILE_HISTORY_DAYS)))
+    students = Student.query.filter(Student.id.in_(student_ids)).options(
+        selectinload(Student.attendance_records.and_(AttendanceRecord.date >= since)),
+        selectinload(Student.progress_records.and_(ProgressRecord.assessment_date >= since)),
+        # Unpaid fees stay on the profile however old they are
+        selectinload(Student.fee_records.and_(db.or_(FeeRecord.status != 'Paid', FeeRecord.due_date >= since)))
+    ).all()
+    return since, {student.id: student for student in students}
+
+def profile_dict(student):
+    """A student with their loaded history, newest first"""
+    return {
+        **student.to_dict(),
+        'attendance': [record.to_dict() for record in sorted(
+            student.attendance_records, key=lambda record: record.date, reverse=True
+        )],
+        'progress': [record.to_dict() for record in sorted(
+            student.progress_records, key=lambda record: (record.assessment_date, record.id), reverse=True
+        )],
+        'fees': [record.to_dict() for record in sorted(
+            student.fee_records, key=lambda record: (record.due_date, record.id), reverse=True
+        )]
+    }
+
+@students_bp.route('/students/profile', methods=['GET'])
+@cached_response('students', 'attendance_records', 'progress_records', 'fee_records')
+def get_student_profiles():
+    """Get profiles for a comma-separated list of student ids"""
+    try:
+        student_ids = [int(value) for value in request.args.get('ids', '').split(',') if value.strip()]
+        if not student_ids:
+            return jsonify({'success': False, 'error': 'ids is required'}), 400
+        if len(student_ids) > MAX_PROFILE_IDS:
+            return jsonify({'success': False, 'error': f'At most {MAX_PROFILE_IDS} ids per request'}), 400
+        
+        since, students = load_profiles(student_ids)
+        profiles = [profile_dict(students[student_id]) for student_id in dict.fromkeys(student_ids) if student_id in students]
+        return json_response({
+            'success': True,
+            'data': profiles,
+            'count': len(profiles),
+            'since': since.isoformat(),
+            'missing': [student_id for student_id in dict.fromkeys(student_ids) if student_id not in students]
+        })
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@students_bp.route('/students/<int:student_id>/profile', methods=['GET'])
+@cached_response('students', 'attendance_records', 'progress_records', 'fee_records')
+def get_student_profile(student_id):
+    """Get a student with their recent attendance, progress and fees"""
+    try:
+        since, students = load_profiles([student_id])
+        if student_id not in students:
+            return jsonify({'success': False, 'error': 'Student not found'}), 404
+        return json_response({
+            'success': True,
+            'data': profile_dict(students[student_id]),
+            'since': since.isoformat()
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @students_bp.route('/students/<int:student_id>', methods=['GET'])
+@cached_response('students')
 def get_student(student_id):
     """Get a specific student by ID"""
     try:
@@ -136,12 +314,15 @@ def delete_student(student_id):
 
 # Attendance Routes
 @students_bp.route('/attendance', methods=['GET'])
+@cached_response('attendance_records')
 def get_attendance():
     """Get attendance records with optional filtering"""
     try:
         date_param = request.args.get('date')
         student_id = request.args.get('student_id')
         
+        fields = requested_fields(AttendanceRecord)
+        
         query = AttendanceRecord.query
         
         if date_param:
@@ -149,51 +330,81 @@ def get_attendance():
         if student_id:
             query = query.filter(AttendanceRecord.student_id == student_id)
         
-        records = query.all()
-        return jsonify({
+        rows = project(query, AttendanceRecord, fields).all()
+        return json_response({
             'success': True,
-            'data': [record.to_dict() for record in records],
-            'count': len(records)
+            'data': rows_to_dicts(fields, rows),
+            'count': len(rows)
         })
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @students_bp.route('/attendance', methods=['POST'])
 def mark_attendance():
-    """Mark attendance for students"""
+    """Mark attendance for students in a single set-based upsert"""
     try:
         data = request.get_json()
         attendance_date = datetime.strptime(data.get('date'), '%Y-%m-%d').date()
+        marked_by = data.get('marked_by', 'System')
         
-        # Process attendance records
+        # Later entries for the same student win, as they did with the per-row loop
+        rows = {}
         for record in data.get('records', []):
-            # Check if record already exists
-            existing = AttendanceRecord.query.filter_by(
-                student_id=record['student_id'],
-                date=attendance_date
-            ).first()
-            
-            if existing:
-                # Update existing record
-                existing.status = record['status']
-                existing.notes = record.get('notes', '')
-                existing.marked_by = data.get('marked_by', 'System')
-            else:
-                # Create new record
-                attendance_record = AttendanceRecord(
-                    student_id=record['student_id'],
-                    date=attendance_date,
-                    status=record['status'],
-                    notes=record.get('notes', ''),
-                    marked_by=data.get('marked_by', 'System')
-                )
-                db.session.add(attendance_record)
+            student_id = int(record['student_id'])
+            rows[student_id] = {
+                'student_id': student_id,
+                'date': attendance_date,
+                'status': record['status'],
+                'notes': record.get('notes', ''),
+                'marked_by': marked_by
+            }
         
+        # One query for every record already marked on this date, with the class it counts towards
+        existing = {
+            student_id: (status, class_level, year_group)
+            for student_id, status, class_level, year_group in db.session.query(
+                AttendanceRecord.student_id, AttendanceRecord.status,
+                AttendanceRecord.class_level, AttendanceRecord.year_group
+            ).filter(AttendanceRecord.date == attendance_date)
+        }
+        # New records are stamped with the student's current class; re-marks keep theirs
+        classes = attendance_summary.student_classes(
+            db.session.connection(), [student_id for student_id in rows if student_id not in existing]
+        )
+        for student_id, row in rows.items():
+            _, row['class_level'], row['year_group'] = existing.get(
+                student_id, (None,) + classes.get(student_id, ('', ''))
+            )
+        
+        if rows:
+            stmt = upsert_statement(
+                db.session.get_bind().dialect,
+                AttendanceRecord.__table__,
+                ['student_id', 'date'],
+                ['status', 'notes', 'marked_by']
+            )
+            db.session.execute(stmt, list(rows.values()))
+            # The upsert bypasses the ORM listeners, so report the changes to the counters here
+            old_statuses = {student_id: existing.get(student_id, (None,))[0] for student_id in rows}
+            stats.adjust(db.session.connection(), stats.attendance_deltas([
+                (attendance_date, old_statuses[student_id], row['status']) for student_id, row in rows.items()
+            ]))
+            attendance_summary.apply(db.session.connection(), [
+                (attendance_date, row['class_level'], row['year_group'], old_statuses[student_id], row['status'])
+                for student_id, row in rows.items()
+            ])
+            touch(db.session, ['attendance_records'])
+            rollups.refresh_students(db.session, rows.keys(), ['attendance_rate'])
         db.session.commit()
         
+        updated = len(existing.keys() & rows.keys())
         return jsonify({
             'success': True,
-            'message': 'Attendance marked successfully'
+            'message': 'Attendance marked successfully',
+            'created': len(rows) - updated,
+            'updated': updated
         })
     except Exception as e:
         db.session.rollback()
@@ -201,12 +412,15 @@ def mark_attendance():
 
 # Progress Routes
 @students_bp.route('/progress', methods=['GET'])
+@cached_response('progress_records')
 def get_progress():
     """Get progress records"""
     try:
         student_id = request.args.get('student_id')
         subject = request.args.get('subject')
         
+        fields = requested_fields(ProgressRecord)
+        
         query = ProgressRecord.query
         
         if student_id:
@@ -214,12 +428,14 @@ def get_progress():
         if subject:
             query = query.filter(ProgressRecord.subject == subject)
         
-        records = query.all()
-        return jsonify({
+        rows = project(query, ProgressRecord, fields).all()
+        return json_response({
             'success': True,
-            'data': [record.to_dict() for record in records],
-            'count': len(records)
+            'data': rows_to_dicts(fields, rows),
+            'count': len(rows)
         })
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -258,31 +474,82 @@ def create_progress_record():
 def get_dashboard_analytics():
     """Get dashboard analytics data"""
     try:
-        # Student statistics
-        total_students = Student.query.count()
-        active_students = Student.query.filter_by(status='Active').count()
-        
-        # Attendance statistics (today)
         today = date.today()
-        today_attendance = AttendanceRecord.query.filter_by(date=today).all()
-        present_today = len([r for r in today_attendance if r.status == 'Present'])
-        attendance_rate = (present_today / len(today_attendance) * 100) if today_attendance else 0
+        marked_key = stats.attendance_marked_key(today)
+        present_key = stats.attendance_present_key(today)
         
-        # Financial statistics
-        total_outstanding = db.session.query(db.func.sum(FeeRecord.amount - FeeRecord.paid_amount)).filter(
-            FeeRecord.status != 'Paid'
-        ).scalar() or 0
+        # Counters are maintained on write, so this is a few primary key lookups
+        counters = stats.read([
+            stats.STUDENTS_TOTAL, stats.STUDENTS_ACTIVE, stats.FEES_OUTSTANDING, marked_key, present_key
+        ])
+        present_today = int(counters[present_key])
+        marked_today = int(counters[marked_key])
+        attendance_rate = (present_today / marked_today * 100) if marked_today else 0
         
         return jsonify({
             'success': True,
             'data': {
-                'total_students': total_students,
-                'active_students': active_students,
+                'total_students': int(counters[stats.STUDENTS_TOTAL]),
+                'active_students': int(counters[stats.STUDENTS_ACTIVE]),
                 'attendance_rate': round(attendance_rate, 1),
                 'present_today': present_today,
-                'total_outstanding_fees': float(total_outstanding)
+                'total_outstanding_fees': round(counters[stats.FEES_OUTSTANDING], 2)
             }
         })
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@students_bp.route('/analytics/attendance', methods=['GET'])
+@cached_response('attendance_records', 'attendance_daily_summary')
+def get_attendance_analytics():
+    """Get attendance trends per day, week or month from the daily summary"""
+    try:
+        date_to = datetime.strptime(request.args['to'], '%Y-%m-%d').date() if request.args.get('to') else date.today()
+        date_from = (
+            datetime.strptime(request.args['from'], '%Y-%m-%d').date() if request.args.get('from')
+            else date_to - timedelta(days=ANALYTICS_DEFAULT_DAYS - 1)
+        )
+        granularity = request.args.get('granularity', 'day')
+        group_by = [column.strip() for column in request.args.get('group_by', '').split(',') if column.strip()]
+        
+        if granularity not in attendance_summary.GRANULARITIES:
+            raise ValueError(f"granularity must be one of {', '.join(attendance_summary.GRANULARITIES)}")
+        unknown = [column for column in group_by if column not in attendance_summary.GROUP_COLUMNS]
+        if unknown:
+            raise ValueError(f"Cannot group by {', '.join(unknown)}; expected {', '.join(attendance_summary.GROUP_COLUMNS)}")
+        if date_from > date_to:
+            raise ValueError('from must not be after to')
+        
+        results = attendance_summary.trends(date_from, date_to, granularity, group_by)
+        return json_response({
+            'success': True,
+            'data': results,
+            'count': len(results),
+            'from': date_from.isoformat(),
+            'to': date_to.isoformat(),
+            'granularity': granularity
+        })
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@students_bp.route('/analytics/fees', methods=['GET'])
+def get_fee_analytics():
+    """Get outstanding fees by aging bucket, class level and fee type"""
+    try:
+        today = date.today()
+        as_of = datetime.strptime(request.args['as_of'], '%Y-%m-%d').date() if request.args.get('as_of') else today
+        
+        # Pending -> Overdue is a date-driven transition; apply it before reporting
+        overdue_marked = fee_ledger.ensure_overdue_marked(today)
+        return json_response({
+            'success': True,
+            'data': fee_ledger.report(as_of),
+            'overdue_marked': overdue_marked
+        })
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
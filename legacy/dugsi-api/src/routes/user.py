@@ -1,12 +1,17 @@
 from flask import Blueprint, jsonify, request
 from src.models.user import User, db
+from src.services.serialization import json_response, requested_fields, project, rows_to_dicts
 
 user_bp = Blueprint('user', __name__)
 
 @user_bp.route('/users', methods=['GET'])
 def get_users():
-    users = User.query.all()
-    return jsonify([user.to_dict() for user in users])
+    try:
+        fields = requested_fields(User)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    rows = project(User.query, User, fields).all()
+    return json_response(rows_to_dicts(fields, rows))
 
 @user_bp.route('/users', methods=['POST'])
 def create_user():
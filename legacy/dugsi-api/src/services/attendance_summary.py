@@ -0,0 +1,187 @@
+"""
+Pre-aggregated daily attendance.
+
+attendance_daily_summary holds per-status counts for each (date,
+class_level, year_group), so attendance trends over a term or a year read
+a few hundred summary rows instead of every attendance record. Records
+count towards the class the student is in when they are first marked,
+which is stamped on the record, so re-marking after a class move changes
+the original class's counts: mapper listeners keep ORM writes in step,
+and set-based writes pass their (date, class_level, year_group,
+old_status, new_status) changes to apply(). rebuild() recomputes the
+table from attendance_records grouped by the same stamped class, and bumps
+its table version so cached trends are not served from before the rebuild.
+"""
+
+from collections import defaultdict
+from datetime import timedelta
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import event
+from src.models.user import db
+from src.models.stats import AttendanceDailySummary
+from src.models.student import Student, AttendanceRecord
+from src.database.bulk import increment_statement
+from src.services.cache import bump
+from src.services.stats import previous, track_previous
+from src.services.jobs import job
+
+# Attendance status -> summary column; other statuses only count as marked
+STATUS_COLUMNS = {
+    'Present': 'present',
+    'Absent': 'absent',
+    'Late': 'late',
+    'Excused': 'excused',
+}
+COUNT_COLUMNS = ('marked',) + tuple(STATUS_COLUMNS.values())
+GROUP_COLUMNS = ('class_level', 'year_group')
+GRANULARITIES = ('day', 'week', 'month')
+
+# Student ids looked up per query
+CLASS_LOOKUP_CHUNK_SIZE = 500
+
+
+def student_classes(connection, student_ids):
+    """(class_level, year_group) of each student, '' where unset"""
+    student_ids = sorted(set(student_ids))
+    classes = {}
+    for start in range(0, len(student_ids), CLASS_LOOKUP_CHUNK_SIZE):
+        rows = connection.execute(db.select(Student.id, Student.class_level, Student.year_group).where(
+            Student.id.in_(student_ids[start:start + CLASS_LOOKUP_CHUNK_SIZE])
+        ))
+        classes.update({student_id: (class_level or '', year_group or '') for student_id, class_level, year_group in rows})
+    return classes
+
+
+def apply(connection, changes):
+    """Fold (date, class_level, year_group, old_status, new_status) changes into the summary; None means no record"""
+    deltas = defaultdict(lambda: dict.fromkeys(COUNT_COLUMNS, 0))
+    for day, class_level, year_group, old_status, new_status in changes:
+        counts = deltas[(day, class_level or '', year_group or '')]
+        if old_status is not None:
+            counts['marked'] -= 1
+            if old_status in STATUS_COLUMNS:
+                counts[STATUS_COLUMNS[old_status]] -= 1
+        if new_status is not None:
+            counts['marked'] += 1
+            if new_status in STATUS_COLUMNS:
+                counts[STATUS_COLUMNS[new_status]] += 1
+    
+    rows = [
+        dict(counts, date=day, class_level=class_level, year_group=year_group)
+        for (day, class_level, year_group), counts in deltas.items() if any(counts.values())
+    ]
+    if rows:
+        connection.execute(increment_statement(
+            connection.dialect, AttendanceDailySummary.__table__, ['date', 'class_level', 'year_group'], COUNT_COLUMNS
+        ), rows)
+
+
+track_previous(
+    AttendanceRecord.date, AttendanceRecord.status, AttendanceRecord.class_level, AttendanceRecord.year_group
+)
+
+
+@event.listens_for(AttendanceRecord, 'before_insert')
+def stamp_attendance_class(mapper, connection, target):
+    if target.class_level is None and target.year_group is None:
+        target.class_level, target.year_group = student_classes(connection, [target.student_id]).get(
+            target.student_id, ('', '')
+        )
+
+
+@event.listens_for(AttendanceRecord, 'after_insert')
+def attendance_inserted(mapper, connection, target):
+    apply(connection, [(target.date, target.class_level, target.year_group, None, target.status)])
+
+
+@event.listens_for(AttendanceRecord, 'after_update')
+def attendance_updated(mapper, connection, target):
+    apply(connection, [
+        (
+            previous(target, 'date'), previous(target, 'class_level'), previous(target, 'year_group'),
+            previous(target, 'status'), None
+        ),
+        (target.date, target.class_level, target.year_group, None, target.status)
+    ])
+
+
+@event.listens_for(AttendanceRecord, 'after_delete')
+def attendance_deleted(mapper, connection, target):
+    apply(connection, [(target.date, target.class_level, target.year_group, target.status, None)])
+
+
+def rebuild(connection):
+    """Recompute the whole summary from attendance_records; returns the number of rows"""
+    class_level = db.func.coalesce(AttendanceRecord.class_level, '')
+    year_group = db.func.coalesce(AttendanceRecord.year_group, '')
+    counts = [db.func.count(AttendanceRecord.id)] + [
+        db.func.count(AttendanceRecord.id).filter(AttendanceRecord.status == status) for status in STATUS_COLUMNS
+    ]
+    rows = connection.execute(
+        db.select(AttendanceRecord.date, class_level, year_group, *counts)
+        .group_by(AttendanceRecord.date, class_level, year_group)
+    ).all()
+    
+    connection.execute(AttendanceDailySummary.__table__.delete())
+    if rows:
+        connection.execute(AttendanceDailySummary.__table__.insert(), [
+            dict(zip(('date',) + GROUP_COLUMNS + COUNT_COLUMNS, row)) for row in rows
+        ])
+    bump(connection, [AttendanceDailySummary.__tablename__])
+    return len(rows)
+
+
+@job('attendance_summary.rebuild', api=True)
+def rebuild_all():
+    """Recompute attendance_daily_summary; returns the row count"""
+    with db.engine.begin() as connection:
+        return rebuild(connection)
+
+
+@click.command('rebuild-attendance-summary')
+@with_appcontext
+def rebuild_attendance_summary_command():
+    """Recompute attendance_daily_summary from the attendance records."""
+    click.echo(f'Rebuilt {rebuild_all()} attendance summary rows')
+
+
+def period_start(day, granularity):
+    """First day of the day/week/month bucket a date falls in; weeks start on Monday"""
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())
+    if granularity == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def trends(date_from, date_to, granularity='day', group_by=()):
+    """Attendance counts per period between two dates, optionally split by class_level/year_group"""
+    columns = [getattr(AttendanceDailySummary, column) for column in group_by]
+    rows = db.session.query(
+        AttendanceDailySummary.date,
+        *columns,
+        *[db.func.sum(getattr(AttendanceDailySummary, column)) for column in COUNT_COLUMNS]
+    ).filter(
+        AttendanceDailySummary.date >= date_from, AttendanceDailySummary.date <= date_to
+    ).group_by(AttendanceDailySummary.date, *columns)
+    
+    # At most a row per day per class, so bucketing into weeks/months happens here
+    buckets = defaultdict(lambda: dict.fromkeys(COUNT_COLUMNS, 0))
+    for row in rows:
+        key = (period_start(row[0], granularity),) + tuple(row[1:1 + len(columns)])
+        for column, value in zip(COUNT_COLUMNS, row[1 + len(columns):]):
+            buckets[key][column] += value or 0
+    
+    results = []
+    for key in sorted(buckets):
+        counts = buckets[key]
+        if not counts['marked']:
+            continue
+        result = {'period': key[0].isoformat()}
+        result.update({column: value or None for column, value in zip(group_by, key[1:])})
+        result.update(counts)
+        result['attendance_rate'] = round(counts['present'] / counts['marked'] * 100, 1)
+        results.append(result)
+    return results
@@ -0,0 +1,156 @@
+"""
+Conditional GET support and an in-process response cache.
+
+Every transaction that writes to a table bumps that table's row in
+table_versions: ORM flushes are tracked automatically through session
+events, and set-based writes call touch(). Read endpoints decorated with
+@cached_response(<tables>) derive their ETag from those versions and the
+request URL, answer 304 Not Modified when the client already has the
+current body, and otherwise serve the body from an LRU cache as long as
+the versions it was rendered at are still current. Committed writes also
+evict the affected entries from this worker's cache.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from functools import wraps
+
+from flask import Response, request
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from src.models.user import db
+from src.models.stats import TableVersion
+from src.database.bulk import increment_statement
+
+CACHE_MAX_ENTRIES = 256
+CACHE_MAX_BODY_BYTES = 2 * 1024 * 1024
+
+# Bookkeeping tables written alongside everything else, and the job queue; never versioned
+UNVERSIONED_TABLES = {'dashboard_stats', 'table_versions', 'jobs'}
+
+
+class ResponseCache:
+    """Thread-safe LRU of rendered response bodies keyed by URL"""
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES, max_body_bytes=CACHE_MAX_BODY_BYTES):
+        self.max_entries = max_entries
+        self.max_body_bytes = max_body_bytes
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key, etag):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry['etag'] != etag:
+                return None
+            self.entries.move_to_end(key)
+            return entry
+
+    def set(self, key, etag, tables, body, mimetype):
+        if len(body) > self.max_body_bytes:
+            return
+        with self.lock:
+            self.entries[key] = {'etag': etag, 'tables': tables, 'body': body, 'mimetype': mimetype}
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, tables):
+        tables = set(tables)
+        with self.lock:
+            for key in [key for key, entry in self.entries.items() if tables.intersection(entry['tables'])]:
+                del self.entries[key]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+response_cache = ResponseCache()
+
+
+def bump(connection, tables):
+    """Increment the version of each table"""
+    now = datetime.utcnow()
+    rows = [{'name': table, 'version': 1, 'updated_at': now} for table in sorted(tables)]
+    if rows:
+        connection.execute(
+            increment_statement(connection.dialect, TableVersion.__table__, ['name'], ['version'], ['updated_at']), rows
+        )
+
+
+def touch(session, tables):
+    """Record a write made outside the ORM unit of work"""
+    bump(session.connection(), tables)
+    session.info.setdefault('written_tables', set()).update(tables)
+
+
+@event.listens_for(Session, 'after_flush')
+def version_flushed_tables(session, flush_context):
+    # new/dirty/deleted still describe the flush that just ran
+    tables = {
+        instance.__table__.name
+        for instance in list(session.new) + list(session.dirty) + list(session.deleted)
+        if hasattr(instance, '__table__')
+    } - UNVERSIONED_TABLES
+    if tables:
+        bump(session.connection(), tables)
+        session.info.setdefault('written_tables', set()).update(tables)
+
+
+@event.listens_for(Session, 'after_commit')
+def evict_written_tables(session):
+    tables = session.info.pop('written_tables', None)
+    if tables:
+        response_cache.invalidate(tables)
+
+
+@event.listens_for(Session, 'after_rollback')
+def forget_written_tables(session):
+    session.info.pop('written_tables', None)
+
+
+def read_versions(tables):
+    """Current (version, updated_at) of each table"""
+    rows = db.session.query(TableVersion.name, TableVersion.version, TableVersion.updated_at).filter(
+        TableVersion.name.in_(tables)
+    )
+    versions = {name: (version, updated_at) for name, version, updated_at in rows}
+    return {table: versions.get(table, (0, None)) for table in tables}
+
+
+def cached_response(*tables):
+    """Serve a GET view with ETag/Last-Modified validation and the response cache"""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            # Versions are read before the view runs, so a cached body is never older than its ETag
+            versions = read_versions(tables)
+            fingerprint = '|'.join([request.full_path] + [f'{table}:{versions[table][0]}' for table in tables])
+            etag = hashlib.sha1(fingerprint.encode('utf-8')).hexdigest()
+            modified = [updated_at for _, updated_at in versions.values() if updated_at]
+            last_modified = max(modified) if modified else None
+
+            if request.if_none_match.contains(etag):
+                # The client already has this version; skip rendering entirely
+                response = Response(status=304)
+            elif (entry := response_cache.get(request.full_path, etag)) is not None:
+                response = Response(entry['body'], mimetype=entry['mimetype'])
+            else:
+                response = view(*args, **kwargs)
+                if not isinstance(response, Response):
+                    return response
+                if response.status_code != 200:
+                    return response
+                if not response.is_streamed:
+                    response_cache.set(request.full_path, etag, tables, response.get_data(), response.mimetype)
+
+            response.set_etag(etag)
+            if last_modified:
+                response.last_modified = last_modified
+            response.cache_control.no_cache = True
+            return response.make_conditional(request)
+        return wrapper
+    return decorator
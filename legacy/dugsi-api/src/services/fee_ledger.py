@@ -0,0 +1,257 @@
+"""
+Fee ledger aggregates.
+
+fee_ledger_summary keeps billed, paid and outstanding totals per
+(due_date, fee_type, class_level). Mapper listeners fold every FeeRecord
+change into it inside the same flush, and set-based payment writes pass
+their changes to apply(), so finance reports read a few hundred summary
+rows instead of scanning fee_records. A fee counts towards the class it
+was billed to, stamped on the record when it is created, so moving a
+student to another class leaves their existing fees where they were. Aging buckets depend on the report
+date, so they are derived from due_date when the report is built.
+
+Pending fees past their due date are moved to Overdue by one set-based
+UPDATE (mark_overdue), run at most once a day per worker by the report
+endpoint and by `flask mark-overdue-fees`.
+"""
+
+import threading
+from collections import defaultdict
+from datetime import date
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import event
+from src.models.user import db
+from src.models.stats import FeeLedgerSummary
+from src.models.student import FeeRecord
+from src.database.bulk import increment_statement
+from src.database.routing import use_writer
+from src.services.stats import fee_balance, previous, track_previous
+from src.services.attendance_summary import student_classes
+from src.services.cache import bump, touch
+from src.services.jobs import job
+
+SUM_COLUMNS = ('records', 'open_records', 'billed', 'paid', 'outstanding')
+
+# (label, most days past due); the last bucket is open-ended. A fee due today is
+# current, matching report()'s overdue column and mark_overdue()'s due_date < today
+AGING_BUCKETS = (
+    ('current', 0),
+    ('0-30', 30),
+    ('31-60', 60),
+    ('61-90', 90),
+    ('90+', None),
+)
+
+overdue_checked = {'date': None}
+overdue_lock = threading.Lock()
+
+
+def ledger_values(amount, paid_amount, status):
+    """The summary columns one fee record contributes"""
+    balance = fee_balance(amount, paid_amount, status)
+    return {
+        'records': 1,
+        'open_records': int(status != 'Paid'),
+        'billed': amount or 0.0,
+        'paid': paid_amount or 0.0,
+        'outstanding': balance
+    }
+
+
+def apply(connection, changes):
+    """Fold (due_date, fee_type, class_level, old, new) changes into the summary.
+    
+    class_level is the one stamped on the fee record; old/new are (amount,
+    paid_amount, status) tuples, or None when the record did not exist before
+    or no longer exists.
+    """
+    deltas = defaultdict(lambda: dict.fromkeys(SUM_COLUMNS, 0))
+    for due_date, fee_type, class_level, old, new in changes:
+        totals = deltas[(due_date, fee_type, class_level or '')]
+        for values, sign in ((old, -1), (new, 1)):
+            if values is not None:
+                for column, value in ledger_values(*values).items():
+                    totals[column] += sign * value
+    
+    rows = [
+        dict(totals, due_date=due_date, fee_type=fee_type, class_level=class_level)
+        for (due_date, fee_type, class_level), totals in deltas.items() if any(totals.values())
+    ]
+    if rows:
+        connection.execute(increment_statement(
+            connection.dialect, FeeLedgerSummary.__table__, ['due_date', 'fee_type', 'class_level'], SUM_COLUMNS
+        ), rows)
+
+
+track_previous(FeeRecord.due_date, FeeRecord.fee_type, FeeRecord.class_level)
+
+
+@event.listens_for(FeeRecord, 'before_insert')
+def stamp_fee_class(mapper, connection, target):
+    if target.class_level is None:
+        target.class_level = student_classes(connection, [target.student_id]).get(target.student_id, ('', ''))[0]
+
+
+@event.listens_for(FeeRecord, 'after_insert')
+def fee_inserted(mapper, connection, target):
+    apply(connection, [(
+        target.due_date, target.fee_type, target.class_level, None,
+        (target.amount, target.paid_amount, target.status)
+    )])
+
+
+@event.listens_for(FeeRecord, 'after_update')
+def fee_updated(mapper, connection, target):
+    apply(connection, [
+        (
+            previous(target, 'due_date'), previous(target, 'fee_type'), previous(target, 'class_level'),
+            (previous(target, 'amount'), previous(target, 'paid_amount'), previous(target, 'status')), None
+        ),
+        (
+            target.due_date, target.fee_type, target.class_level, None,
+            (target.amount, target.paid_amount, target.status)
+        )
+    ])
+
+
+@event.listens_for(FeeRecord, 'after_delete')
+def fee_deleted(mapper, connection, target):
+    apply(connection, [(
+        target.due_date, target.fee_type, target.class_level,
+        (target.amount, target.paid_amount, target.status), None
+    )])
+
+
+def rebuild(connection):
+    """Recompute the summary from fee_records in one grouped pass; returns the number of rows"""
+    class_level = db.func.coalesce(FeeRecord.class_level, '')
+    paid_amount = db.func.coalesce(FeeRecord.paid_amount, 0.0)
+    is_open = FeeRecord.status != 'Paid'
+    rows = connection.execute(
+        db.select(
+            FeeRecord.due_date,
+            FeeRecord.fee_type,
+            class_level,
+            db.func.count(FeeRecord.id),
+            db.func.count(FeeRecord.id).filter(is_open),
+            db.func.coalesce(db.func.sum(FeeRecord.amount), 0.0),
+            db.func.coalesce(db.func.sum(paid_amount), 0.0),
+            db.func.coalesce(db.func.sum(FeeRecord.amount - paid_amount).filter(is_open), 0.0)
+        )
+        .group_by(FeeRecord.due_date, FeeRecord.fee_type, class_level)
+    ).all()
+    
+    connection.execute(FeeLedgerSummary.__table__.delete())
+    if rows:
+        connection.execute(FeeLedgerSummary.__table__.insert(), [
+            dict(zip(('due_date', 'fee_type', 'class_level') + SUM_COLUMNS, row)) for row in rows
+        ])
+    return len(rows)
+
+
+def mark_overdue(connection, today):
+    """Move Pending fees past their due date to Overdue; returns how many changed.
+    
+    The balance of a Pending and an Overdue fee is the same, so the dashboard
+    counters, rollups and ledger summary are unaffected.
+    """
+    result = connection.execute(FeeRecord.__table__.update().where(
+        FeeRecord.status == 'Pending', FeeRecord.due_date < today
+    ).values(status='Overdue'))
+    return result.rowcount
+
+
+def ensure_overdue_marked(today):
+    """Run mark_overdue() the first time it is needed each day in this worker"""
+    with overdue_lock:
+        if overdue_checked['date'] == today:
+            return 0
+        # Called from the fee report's GET handler, which otherwise reads through the read-only engine
+        use_writer(db.session)
+        changed = mark_overdue(db.session.connection(), today)
+        if changed:
+            touch(db.session, ['fee_records'])
+        db.session.commit()
+        overdue_checked['date'] = today
+        return changed
+
+
+def aging_bucket(days_overdue):
+    for label, max_days in AGING_BUCKETS:
+        if max_days is None or days_overdue <= max_days:
+            return label
+
+
+def report(as_of):
+    """Totals, aging buckets and per-class/per-fee-type breakdowns as of a date"""
+    rows = db.session.query(
+        FeeLedgerSummary.due_date, FeeLedgerSummary.fee_type, FeeLedgerSummary.class_level,
+        *[getattr(FeeLedgerSummary, column) for column in SUM_COLUMNS]
+    )
+    
+    totals = dict.fromkeys(SUM_COLUMNS, 0)
+    aging = {label: {'open_records': 0, 'outstanding': 0.0} for label, _ in AGING_BUCKETS}
+    by_class_level = defaultdict(lambda: dict.fromkeys(SUM_COLUMNS + ('overdue',), 0))
+    by_fee_type = defaultdict(lambda: dict.fromkeys(SUM_COLUMNS + ('overdue',), 0))
+    for due_date, fee_type, class_level, *values in rows:
+        values = dict(zip(SUM_COLUMNS, values))
+        if not any(values.values()):
+            continue
+        overdue = values['outstanding'] if due_date < as_of else 0.0
+        for group in (totals, by_class_level[class_level], by_fee_type[fee_type]):
+            for column, value in values.items():
+                group[column] += value
+        by_class_level[class_level]['overdue'] += overdue
+        by_fee_type[fee_type]['overdue'] += overdue
+        if values['open_records']:
+            bucket = aging[aging_bucket((as_of - due_date).days)]
+            bucket['open_records'] += values['open_records']
+            bucket['outstanding'] += values['outstanding']
+    
+    def rounded(values):
+        return {column: round(value, 2) if isinstance(value, float) else value for column, value in values.items()}
+    
+    return {
+        'as_of': as_of.isoformat(),
+        'totals': rounded(totals),
+        'aging': [dict(rounded(aging[label]), bucket=label) for label, _ in AGING_BUCKETS],
+        'by_class_level': [
+            dict(rounded(values), class_level=class_level or None) for class_level, values in sorted(by_class_level.items())
+        ],
+        'by_fee_type': [
+            dict(rounded(values), fee_type=fee_type) for fee_type, values in sorted(by_fee_type.items())
+        ]
+    }
+
+
+@job('fee_ledger.mark_overdue', api=True)
+def mark_all_overdue():
+    """Move Pending fees past their due date to Overdue; returns how many moved"""
+    with db.engine.begin() as connection:
+        changed = mark_overdue(connection, date.today())
+        if changed:
+            bump(connection, ['fee_records'])
+    return changed
+
+
+@job('fee_ledger.rebuild', api=True)
+def rebuild_all():
+    """Recompute fee_ledger_summary; returns the row count"""
+    with db.engine.begin() as connection:
+        return rebuild(connection)
+
+
+@click.command('mark-overdue-fees')
+@with_appcontext
+def mark_overdue_fees_command():
+    """Move Pending fees past their due date to Overdue."""
+    click.echo(f'{mark_all_overdue()} fees marked Overdue')
+
+
+@click.command('rebuild-fee-ledger')
+@with_appcontext
+def rebuild_fee_ledger_command():
+    """Recompute fee_ledger_summary from the fee records."""
+    click.echo(f'Rebuilt {rebuild_all()} fee ledger rows')
@@ -0,0 +1,210 @@
+"""
+Opt-in request instrumentation.
+
+With INSTRUMENTATION_ENABLED set, every request records how many SQL
+statements it ran and how long they took (from the engine's cursor
+events), answers with a Server-Timing header, and feeds per-blueprint
+latency histograms served in Prometheus text format at /metrics. The
+registry lives in each worker process, so scrape workers individually or
+aggregate in Prometheus. A statement run with N_PLUS_ONE_THRESHOLD or
+more distinct parameter sets in one request is logged as a likely N+1
+query; re-running it with the same parameters is not. Requests that exceed SLOW_REQUEST_MS are logged with their
+query breakdown. Statements a streamed body runs after the headers are
+sent are not in its Server-Timing header.
+
+With PROFILE_DIR set, a random PROFILE_SAMPLE_RATE share of requests is
+run under cProfile, or under pyinstrument when it is installed and
+PROFILER = 'pyinstrument', and the output is written to PROFILE_DIR.
+Profiling a request on demand with ?profile=1 writes files for anyone who
+can reach the API, so it is honoured only in debug mode or with
+PROFILE_ON_REQUEST set.
+"""
+
+import logging
+import os
+import random
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+
+from flask import Response, g, has_request_context, request
+from sqlalchemy import event
+
+# Prometheus' default latency buckets, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+logger = logging.getLogger(__name__)
+
+
+class MetricsRegistry:
+    """Thread-safe request counters and latency histograms, rendered as Prometheus text"""
+    
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.lock = threading.Lock()
+        self.requests = Counter()
+        self.histograms = defaultdict(lambda: {'counts': [0] * len(self.buckets), 'sum': 0.0, 'count': 0})
+        self.queries = Counter()
+        self.query_seconds = Counter()
+        self.n_plus_one = Counter()
+    
+    def observe(self, blueprint, method, status, seconds, queries, query_seconds, n_plus_one):
+        with self.lock:
+            self.requests[(blueprint, method, str(status))] += 1
+            histogram = self.histograms[(blueprint, method)]
+            for index, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    histogram['counts'][index] += 1
+            histogram['sum'] += seconds
+            histogram['count'] += 1
+            self.queries[blueprint] += queries
+            self.query_seconds[blueprint] += query_seconds
+            self.n_plus_one[blueprint] += n_plus_one
+    
+    def render(self):
+        lines = [
+            '# HELP dugsi_http_requests_total HTTP requests by blueprint, method and status.',
+            '# TYPE dugsi_http_requests_total counter',
+        ]
+        with self.lock:
+            for (blueprint, method, status), count in sorted(self.requests.items()):
+                lines.append(f'dugsi_http_requests_total{{blueprint="{blueprint}",method="{method}",status="{status}"}} {count}')
+            
+            lines += [
+                '# HELP dugsi_http_request_duration_seconds Request latency by blueprint and method.',
+                '# TYPE dugsi_http_request_duration_seconds histogram',
+            ]
+            for (blueprint, method), histogram in sorted(self.histograms.items()):
+                labels = f'blueprint="{blueprint}",method="{method}"'
+                for bound, count in zip(self.buckets, histogram['counts']):
+                    lines.append(f'dugsi_http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {count}')
+                lines.append(f'dugsi_http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {histogram["count"]}')
+                lines.append(f'dugsi_http_request_duration_seconds_sum{{{labels}}} {histogram["sum"]:.6f}')
+                lines.append(f'dugsi_http_request_duration_seconds_count{{{labels}}} {histogram["count"]}')
+            
+            for name, help_text, values, fmt in (
+                ('dugsi_db_queries_total', 'SQL statements executed by requests.', self.queries, '{}'),
+                ('dugsi_db_query_seconds_total', 'Time spent in SQL statements by requests.', self.query_seconds, '{:.6f}'),
+                ('dugsi_db_n_plus_one_total', 'Requests flagged for repeated statements.', self.n_plus_one, '{}'),
+            ):
+                lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+                for blueprint, value in sorted(values.items()):
+                    lines.append(f'{name}{{blueprint="{blueprint}"}} {fmt.format(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context() and 'query_stats' in g:
+        conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if not (has_request_context() and 'query_stats' in g) or not conn.info.get('query_started'):
+        return
+    elapsed = time.perf_counter() - conn.info['query_started'].pop()
+    stats = g.query_stats
+    stats['count'] += 1
+    stats['seconds'] += elapsed
+    # executemany batches are one round trip by design, so they never count towards N+1
+    if not executemany:
+        stats['statements'][statement].add(repr(parameters))
+    stats['timings'][statement] += elapsed
+
+
+def start_profiler(app):
+    """A started profiler for this request, or None when it is not being profiled"""
+    if not app.config.get('PROFILE_DIR'):
+        return None
+    requested = request.args.get('profile') == '1' and (app.debug or app.config.get('PROFILE_ON_REQUEST'))
+    sampled = random.random() < app.config.get('PROFILE_SAMPLE_RATE', 0.0)
+    if not (requested or sampled):
+        return None
+    if app.config.get('PROFILER') == 'pyinstrument':
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            logger.warning('PROFILER is pyinstrument but it is not installed; using cProfile')
+        else:
+            profiler = Profiler()
+            profiler.start()
+            return profiler
+    import cProfile
+    profiler = cProfile.Profile()
+    profiler.enable()
+    return profiler
+
+
+def save_profile(app, profiler):
+    """Stop the request's profiler and write its output to PROFILE_DIR; returns the file name"""
+    os.makedirs(app.config['PROFILE_DIR'], exist_ok=True)
+    endpoint = re.sub(r'[^A-Za-z0-9_.-]', '_', request.endpoint or 'unknown')
+    name = f"{datetime.utcnow().strftime('%Y%m%dT%H%M%S%f')}-{request.method}-{endpoint}"
+    if hasattr(profiler, 'dump_stats'):
+        profiler.disable()
+        name += '.prof'
+        profiler.dump_stats(os.path.join(app.config['PROFILE_DIR'], name))
+    else:
+        profiler.stop()
+        name += '.html'
+        with open(os.path.join(app.config['PROFILE_DIR'], name), 'w') as output:
+            output.write(profiler.output_html())
+    return name
+
+
+def init_app(app, engines):
+    """Install the instrumentation hooks when INSTRUMENTATION_ENABLED is set"""
+    if not app.config.get('INSTRUMENTATION_ENABLED'):
+        return
+    
+    for engine in engines:
+        event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', after_cursor_execute)
+    
+    @app.before_request
+    def start_request():
+        # statements maps each statement to the distinct parameter sets it ran with
+        g.query_stats = {'count': 0, 'seconds': 0.0, 'statements': defaultdict(set), 'timings': Counter()}
+        g.request_started = time.perf_counter()
+        g.profiler = start_profiler(app)
+    
+    @app.after_request
+    def finish_request(response):
+        if 'query_stats' not in g:
+            return response
+        if g.profiler is not None:
+            response.headers['X-Profile'] = save_profile(app, g.profiler)
+        elapsed = time.perf_counter() - g.request_started
+        stats = g.query_stats
+        threshold = app.config.get('N_PLUS_ONE_THRESHOLD', 10)
+        repeated = {
+            statement: len(parameters) for statement, parameters in stats['statements'].items()
+            if len(parameters) >= threshold
+        }
+        if repeated:
+            for statement, count in repeated.items():
+                logger.warning('Possible N+1 in %s %s: statement ran with %s different parameter sets: %s',
+                               request.method, request.path, count, ' '.join(statement.split())[:200])
+        if elapsed * 1000 >= app.config.get('SLOW_REQUEST_MS', 500):
+            slowest = stats['timings'].most_common(3)
+            logger.warning('Slow request %s %s: %.1f ms, %s queries in %.1f ms; slowest: %s',
+                           request.method, request.path, elapsed * 1000, stats['count'], stats['seconds'] * 1000,
+                           '; '.join(f"{seconds * 1000:.1f} ms {' '.join(statement.split())[:120]}" for statement, seconds in slowest))
+        
+        response.headers.add('Server-Timing', f'db;dur={stats["seconds"] * 1000:.2f};desc="{stats["count"]} queries"')
+        response.headers.add('Server-Timing', f'app;dur={elapsed * 1000:.2f}')
+        if request.endpoint != 'metrics':
+            registry.observe(
+                request.blueprint or 'app', request.method, response.status_code, elapsed,
+                stats['count'], stats['seconds'], int(bool(repeated))
+            )
+        return response
+    
+    def metrics():
+        return Response(registry.render(), mimetype='text/plain; version=0.0.4')
+    
+    app.add_url_rule('/metrics', 'metrics', metrics)
@@ -0,0 +1,281 @@
+"""
+Durable background jobs.
+
+submit() writes a row to the jobs table and commits, so a request can
+hand off slow work (announcement fan-out, roster imports, derived-table
+rebuilds) and answer 202 Accepted with the job's id at once; clients
+follow GET /api/jobs/<id> for the outcome. Job functions are registered
+by name with @job and receive the JSON payload as keyword arguments.
+
+Workers claim the oldest due job with a conditional UPDATE, so any number
+of threads and processes can share the table and each job is run by one
+of them. A failing job is retried with exponential backoff until
+max_attempts, except for ValueError, LookupError and TypeError, which
+mean bad input and fail at once. A job left running by a worker that died
+is requeued once JOB_LOCK_TIMEOUT_SECONDS has passed. Finished jobs are
+deleted after JOB_RETENTION_DAYS.
+
+Each web worker starts an in-process runner of JOB_WORKERS threads on
+first use (after gunicorn has forked it) when JOBS_RUN_IN_PROCESS is set;
+`flask run-jobs` runs the same loop as a separate process. With
+JOBS_INLINE set, submit() runs the job before it returns, which scripts
+and checks rely on.
+"""
+
+import json
+import logging
+import os
+import socket
+import threading
+import time
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from src.models.user import db
+from src.models.job import Job
+
+FINISHED_STATUSES = ('succeeded', 'failed')
+# Bad input or an unknown job; running it again cannot help
+PERMANENT_ERRORS = (ValueError, LookupError, TypeError)
+MAX_RETRY_DELAY_SECONDS = 3600
+
+JOBS = {}
+# Jobs that take no arguments and may be started through POST /api/jobs
+API_JOBS = set()
+
+logger = logging.getLogger(__name__)
+runner_lock = threading.Lock()
+runners = {}
+
+
+def job(name, api=False):
+    """Register the decorated function as the job called name"""
+    def register(function):
+        JOBS[name] = function
+        if api:
+            API_JOBS.add(name)
+        return function
+    return register
+
+
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}:{threading.current_thread().name}'[:100]
+
+
+def submit(name, max_attempts=None, **payload):
+    """Queue the job called name with payload as its arguments and commit; returns the Job"""
+    if name not in JOBS:
+        raise LookupError(f'No job named {name} is registered')
+    app = current_app._get_current_object()
+    queued = Job(
+        name=name,
+        payload=json.dumps(payload),
+        max_attempts=max_attempts or app.config['JOB_MAX_ATTEMPTS']
+    )
+    db.session.add(queued)
+    db.session.commit()
+
+    if app.config.get('JOBS_INLINE'):
+        if claim(worker_name(), queued.id):
+            execute(queued.id)
+    elif app.config.get('JOBS_RUN_IN_PROCESS'):
+        get_runner(app).wake()
+    return queued
+
+
+def claim(worker, job_id=None):
+    """Mark the next due job (or job_id) running for worker; returns its id, or None if another worker won"""
+    now = datetime.utcnow()
+    if job_id is None:
+        # Look before taking the write lock, so idle polling never blocks writers
+        job_id = db.session.execute(
+            db.select(Job.id).where(Job.status == 'queued', Job.run_after <= now)
+            .order_by(Job.run_after, Job.id).limit(1)
+        ).scalar()
+        if job_id is None:
+            db.session.rollback()
+            return None
+
+    result = db.session.execute(
+        Job.__table__.update().where(Job.id == job_id, Job.status == 'queued').values(
+            status='running', locked_by=worker, locked_at=now, started_at=now, attempts=Job.attempts + 1
+        )
+    )
+    db.session.commit()
+    return job_id if result.rowcount else None
+
+
+def retry_delay(attempts, base_seconds):
+    return min(base_seconds * 2 ** (attempts - 1), MAX_RETRY_DELAY_SECONDS)
+
+
+def execute(job_id):
+    """Run a claimed job and record its result, or schedule a retry when it fails"""
+    claimed = db.session.get(Job, job_id)
+    try:
+        function = JOBS.get(claimed.name)
+        if function is None:
+            raise LookupError(f'No job named {claimed.name} is registered')
+        result = function(**json.loads(claimed.payload or '{}'))
+    except Exception as e:
+        db.session.rollback()
+        record_failure(job_id, e)
+        return
+
+    claimed = db.session.get(Job, job_id)
+    claimed.status = 'succeeded'
+    claimed.result = json.dumps(result, default=str)
+    claimed.finished_at = datetime.utcnow()
+    db.session.commit()
+    logger.info('Job %s (%s) succeeded', job_id, claimed.name)
+
+
+def record_failure(job_id, error):
+    failed = db.session.get(Job, job_id)
+    failed.error = f'{type(error).__name__}: {error}'
+    if failed.attempts < failed.max_attempts and not isinstance(error, PERMANENT_ERRORS):
+        delay = retry_delay(failed.attempts, current_app.config['JOB_RETRY_SECONDS'])
+        failed.status = 'queued'
+        failed.run_after = datetime.utcnow() + timedelta(seconds=delay)
+        failed.locked_by = None
+        failed.locked_at = None
+        logger.warning('Job %s (%s) failed on attempt %s; retrying in %ss: %s',
+                       job_id, failed.name, failed.attempts, delay, failed.error)
+    else:
+        failed.status = 'failed'
+        failed.finished_at = datetime.utcnow()
+        logger.error('Job %s (%s) failed after %s attempts: %s', job_id, failed.name, failed.attempts, failed.error)
+    db.session.commit()
+
+
+def sweep(lock_timeout_seconds, retention_days):
+    """Requeue jobs whose worker died and delete old finished jobs; returns (requeued, deleted)"""
+    now = datetime.utcnow()
+    table = Job.__table__
+    stale = (Job.status == 'running', Job.locked_at < now - timedelta(seconds=lock_timeout_seconds))
+    expired = (Job.status.in_(FINISHED_STATUSES), Job.finished_at < now - timedelta(days=retention_days))
+    requeued = deleted = 0
+
+    if db.session.execute(db.select(Job.id).where(*stale).limit(1)).first():
+        db.session.execute(table.update().where(*stale, Job.attempts >= Job.max_attempts).values(
+            status='failed', finished_at=now, error='The worker stopped before the job finished'
+        ))
+        requeued = db.session.execute(table.update().where(*stale).values(
+            status='queued', locked_by=None, locked_at=None
+        )).rowcount
+    if db.session.execute(db.select(Job.id).where(*expired).limit(1)).first():
+        deleted = db.session.execute(table.delete().where(*expired)).rowcount
+    db.session.commit()
+    return requeued, deleted
+
+
+class JobRunner:
+    """Threads that claim and run due jobs until stopped (or, with exit_when_idle, until none is due)"""
+
+    def __init__(self, app, workers, exit_when_idle=False):
+        self.app = app
+        self.workers = workers
+        self.exit_when_idle = exit_when_idle
+        self.pid = os.getpid()
+        self.threads = []
+        self.wakeup = threading.Event()
+        self.stopping = threading.Event()
+        self.sweep_lock = threading.Lock()
+        self.last_sweep = 0.0
+
+    def start(self):
+        for number in range(self.workers):
+            thread = threading.Thread(target=self.loop, name=f'dugsi-job-{number}', daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        return self
+
+    def wake(self):
+        self.wakeup.set()
+
+    def stop(self):
+        """Stop claiming jobs and wait for the running ones to finish"""
+        self.stopping.set()
+        self.wakeup.set()
+        self.join()
+
+    def join(self):
+        for thread in self.threads:
+            thread.join()
+
+    def loop(self):
+        worker = worker_name()
+        while not self.stopping.is_set():
+            try:
+                ran = self.run_next(worker)
+            except Exception:
+                logger.exception('Job worker %s failed', worker)
+                ran = False
+            if ran:
+                continue
+            if self.exit_when_idle:
+                return
+            self.wakeup.wait(self.app.config['JOB_POLL_SECONDS'])
+            self.wakeup.clear()
+
+    def run_next(self, worker):
+        """Claim and run one due job; returns False when there was none"""
+        with self.app.app_context():
+            self.maybe_sweep()
+            job_id = claim(worker)
+            if job_id is None:
+                return False
+            execute(job_id)
+            return True
+
+    def maybe_sweep(self):
+        config = self.app.config
+        with self.sweep_lock:
+            if time.monotonic() - self.last_sweep < config['JOB_SWEEP_SECONDS']:
+                return
+            self.last_sweep = time.monotonic()
+        requeued, deleted = sweep(config['JOB_LOCK_TIMEOUT_SECONDS'], config['JOB_RETENTION_DAYS'])
+        if requeued or deleted:
+            logger.info('Requeued %s abandoned jobs and deleted %s finished jobs', requeued, deleted)
+
+
+def get_runner(app):
+    """This process's in-process runner, started on first use"""
+    runner = runners.get(app)
+    if runner is not None and runner.pid == os.getpid():
+        return runner
+    with runner_lock:
+        runner = runners.get(app)
+        # A runner inherited through fork has no threads in this process
+        if runner is None or runner.pid != os.getpid():
+            runner = runners[app] = JobRunner(app, app.config['JOB_WORKERS']).start()
+        return runner
+
+
+def init_app(app):
+    """Start the in-process runner with the first request when JOBS_RUN_IN_PROCESS is set"""
+    if not app.config.get('JOBS_RUN_IN_PROCESS') or app.config.get('JOBS_INLINE'):
+        return
+
+    # Picks up jobs queued before this worker started, not just the ones it submits
+    @app.before_request
+    def start_job_runner():
+        get_runner(app)
+
+
+@click.command('run-jobs')
+@click.option('--workers', type=int, help='Worker threads; defaults to JOB_WORKERS')
+@click.option('--drain', is_flag=True, help='Exit once no job is due instead of waiting for more')
+@with_appcontext
+def run_jobs_command(workers, drain):
+    """Run queued background jobs in this process."""
+    app = current_app._get_current_object()
+    runner = JobRunner(app, workers or app.config['JOB_WORKERS'], exit_when_idle=drain).start()
+    click.echo(f'Running jobs with {runner.workers} worker threads')
+    try:
+        runner.join()
+    except KeyboardInterrupt:
+        click.echo('Stopping once the running jobs finish')
+        runner.stop()
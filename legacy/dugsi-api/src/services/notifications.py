@@ -0,0 +1,95 @@
+"""
+Announcement fan-out.
+
+Publishing an announcement creates one Notification per recipient. The
+audience is resolved by a single query over users and the notifications
+are written by one INSERT ... SELECT, so publishing to thousands of
+parents is one statement rather than thousands of ORM flushes. The
+statement skips users who already have the announcement's notification,
+so running the fan-out again (or after an edit widens the audience) only
+adds the missing rows. Fan-out runs as a background job; publish()
+returns as soon as the announcement and its job are saved.
+"""
+
+import logging
+from datetime import datetime
+
+from src.models.user import db, User
+from src.models.student import Student
+from src.models.communication import Announcement, Notification
+from src.services.jobs import job, submit
+from src.services.cache import touch
+
+# target_audience -> user role; 'all' and 'specific_class' are resolved separately
+AUDIENCE_ROLES = {'parents': 'parent', 'teachers': 'teacher', 'students': 'student'}
+AUDIENCES = ('all', 'specific_class') + tuple(AUDIENCE_ROLES)
+
+logger = logging.getLogger(__name__)
+
+
+def validate_audience(target_audience, target_class_level):
+    if target_audience not in AUDIENCES:
+        raise ValueError(f"target_audience must be one of {', '.join(AUDIENCES)}")
+    if target_audience == 'specific_class' and not target_class_level:
+        raise ValueError('target_class_level is required for specific_class announcements')
+
+
+def audience_filter(announcement):
+    """WHERE clause over users selecting the announcement's recipients"""
+    criteria = [User.is_active.is_(True)]
+    if announcement.target_audience in AUDIENCE_ROLES:
+        criteria.append(User.role == AUDIENCE_ROLES[announcement.target_audience])
+    elif announcement.target_audience == 'specific_class':
+        # Parents are linked to their children through the guardian email on the student record
+        criteria.append(User.role == 'parent')
+        criteria.append(User.email.in_(db.select(Student.guardian_email).where(
+            Student.class_level == announcement.target_class_level, Student.status == 'Active'
+        )))
+    return db.and_(*criteria)
+
+
+@job('announcements.fan_out')
+def fan_out(announcement_id):
+    """Create the announcement's missing notifications; returns how many were added"""
+    announcement = db.session.get(Announcement, announcement_id)
+    if announcement is None or announcement.status != 'published':
+        return 0
+
+    already_notified = db.select(Notification.id).where(
+        Notification.user_id == User.id,
+        Notification.notification_type == 'announcement',
+        Notification.related_id == announcement.id
+    ).exists()
+    recipients = db.select(
+        User.id,
+        db.literal(announcement.title),
+        db.literal(announcement.content),
+        db.literal('announcement'),
+        db.literal(announcement.id),
+        db.literal(False),
+        db.literal(f'/announcements/{announcement.id}'),
+        db.literal(datetime.utcnow())
+    ).where(audience_filter(announcement), ~already_notified)
+
+    result = db.session.execute(Notification.__table__.insert().from_select(
+        ['user_id', 'title', 'message', 'notification_type', 'related_id', 'is_read', 'action_url', 'created_at'],
+        recipients
+    ))
+    if result.rowcount:
+        touch(db.session, ['notifications'])
+    db.session.commit()
+    logger.info('Announcement %s fanned out to %s users', announcement.id, result.rowcount)
+    return result.rowcount
+
+
+def publish(announcement):
+    """Mark an announcement published and queue its fan-out; returns the fan-out Job"""
+    announcement.status = 'published'
+    announcement.publish_date = announcement.publish_date or datetime.utcnow()
+    return submit('announcements.fan_out', announcement_id=announcement.id)
+
+
+def notified_count(announcement_id):
+    return db.session.query(db.func.count(Notification.id)).filter(
+        Notification.notification_type == 'announcement', Notification.related_id == announcement_id
+    ).scalar()
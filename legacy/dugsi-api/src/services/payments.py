@@ -0,0 +1,160 @@
+"""
+Batch fee payment posting.
+
+A statement's payments are validated, checked against the references
+already posted and the balances of the fees they pay, and then written as
+one executemany UPDATE of fee_records plus one INSERT into fee_payments,
+in a single transaction. The fees are read under the write lock (BEGIN
+IMMEDIATE on SQLite, SELECT ... FOR UPDATE on PostgreSQL), so concurrent
+batches paying the same fee apply one after the other instead of both
+adding to the same stale balance. The unique reference makes reposting a
+statement harmless: lines whose reference is already recorded are
+reported as duplicates and skipped.
+"""
+
+from collections import Counter
+from datetime import datetime, date
+
+from sqlalchemy import bindparam
+from src.models.user import db
+from src.models.student import FeeRecord, FeePayment
+from src.database.sqlite import begin_immediate
+from src.services import stats, rollups, fee_ledger
+from src.services.cache import touch
+
+MAX_BATCH_PAYMENTS = 5000
+# Rounding slack: a fee within a cent of fully paid counts as settled
+BALANCE_TOLERANCE = 0.01
+
+
+def parse_payment(line, defaults):
+    """Validate one statement line; returns (payment, error)"""
+    try:
+        payment = {
+            'fee_record_id': int(line['fee_record_id']),
+            'amount': round(float(line['amount']), 2),
+            'reference': str(line.get('reference') or '').strip(),
+            'payment_method': line.get('payment_method') or defaults.get('payment_method'),
+            'notes': line.get('notes')
+        }
+        payment_date = line.get('payment_date') or defaults.get('payment_date')
+        payment['payment_date'] = datetime.strptime(payment_date, '%Y-%m-%d').date() if payment_date else date.today()
+    except KeyError as e:
+        return None, f'{e.args[0]} is required'
+    except (TypeError, ValueError) as e:
+        return None, str(e)
+    if not payment['reference']:
+        return None, 'reference is required'
+    if payment['amount'] <= 0:
+        return None, 'amount must be positive'
+    return payment, None
+
+
+def post_payments(lines, defaults=None):
+    """Apply a batch of payment lines in one transaction; returns the posting report"""
+    if not isinstance(lines, list):
+        raise ValueError('payments must be a list')
+    if len(lines) > MAX_BATCH_PAYMENTS:
+        raise ValueError(f'At most {MAX_BATCH_PAYMENTS} payments per batch')
+    defaults = defaults or {}
+    
+    report = {'applied': 0, 'amount_applied': 0.0, 'duplicates': [], 'rejected': []}
+    payments = []
+    seen = set()
+    for index, line in enumerate(lines):
+        line = line if isinstance(line, dict) else {}
+        payment, error = parse_payment(line, defaults)
+        if error:
+            report['rejected'].append({'index': index, 'reference': line.get('reference'), 'error': error})
+        elif payment['reference'] in seen:
+            report['duplicates'].append(payment['reference'])
+        else:
+            seen.add(payment['reference'])
+            payments.append((index, payment))
+    
+    # Hold the write lock from the first read, so the balances below stay current until commit
+    begin_immediate(db.session.connection())
+    
+    # One query for references already posted and one for the fees being paid
+    posted = set(db.session.execute(db.select(FeePayment.reference).where(
+        FeePayment.reference.in_([payment['reference'] for _, payment in payments])
+    )).scalars())
+    fees = {
+        fee.id: fee for fee in db.session.execute(db.select(
+            FeeRecord.id, FeeRecord.student_id, FeeRecord.fee_type, FeeRecord.due_date, FeeRecord.class_level,
+            FeeRecord.amount, FeeRecord.paid_amount, FeeRecord.status
+        ).where(FeeRecord.id.in_({payment['fee_record_id'] for _, payment in payments})).with_for_update())
+    }
+    
+    # Running state per fee, so several lines may pay the same fee
+    updates = {}
+    inserts = []
+    for index, payment in payments:
+        if payment['reference'] in posted:
+            report['duplicates'].append(payment['reference'])
+            continue
+        fee = fees.get(payment['fee_record_id'])
+        if fee is None:
+            report['rejected'].append({'index': index, 'reference': payment['reference'], 'error': 'Fee record not found'})
+            continue
+        current = updates.get(fee.id, {'paid_amount': fee.paid_amount or 0.0, 'status': fee.status})
+        balance = stats.fee_balance(fee.amount, current['paid_amount'], current['status'])
+        if payment['amount'] > balance + BALANCE_TOLERANCE:
+            report['rejected'].append({
+                'index': index, 'reference': payment['reference'],
+                'error': f'Payment of {payment["amount"]:.2f} exceeds the outstanding balance of {balance:.2f}'
+            })
+            continue
+        
+        paid_amount = round(current['paid_amount'] + payment['amount'], 2)
+        updates[fee.id] = {
+            'key': fee.id,
+            'old_paid_amount': fee.paid_amount or 0.0,
+            'paid_amount': paid_amount,
+            'payment_date': payment['payment_date'],
+            'payment_method': payment['payment_method'],
+            'status': 'Paid' if paid_amount >= fee.amount - BALANCE_TOLERANCE else current['status']
+        }
+        inserts.append(dict(payment, created_at=datetime.utcnow()))
+        report['applied'] += 1
+        report['amount_applied'] += payment['amount']
+    
+    if updates:
+        # Only rows still holding the balance read above change, so every delta below describes a real write
+        result = db.session.execute(FeeRecord.__table__.update().where(
+            FeeRecord.id == bindparam('key'),
+            db.func.coalesce(FeeRecord.paid_amount, 0.0) == bindparam('old_paid_amount')
+        ).values(
+            paid_amount=bindparam('paid_amount'),
+            payment_date=bindparam('payment_date'),
+            payment_method=bindparam('payment_method'),
+            status=bindparam('status')
+        ), list(updates.values()))
+        if result.context.dialect.supports_sane_multi_rowcount and result.rowcount != len(updates):
+            raise RuntimeError('Fee records changed while the payments were being posted; nothing was applied')
+        db.session.execute(FeePayment.__table__.insert(), inserts)
+        
+        # The UPDATE bypasses the ORM listeners, so bring the derived data along here
+        changes = [
+            (
+                fees[fee_id].due_date, fees[fee_id].fee_type, fees[fee_id].class_level,
+                (fees[fee_id].amount, fees[fee_id].paid_amount, fees[fee_id].status),
+                (fees[fee_id].amount, update['paid_amount'], update['status'])
+            )
+            for fee_id, update in updates.items()
+        ]
+        stats.adjust(db.session.connection(), {stats.FEES_OUTSTANDING: sum(
+            stats.fee_balance(*new) - stats.fee_balance(*old) for *_, old, new in changes
+        )})
+        fee_ledger.apply(db.session.connection(), changes)
+        rollups.refresh_students(
+            db.session, {fees[fee_id].student_id for fee_id in updates}, ['outstanding_fees']
+        )
+        touch(db.session, ['fee_records', 'fee_payments'])
+    db.session.commit()
+    
+    report['amount_applied'] = round(report['amount_applied'], 2)
+    report['rejected'].sort(key=lambda rejection: rejection['index'])
+    report['fees_updated'] = len(updates)
+    report['statuses'] = dict(Counter(update['status'] for update in updates.values()))
+    return report
@@ -0,0 +1,177 @@
+"""
+Per-student rollups.
+
+Student.attendance_rate, quran_progress and outstanding_fees summarise the
+student's attendance, progress and fee records so roster views can show
+them without an aggregate query per student. Mapper listeners note which
+students an ORM flush touched and their rollups are recomputed at the end
+of that flush; set-based writes call refresh_students() themselves.
+`flask recompute-rollups` recomputes every student.
+"""
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import bindparam, event
+from sqlalchemy.orm import Session, object_session
+from src.models.user import db
+from src.models.student import Student, AttendanceRecord, ProgressRecord, FeeRecord
+from src.services.cache import bump, touch
+from src.services.jobs import job
+from src.services.stats import previous, track_previous
+
+# Students aggregated per query; keeps IN lists well under SQLite's variable limit
+ROLLUP_CHUNK_SIZE = 500
+
+
+def chunks(values, size=ROLLUP_CHUNK_SIZE):
+    values = sorted(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def attendance_rates(connection, student_ids):
+    """Percentage of marked days the student was Present, like the dashboard's rate"""
+    rows = connection.execute(db.select(
+        AttendanceRecord.student_id,
+        db.func.count(AttendanceRecord.id),
+        db.func.count(AttendanceRecord.id).filter(AttendanceRecord.status == 'Present')
+    ).where(AttendanceRecord.student_id.in_(student_ids)).group_by(AttendanceRecord.student_id))
+    return {student_id: round(present / marked * 100, 1) for student_id, marked, present in rows if marked}
+
+
+def quran_progress(connection, student_ids):
+    """The most recent Quran assessment is the student's current progress"""
+    rows = connection.execute(db.select(ProgressRecord.student_id, ProgressRecord.progress_percentage).where(
+        ProgressRecord.student_id.in_(student_ids), ProgressRecord.subject == 'Quran'
+    ).order_by(ProgressRecord.student_id, ProgressRecord.assessment_date, ProgressRecord.id))
+    return {student_id: round(percentage or 0.0, 1) for student_id, percentage in rows}
+
+
+def outstanding_fees(connection, student_ids):
+    """Same definition as the dashboard's fees_outstanding counter"""
+    rows = connection.execute(db.select(
+        FeeRecord.student_id, db.func.sum(FeeRecord.amount - FeeRecord.paid_amount)
+    ).where(
+        FeeRecord.student_id.in_(student_ids), FeeRecord.status != 'Paid'
+    ).group_by(FeeRecord.student_id))
+    return {student_id: round(outstanding or 0.0, 2) for student_id, outstanding in rows}
+
+
+# Student column -> aggregate over the records it summarises
+ROLLUPS = {
+    'attendance_rate': attendance_rates,
+    'quran_progress': quran_progress,
+    'outstanding_fees': outstanding_fees,
+}
+# Which rollup each record type feeds
+ROLLUP_SOURCES = {
+    AttendanceRecord: 'attendance_rate',
+    ProgressRecord: 'quran_progress',
+    FeeRecord: 'outstanding_fees',
+}
+
+
+def refresh(connection, student_ids=None, columns=tuple(ROLLUPS)):
+    """Recompute rollup columns for the given students (all when None); returns how many changed"""
+    if student_ids is None:
+        student_ids = connection.execute(db.select(Student.id)).scalars().all()
+    # Derived numbers, not an edit: keep updated_at rather than letting its onupdate fire
+    statement = Student.__table__.update().where(Student.id == bindparam('key')).values(
+        dict({column: bindparam(column) for column in columns}, updated_at=Student.__table__.c.updated_at)
+    )
+    changed = 0
+    for chunk in chunks(student_ids):
+        current = connection.execute(
+            db.select(Student.id, *[getattr(Student, column) for column in columns]).where(Student.id.in_(chunk))
+        ).all()
+        computed = {column: ROLLUPS[column](connection, chunk) for column in columns}
+        rows = []
+        for row in current:
+            values = {column: computed[column].get(row.id, 0.0) for column in columns}
+            # Only write students whose numbers actually moved
+            if any(getattr(row, column) != value for column, value in values.items()):
+                rows.append(dict(values, key=row.id))
+        if rows:
+            connection.execute(statement, rows)
+            changed += len(rows)
+    return changed
+
+
+def stale(connection):
+    """Whether any student's rollups contradict their records, as on databases that predate them"""
+    has_present = db.select(AttendanceRecord.id).where(
+        AttendanceRecord.student_id == Student.id, AttendanceRecord.status == 'Present'
+    ).exists()
+    has_progress = db.select(ProgressRecord.id).where(
+        ProgressRecord.student_id == Student.id, ProgressRecord.subject == 'Quran', ProgressRecord.progress_percentage > 0
+    ).exists()
+    has_balance = db.select(FeeRecord.id).where(
+        FeeRecord.student_id == Student.id, FeeRecord.status != 'Paid', FeeRecord.amount > FeeRecord.paid_amount
+    ).exists()
+    return connection.execute(db.select(Student.id).where(db.or_(
+        db.and_(db.func.coalesce(Student.attendance_rate, 0) == 0, has_present),
+        db.and_(db.func.coalesce(Student.quran_progress, 0) == 0, has_progress),
+        db.and_(db.func.coalesce(Student.outstanding_fees, 0) == 0, has_balance)
+    )).limit(1)).first() is not None
+
+
+def refresh_students(session, student_ids, columns=tuple(ROLLUPS)):
+    """Recompute rollups inside the session's transaction after a set-based write"""
+    if student_ids and refresh(session.connection(), student_ids, columns):
+        touch(session, ['students'])
+
+
+def mark_student(target, *student_ids):
+    """Queue students for a rollup refresh at the end of the current flush"""
+    pending = object_session(target).info.setdefault('rollup_students', {})
+    column = ROLLUP_SOURCES[type(target)]
+    pending.setdefault(column, set()).update(student_id for student_id in student_ids if student_id is not None)
+
+
+def record_inserted(mapper, connection, target):
+    mark_student(target, target.student_id)
+
+
+def record_updated(mapper, connection, target):
+    mark_student(target, previous(target, 'student_id'), target.student_id)
+
+
+def record_deleted(mapper, connection, target):
+    mark_student(target, target.student_id)
+
+
+for model in ROLLUP_SOURCES:
+    track_previous(model.student_id)
+    event.listen(model, 'after_insert', record_inserted)
+    event.listen(model, 'after_update', record_updated)
+    event.listen(model, 'after_delete', record_deleted)
+
+
+@event.listens_for(Session, 'after_flush')
+def refresh_flushed_students(session, flush_context):
+    pending = session.info.pop('rollup_students', None)
+    for column, student_ids in (pending or {}).items():
+        refresh_students(session, student_ids, (column,))
+
+
+@event.listens_for(Session, 'after_rollback')
+def forget_flushed_students(session):
+    session.info.pop('rollup_students', None)
+
+
+@job('rollups.recompute', api=True)
+def recompute_all():
+    """Recompute every student's rollups; returns how many students changed"""
+    with db.engine.begin() as connection:
+        changed = refresh(connection)
+        if changed:
+            bump(connection, ['students'])
+    return changed
+
+
+@click.command('recompute-rollups')
+@with_appcontext
+def recompute_rollups_command():
+    """Recompute every student's attendance, Quran progress and fee rollups."""
+    changed = recompute_all()
+    click.echo(f'Recomputed rollups; {changed} students changed')
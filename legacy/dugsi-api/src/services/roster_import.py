@@ -0,0 +1,257 @@
+"""
+Streaming roster import.
+
+Rows are read one at a time from an uploaded CSV (or XLSX, when openpyxl
+is installed), validated, and upserted by student_id in batches of
+IMPORT_BATCH_SIZE, one transaction per batch. Only the columns present in
+the file are written, so a sheet with just student_id and class_level
+moves students between classes without touching anything else; a blank
+cell likewise keeps the student's current value. Invalid rows, and rows
+repeating a student_id seen earlier in the file, are skipped and reported
+with their row number. A batch the database rejects is rolled back and its
+rows reported while earlier batches stay imported, so the report always
+says which rows made it. Large rosters can be queued as the
+students.import_roster background job instead.
+"""
+
+import base64
+import csv
+import io
+from datetime import date, datetime
+
+from sqlalchemy import bindparam
+from sqlalchemy.exc import SQLAlchemyError
+
+from src.models.user import db
+from src.models.student import Student
+from src.database.bulk import insert_for
+from src.database.sqlite import begin_immediate
+from src.services import stats
+from src.services.cache import touch
+from src.services.jobs import job
+
+IMPORT_BATCH_SIZE = 2000
+MAX_REPORTED_ERRORS = 1000
+
+REQUIRED_COLUMNS = ('student_id',)
+# Needed to create a student, so it may only be left out when every row already exists
+NEW_STUDENT_COLUMNS = ('english_name',)
+IMPORT_COLUMNS = (
+    'student_id', 'english_name', 'arabic_name', 'date_of_birth', 'gender', 'class_level',
+    'year_group', 'enrollment_date', 'status', 'phone', 'email', 'address', 'guardian_name',
+    'guardian_phone', 'guardian_email', 'guardian_relationship'
+)
+DATE_COLUMNS = ('date_of_birth', 'enrollment_date')
+# Python-side model defaults, which executemany rows carrying None would otherwise skip
+NEW_STUDENT_DEFAULTS = {'status': 'Active', 'enrollment_date': lambda: datetime.utcnow().date()}
+
+
+class RosterImportError(ValueError):
+    """The upload as a whole cannot be imported"""
+
+
+def normalize_header(name):
+    return (name or '').strip().lower().replace(' ', '_').replace('-', '_')
+
+
+def csv_rows(stream):
+    """(header, rows) for a binary CSV stream; rows are read one line at a time"""
+    reader = csv.reader(io.TextIOWrapper(stream, encoding='utf-8-sig', newline=''))
+    header = next(reader, None)
+    if header is None:
+        raise RosterImportError('The file is empty')
+    return header, reader
+
+
+def xlsx_rows(stream):
+    """(header, rows) for the first worksheet of an XLSX upload"""
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise RosterImportError('Excel import requires openpyxl; upload a CSV instead')
+    workbook = load_workbook(stream, read_only=True, data_only=True)
+    rows = workbook.worksheets[0].iter_rows(values_only=True)
+    header = next(rows, None)
+    if header is None:
+        raise RosterImportError('The worksheet is empty')
+    header = [str(cell) if cell is not None else '' for cell in header]
+    return header, ([cell if cell is not None else '' for cell in values] for values in rows)
+
+
+def parse_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    value = str(value)
+    # fromisoformat is much faster than strptime but also takes other ISO 8601 forms
+    if len(value) != 10:
+        raise ValueError(value)
+    return date.fromisoformat(value)
+
+
+def parse_row(columns, values):
+    """Validate one row; returns (record, errors); blank cells are None"""
+    record, errors = {}, []
+    for column, value in zip(columns, values):
+        if column is None:
+            continue
+        if value.__class__ is str:
+            value = value.strip() or None
+        elif value == '':
+            value = None
+        if value is None:
+            record[column] = None
+        elif column in DATE_COLUMNS:
+            try:
+                record[column] = parse_date(value)
+            except ValueError:
+                errors.append(f'{column} must be a YYYY-MM-DD date')
+        else:
+            record[column] = value if value.__class__ is str else str(value)
+    for column in REQUIRED_COLUMNS:
+        if column in record and not record[column]:
+            errors.append(f'{column} is required')
+    if 'student_id' not in record:
+        errors.append('student_id is required')
+    return record, errors
+
+
+def upsert_batch(batch, columns):
+    """Upsert one batch of {student_id: (row number, record)}; returns (created, updated, rejected)"""
+    # Hold the write lock from the lookup on, so the counter deltas match what the upsert overwrites
+    begin_immediate(db.session.connection())
+    existing = dict(db.session.execute(db.select(Student.student_id, Student.status).where(
+        Student.student_id.in_(list(batch))
+    )).all())
+    rejected, records = [], {}
+    for student_id, (line_number, record) in batch.items():
+        # A blank cell keeps an existing student's value, but a new student has none to keep
+        needed = [column for column in NEW_STUDENT_COLUMNS if not record.get(column)]
+        if student_id in existing or not needed:
+            records[student_id] = record
+        else:
+            rejected.append((line_number, student_id, [f"{', '.join(needed)} is required for a new student"]))
+    if not records:
+        return 0, 0, rejected
+    
+    now = datetime.utcnow()
+    table = Student.__table__
+    update_columns = [column for column in columns if column != 'student_id']
+    # NULL (a blank cell) keeps the current value
+    kept = {column: db.func.coalesce(bindparam(column), table.c[column]) for column in update_columns}
+    updates = [dict(record, key=student_id, updated_at=now) for student_id, record in records.items() if student_id in existing]
+    if updates:
+        # Not an upsert: its insert half would fail the NOT NULL check on a blank english_name
+        statement = table.update().where(table.c.student_id == bindparam('key')).values(
+            dict(kept, updated_at=bindparam('updated_at'))
+        )
+        db.session.execute(statement, updates)
+    defaults = {column: default() if callable(default) else default for column, default in NEW_STUDENT_DEFAULTS.items()}
+    inserts = []
+    for student_id, record in records.items():
+        if student_id not in existing:
+            row = dict(record, created_at=now, updated_at=now)
+            for column, default in defaults.items():
+                if row.get(column) is None:
+                    row[column] = default
+            inserts.append(row)
+    if inserts:
+        # Defaults may add columns a row did not have; executemany needs the same keys on every row
+        keys = set().union(*inserts)
+        inserts = [dict.fromkeys(keys) | row for row in inserts]
+        # Still an upsert, for a student another import created after the lookup (SQLite's lock rules that out)
+        statement = insert_for(db.session.get_bind().dialect, table)
+        db.session.execute(statement.on_conflict_do_update(index_elements=['student_id'], set_={
+            **{column: db.func.coalesce(statement.excluded[column], table.c[column]) for column in update_columns},
+            'updated_at': statement.excluded.updated_at
+        }), inserts)
+    
+    # These writes bypass the ORM listeners, so report the changes to the counters here:
+    # a blank status kept the old one, and new students without one got the default
+    changes = []
+    for student_id, record in records.items():
+        if student_id in existing:
+            changes.append((existing[student_id], record.get('status') or existing[student_id]))
+        else:
+            changes.append((None, record.get('status') or NEW_STUDENT_DEFAULTS['status']))
+    stats.adjust(db.session.connection(), stats.student_deltas(changes))
+    touch(db.session, ['students'])
+    db.session.commit()
+    
+    updated = len(existing)
+    return len(records) - updated, updated, rejected
+
+
+def import_students(header, rows):
+    """Import rows under a header row; returns the per-row report"""
+    header_columns = [normalize_header(name) for name in header]
+    missing = [column for column in REQUIRED_COLUMNS if column not in header_columns]
+    if missing:
+        raise RosterImportError(f"Missing required column(s): {', '.join(missing)}")
+    columns = [column if column in IMPORT_COLUMNS else None for column in header_columns]
+    written_columns = [column for column in columns if column]
+    
+    report = {
+        'processed': 0,
+        'created': 0,
+        'updated': 0,
+        'failed': 0,
+        'ignored_columns': [name for name, column in zip(header, columns) if column is None],
+        'errors': []
+    }
+    batch = {}
+    # Row each student_id first appeared on; later rows for it are rejected
+    seen = {}
+    
+    def reject(line_number, student_id, errors):
+        report['failed'] += 1
+        if len(report['errors']) < MAX_REPORTED_ERRORS:
+            report['errors'].append({'row': line_number, 'student_id': student_id, 'errors': errors})
+    
+    def flush():
+        try:
+            created, updated, rejected = upsert_batch(batch, written_columns)
+        except SQLAlchemyError as e:
+            # Earlier batches stay committed; report this one's rows as not imported and carry on
+            db.session.rollback()
+            first_row = min(line_number for line_number, _ in batch.values())
+            error = f'Not imported: the batch starting at row {first_row} failed ({getattr(e, "orig", None) or e})'
+            created, updated = 0, 0
+            rejected = [(line_number, student_id, [error]) for student_id, (line_number, _) in batch.items()]
+        report['created'] += created
+        report['updated'] += updated
+        for line_number, student_id, errors in rejected:
+            reject(line_number, student_id, errors)
+        batch.clear()
+    
+    for line_number, values in enumerate(rows, start=2):
+        if not any(str(value).strip() for value in values):
+            continue
+        
+        report['processed'] += 1
+        record, errors = parse_row(columns, values)
+        if errors:
+            reject(line_number, record.get('student_id'), errors)
+            continue
+        
+        student_id = record['student_id']
+        if student_id in seen:
+            reject(line_number, student_id, [f'student_id {student_id} already appears on row {seen[student_id]}'])
+            continue
+        seen[student_id] = line_number
+        
+        # executemany needs the same keys on every row
+        batch[student_id] = (line_number, {column: record.get(column) for column in written_columns})
+        if len(batch) >= IMPORT_BATCH_SIZE:
+            flush()
+    
+    if batch:
+        flush()
+    return report
+
+
+@job('students.import_roster')
+def import_roster_job(content, file_format):
+    """Import a base64-encoded CSV or XLSX roster; returns the per-row report"""
+    stream = io.BytesIO(base64.b64decode(content))
+    header, rows = xlsx_rows(stream) if file_format == 'xlsx' else csv_rows(stream)
+    return import_students(header, rows)
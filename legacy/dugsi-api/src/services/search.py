@@ -0,0 +1,127 @@
+"""
+Student search backed by an SQLite FTS5 index.
+
+students_fts holds a normalized copy of the searchable student columns,
+keyed by students.id and kept in sync by triggers, so every writer (ORM,
+bulk upserts, imports) updates it. Text is normalized by the
+dugsi_normalize() SQL function, registered on every SQLite connection:
+case folding, Arabic diacritics and tatweel removed, and letter variants
+(alef forms, taa marbuta, alef maqsura, hamza carriers) folded together.
+Searches match every term as a prefix and are ordered by bm25 rank.
+"""
+
+import re
+import sqlite3
+
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+from src.models.user import db
+from src.models.student import Student
+
+SEARCH_COLUMNS = ('english_name', 'arabic_name', 'student_id', 'guardian_name')
+
+ARABIC_DIACRITICS = re.compile('[\u0610-\u061a\u064b-\u065f\u0670\u06d6-\u06ed\u0640]')
+ARABIC_LETTER_VARIANTS = str.maketrans({
+    'أ': 'ا',  # alef with hamza above
+    'إ': 'ا',  # alef with hamza below
+    'آ': 'ا',  # alef with madda
+    'ٱ': 'ا',  # alef wasla
+    'ة': 'ه',  # taa marbuta -> haa
+    'ى': 'ي',  # alef maqsura -> yaa
+    'ؤ': 'و',  # waw with hamza
+    'ئ': 'ي',  # yaa with hamza
+})
+SEARCH_TERM = re.compile(r'\w+')
+
+
+def normalize_text(value):
+    """Fold case and Arabic spelling variants so searches match either form"""
+    if value is None:
+        return None
+    return ARABIC_DIACRITICS.sub('', value).translate(ARABIC_LETTER_VARIANTS).casefold()
+
+
+@event.listens_for(Engine, 'connect')
+def register_sql_functions(dbapi_connection, connection_record):
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        dbapi_connection.create_function('dugsi_normalize', 1, normalize_text, deterministic=True)
+
+
+def normalized_values(prefix):
+    """SQL value list normalizing each search column of a row alias"""
+    return ', '.join(f'dugsi_normalize({prefix}.{column})' for column in SEARCH_COLUMNS)
+
+
+def create_update_trigger(connection):
+    """Reindex a student only when a searchable column actually changed, so roster re-imports skip the FTS work"""
+    columns = ', '.join(SEARCH_COLUMNS)
+    changed = ' OR '.join(f'old.{column} IS NOT new.{column}' for column in SEARCH_COLUMNS)
+    connection.exec_driver_sql(f"""
+        CREATE TRIGGER students_fts_update AFTER UPDATE OF {columns} ON students WHEN {changed} BEGIN
+            DELETE FROM students_fts WHERE rowid = old.id;
+            INSERT INTO students_fts (rowid, {columns}) VALUES (new.id, {normalized_values('new')});
+        END
+    """)
+
+
+def create_search_index(connection):
+    """Create the FTS5 table and its sync triggers, backfilling existing students"""
+    exists = connection.execute(text(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'students_fts'"
+    )).first()
+    if exists:
+        trigger = connection.execute(text(
+            "SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = 'students_fts_update'"
+        )).scalar()
+        if trigger is not None and ' WHEN ' not in trigger:
+            # Indexes created before the trigger skipped unchanged rows
+            connection.exec_driver_sql('DROP TRIGGER students_fts_update')
+            create_update_trigger(connection)
+        return
+
+    columns = ', '.join(SEARCH_COLUMNS)
+    connection.exec_driver_sql(
+        f"CREATE VIRTUAL TABLE students_fts USING fts5({columns}, "
+        "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+    )
+    connection.exec_driver_sql(f"""
+        CREATE TRIGGER students_fts_insert AFTER INSERT ON students BEGIN
+            INSERT INTO students_fts (rowid, {columns}) VALUES (new.id, {normalized_values('new')});
+        END
+    """)
+    connection.exec_driver_sql("""
+        CREATE TRIGGER students_fts_delete AFTER DELETE ON students BEGIN
+            DELETE FROM students_fts WHERE rowid = old.id;
+        END
+    """)
+    create_update_trigger(connection)
+    connection.exec_driver_sql(
+        f"INSERT INTO students_fts (rowid, {columns}) SELECT id, {normalized_values('students')} FROM students"
+    )
+
+
+def match_expression(search):
+    """Turn free text into an FTS5 query where every term is a prefix match"""
+    terms = SEARCH_TERM.findall(normalize_text(search))
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def search_students(query, search):
+    """Restrict a Student query to search matches, best matches first"""
+    expression = match_expression(search)
+    if db.engine.dialect.name != 'sqlite' or not expression:
+        # No FTS index on this backend (or nothing to match): fall back to substring scans
+        return query.filter(
+            (Student.english_name.icontains(search)) |
+            (Student.arabic_name.icontains(search)) |
+            (Student.student_id.icontains(search)) |
+            (Student.guardian_name.icontains(search))
+        ).order_by(Student.id)
+
+    matches = db.select(
+        db.column('rowid').label('id'),
+        db.column('rank').label('rank')
+    ).select_from(db.table('students_fts')).where(
+        db.text('students_fts MATCH :expression').bindparams(expression=expression)
+    ).subquery()
+    return query.join(matches, Student.id == matches.c.id).order_by(matches.c.rank, Student.id)
@@ -0,0 +1,72 @@
+"""
+Column-projected JSON serialization for list endpoints.
+
+Instead of hydrating ORM instances and calling to_dict() on each, list
+routes select only the requested columns as row tuples and encode them
+straight to JSON bytes. orjson is used when installed (it encodes dates and
+datetimes natively, in the same ISO format to_dict() produces); otherwise
+the standard library encoder is used.
+"""
+
+import json
+from datetime import date, datetime
+from functools import cache
+
+from flask import Response, request
+
+# Columns never exposed by to_dict()
+PRIVATE_COLUMNS = {'password'}
+
+
+def encode_default(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+@cache
+def orjson_dumps():
+    """orjson.dumps when installed; imported with the first response rather than at startup"""
+    try:
+        import orjson
+    except ImportError:  # pragma: no cover - optional speedup
+        return None
+    return orjson.dumps
+
+
+def dumps(payload):
+    """Encode a payload to JSON bytes"""
+    if orjson_dumps() is not None:
+        return orjson_dumps()(payload)
+    return json.dumps(payload, default=encode_default, separators=(',', ':')).encode('utf-8')
+
+
+def json_response(payload, status=200):
+    return Response(dumps(payload), status=status, mimetype='application/json')
+
+
+def default_fields(model):
+    """The fields to_dict() exposes, in column order"""
+    return [column.key for column in model.__table__.columns if column.key not in PRIVATE_COLUMNS]
+
+
+def requested_fields(model):
+    """Fields named by the ?fields= projection, defaulting to everything to_dict() returns"""
+    available = default_fields(model)
+    fields = request.args.get('fields')
+    if not fields:
+        return available
+    selected = [field.strip() for field in fields.split(',') if field.strip()]
+    unknown = [field for field in selected if field not in available]
+    if unknown:
+        raise ValueError(f"Unknown field(s): {', '.join(unknown)}")
+    return selected
+
+
+def project(query, model, fields):
+    """Turn an ORM query into one returning plain row tuples of the given fields"""
+    return query.with_entities(*[getattr(model, field) for field in fields])
+
+
+def rows_to_dicts(fields, rows):
+    return [dict(zip(fields, row)) for row in rows]
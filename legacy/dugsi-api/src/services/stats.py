@@ -0,0 +1,204 @@
+"""
+Materialized dashboard counters.
+
+The dashboard_stats table holds running totals that mapper event listeners
+adjust inside the same flush that changes Student, AttendanceRecord and
+FeeRecord rows, so reading the dashboard is a handful of primary key
+lookups. Set-based writes that bypass the ORM report their changes through
+student_deltas()/attendance_deltas() and adjust(). `flask rebuild-stats`
+recomputes everything from the base tables if the counters ever drift.
+"""
+
+from collections import Counter
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import event, inspect
+from src.models.user import db
+from src.models.stats import DashboardStat
+from src.models.student import Student, AttendanceRecord, FeeRecord
+from src.database.bulk import increment_statement
+from src.services.jobs import job
+
+STUDENTS_TOTAL = 'students_total'
+STUDENTS_ACTIVE = 'students_active'
+FEES_OUTSTANDING = 'fees_outstanding'
+
+
+def attendance_marked_key(day):
+    return f'attendance_marked:{day.isoformat()}'
+
+
+def attendance_present_key(day):
+    return f'attendance_present:{day.isoformat()}'
+
+
+def adjust(connection, deltas):
+    """Add each delta to its counter, creating counters on first use"""
+    rows = [{'name': name, 'value': value} for name, value in deltas.items() if value]
+    if rows:
+        connection.execute(increment_statement(connection.dialect, DashboardStat.__table__, ['name'], ['value']), rows)
+
+
+def read(names):
+    """Return the current value of each named counter (0 when missing)"""
+    values = dict(db.session.query(DashboardStat.name, DashboardStat.value).filter(
+        DashboardStat.name.in_(names)
+    ))
+    return {name: values.get(name, 0) for name in names}
+
+
+def student_deltas(changes):
+    """Counter deltas for (old_status, new_status) changes; None means no student"""
+    deltas = Counter()
+    for old_status, new_status in changes:
+        if old_status is not None:
+            deltas[STUDENTS_TOTAL] -= 1
+            deltas[STUDENTS_ACTIVE] -= old_status == 'Active'
+        if new_status is not None:
+            deltas[STUDENTS_TOTAL] += 1
+            deltas[STUDENTS_ACTIVE] += new_status == 'Active'
+    return deltas
+
+
+def attendance_deltas(changes):
+    """Counter deltas for (date, old_status, new_status) changes; None means no record"""
+    deltas = Counter()
+    for day, old_status, new_status in changes:
+        if old_status is not None:
+            deltas[attendance_marked_key(day)] -= 1
+            deltas[attendance_present_key(day)] -= old_status == 'Present'
+        if new_status is not None:
+            deltas[attendance_marked_key(day)] += 1
+            deltas[attendance_present_key(day)] += new_status == 'Present'
+    return deltas
+
+
+def fee_balance(amount, paid_amount, status):
+    """Outstanding amount a fee record contributes to the dashboard"""
+    if status == 'Paid':
+        return 0.0
+    return (amount or 0.0) - (paid_amount or 0.0)
+
+
+def previous(target, attribute):
+    """Value an attribute had before the current flush"""
+    history = inspect(target).attrs[attribute].history
+    return history.deleted[0] if history.deleted else getattr(target, attribute)
+
+
+def ignore_set(target, value, oldvalue, initiator):
+    pass
+
+
+def track_previous(*attributes):
+    """Load the old value whenever these attributes are set, so previous() sees it on expired instances too"""
+    for attribute in attributes:
+        if not event.contains(attribute, 'set', ignore_set):
+            event.listen(attribute, 'set', ignore_set, active_history=True)
+
+
+track_previous(
+    Student.status, AttendanceRecord.date, AttendanceRecord.status,
+    FeeRecord.amount, FeeRecord.paid_amount, FeeRecord.status
+)
+
+
+# Student listeners
+@event.listens_for(Student, 'after_insert')
+def student_inserted(mapper, connection, target):
+    adjust(connection, student_deltas([(None, target.status)]))
+
+
+@event.listens_for(Student, 'after_update')
+def student_updated(mapper, connection, target):
+    adjust(connection, student_deltas([(previous(target, 'status'), target.status)]))
+
+
+@event.listens_for(Student, 'after_delete')
+def student_deleted(mapper, connection, target):
+    adjust(connection, student_deltas([(target.status, None)]))
+
+
+# Attendance listeners
+@event.listens_for(AttendanceRecord, 'after_insert')
+def attendance_inserted(mapper, connection, target):
+    adjust(connection, attendance_deltas([(target.date, None, target.status)]))
+
+
+@event.listens_for(AttendanceRecord, 'after_update')
+def attendance_updated(mapper, connection, target):
+    adjust(connection, attendance_deltas([
+        (previous(target, 'date'), previous(target, 'status'), None),
+        (target.date, None, target.status)
+    ]))
+
+
+@event.listens_for(AttendanceRecord, 'after_delete')
+def attendance_deleted(mapper, connection, target):
+    adjust(connection, attendance_deltas([(target.date, target.status, None)]))
+
+
+# Fee listeners
+@event.listens_for(FeeRecord, 'after_insert')
+def fee_inserted(mapper, connection, target):
+    adjust(connection, {FEES_OUTSTANDING: fee_balance(target.amount, target.paid_amount, target.status)})
+
+
+@event.listens_for(FeeRecord, 'after_update')
+def fee_updated(mapper, connection, target):
+    old_balance = fee_balance(
+        previous(target, 'amount'), previous(target, 'paid_amount'), previous(target, 'status')
+    )
+    new_balance = fee_balance(target.amount, target.paid_amount, target.status)
+    adjust(connection, {FEES_OUTSTANDING: new_balance - old_balance})
+
+
+@event.listens_for(FeeRecord, 'after_delete')
+def fee_deleted(mapper, connection, target):
+    adjust(connection, {FEES_OUTSTANDING: -fee_balance(target.amount, target.paid_amount, target.status)})
+
+
+def rebuild(connection):
+    """Recompute every counter from the base tables"""
+    students = connection.execute(db.select(
+        db.func.count(Student.id),
+        db.func.count(Student.id).filter(Student.status == 'Active')
+    )).one()
+    outstanding = connection.execute(
+        db.select(db.func.sum(FeeRecord.amount - FeeRecord.paid_amount)).where(FeeRecord.status != 'Paid')
+    ).scalar()
+    
+    counters = {
+        STUDENTS_TOTAL: students[0],
+        STUDENTS_ACTIVE: students[1],
+        FEES_OUTSTANDING: outstanding or 0.0
+    }
+    per_day = connection.execute(db.select(
+        AttendanceRecord.date,
+        db.func.count(AttendanceRecord.id),
+        db.func.count(AttendanceRecord.id).filter(AttendanceRecord.status == 'Present')
+    ).group_by(AttendanceRecord.date))
+    for day, marked, present in per_day:
+        counters[attendance_marked_key(day)] = marked
+        counters[attendance_present_key(day)] = present
+    
+    connection.execute(DashboardStat.__table__.delete())
+    connection.execute(DashboardStat.__table__.insert(), [
+        {'name': name, 'value': value} for name, value in counters.items()
+    ])
+    return counters
+
+
+@job('stats.rebuild', api=True)
+def rebuild_all():
+    """Recompute the dashboard counters; returns how many there are"""
+    with db.engine.begin() as connection:
+        return len(rebuild(connection))
+
+
+@click.command('rebuild-stats')
+@with_appcontext
+def rebuild_stats_command():
+    """Recompute the dashboard_stats counters from the base tables."""
+    click.echo(f'Rebuilt {rebuild_all()} dashboard counters')
@@ -0,0 +1,99 @@
+import os
+import sys
+from datetime import date
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.config import Config
+from src.main import create_app
+from src.models.user import db
+from src.models.stats import DashboardStat, AttendanceDailySummary
+from src.models.student import Student
+from src.database.migrations import migrate
+from src.services import stats, attendance_summary, fee_ledger, rollups
+from src.services.cache import response_cache
+
+
+@pytest.fixture
+def make_app(tmp_path):
+    """Builds applications on a freshly migrated SQLite file, running jobs inside submit()"""
+    apps = []
+
+    def make_app(**settings):
+        config = type('TestConfig', (Config,), dict({
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'test.db'}",
+            'JOBS_INLINE': True,
+            'JOBS_RUN_IN_PROCESS': False,
+        }, **settings))
+        app = create_app(config)
+        with app.app_context():
+            migrate()
+        # Per-worker state that would otherwise leak from one test's database into the next:
+        # cached bodies are keyed by URL and table versions, which every fresh database repeats
+        response_cache.clear()
+        fee_ledger.overdue_checked['date'] = None
+        apps.append(app)
+        return app
+
+    yield make_app
+    for app in apps:
+        with app.app_context():
+            for engine in db.engines.values():
+                engine.dispose()
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def derived_data():
+    """Every table kept in step with the writes, in a form a rebuild should reproduce exactly"""
+    counters = {
+        name: round(value, 2)
+        for name, value in db.session.query(DashboardStat.name, DashboardStat.value)
+        if round(value, 2)
+    }
+    columns = ('marked', 'present', 'absent', 'late', 'excused')
+    summary = sorted(
+        (row.date, row.class_level, row.year_group) + tuple(getattr(row, column) for column in columns)
+        for row in AttendanceDailySummary.query
+        if any(getattr(row, column) for column in columns)
+    )
+    student_rollups = {
+        student_id: tuple(round(value or 0.0, 2) for value in values)
+        for student_id, *values in db.session.query(
+            Student.id, Student.attendance_rate, Student.quran_progress, Student.outstanding_fees
+        )
+    }
+    return {
+        'counters': counters,
+        'attendance_summary': summary,
+        'fee_ledger': fee_ledger.report(date.today()),
+        'rollups': student_rollups,
+    }
+
+
+def assert_matches_rebuild(app):
+    """The incrementally maintained data equals what rebuilding it from the base tables gives"""
+    with app.app_context():
+        maintained = derived_data()
+        stats.rebuild_all()
+        attendance_summary.rebuild_all()
+        fee_ledger.rebuild_all()
+        rollups.recompute_all()
+        db.session.expire_all()
+        assert maintained == derived_data()
+        return maintained
+
+
+@pytest.fixture
+def matches_rebuild(app):
+    return lambda: assert_matches_rebuild(app)
@@ -0,0 +1,57 @@
+"""Requests the tests drive the API with"""
+
+from datetime import date
+
+from src.models.user import db
+from src.models.student import FeeRecord
+
+TODAY = date.today().isoformat()
+
+
+def create_student(client, student_id, class_level='Beginner', **fields):
+    response = client.post('/api/students', json=dict(
+        student_id=student_id, english_name=f'Student {student_id}', class_level=class_level,
+        year_group='Year 5', **fields
+    ))
+    assert response.status_code == 201
+    return response.get_json()['data']['id']
+
+
+def create_fee(app, student_id, amount, due_date=None):
+    with app.app_context():
+        fee = FeeRecord(student_id=student_id, fee_type='Tuition', amount=amount, due_date=due_date or date.today())
+        db.session.add(fee)
+        db.session.commit()
+        return fee.id
+
+
+def mark(client, statuses, day=TODAY):
+    response = client.post('/api/attendance', json={
+        'date': day,
+        'records': [{'student_id': student_id, 'status': status} for student_id, status in statuses.items()]
+    })
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()
+
+
+def move(client, student_id, class_level):
+    response = client.put(f'/api/students/{student_id}', json={'class_level': class_level})
+    assert response.status_code == 200
+
+
+def pay(client, fee_id, amount, reference):
+    response = client.post('/api/fees/payments/batch', json={
+        'payments': [{'fee_record_id': fee_id, 'amount': amount, 'reference': reference}]
+    })
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()['data']
+
+
+def import_csv(client, content):
+    response = client.post('/api/students/import', data=content.encode('utf-8'), content_type='text/csv')
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()['data']
+
+
+def summary_rows(derived, day=TODAY):
+    return {row[1]: row[3:] for row in derived['attendance_summary'] if row[0].isoformat() == day}
@@ -0,0 +1,43 @@
+from sqlalchemy import event
+
+from src.models.user import db
+from src.models.student import AttendanceRecord
+from helpers import TODAY, create_student, mark
+
+
+def test_marking_upserts_one_record_per_student_and_date(app, client):
+    first, second = create_student(client, 'S1'), create_student(client, 'S2')
+
+    assert mark(client, {first: 'Absent'})['created'] == 1
+    response = client.post('/api/attendance', json={'date': TODAY, 'records': [
+        {'student_id': first, 'status': 'Late'},
+        {'student_id': second, 'status': 'Absent'},
+        # A later entry for the same student wins
+        {'student_id': second, 'status': 'Present', 'notes': 'arrived'},
+    ]})
+
+    assert (response.get_json()['created'], response.get_json()['updated']) == (1, 1)
+    with app.app_context():
+        records = {record.student_id: record for record in AttendanceRecord.query}
+    assert {student_id: record.status for student_id, record in records.items()} == {first: 'Late', second: 'Present'}
+    assert records[second].notes == 'arrived'
+
+
+def test_marking_a_register_takes_a_handful_of_statements(app, client):
+    students = [create_student(client, f'S{number}') for number in range(50)]
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', count)
+    try:
+        mark(client, {student_id: 'Present' for student_id in students})
+    finally:
+        with app.app_context():
+            event.remove(db.engine, 'before_cursor_execute', count)
+
+    assert len(statements) < 15
+    with app.app_context():
+        assert AttendanceRecord.query.count() == 50
@@ -0,0 +1,61 @@
+from datetime import date, timedelta
+
+from src.services import stats
+from helpers import TODAY, create_student, mark, move, import_csv, summary_rows
+
+
+def test_remarking_attendance_replaces_the_earlier_status(client, matches_rebuild):
+    first, second = create_student(client, 'S1'), create_student(client, 'S2')
+    mark(client, {first: 'Present', second: 'Absent'})
+    mark(client, {first: 'Absent', second: 'Present'})
+    report = mark(client, {first: 'Present'})
+
+    assert report == {'success': True, 'message': 'Attendance marked successfully', 'created': 0, 'updated': 1}
+    derived = matches_rebuild()
+    assert derived['counters'][stats.attendance_marked_key(date.today())] == 2
+    assert derived['counters'][stats.attendance_present_key(date.today())] == 2
+    assert summary_rows(derived) == {'Beginner': (2, 2, 0, 0, 0)}
+    assert derived['rollups'][first][0] == 100.0
+
+
+def test_remarks_after_a_class_move_count_towards_the_original_class(client, matches_rebuild):
+    student = create_student(client, 'S1')
+    mark(client, {student: 'Absent'})
+    move(client, student, 'Advanced')
+
+    mark(client, {student: 'Present'})
+    yesterday = (date.today() - timedelta(days=1)).isoformat()
+    mark(client, {student: 'Late'}, day=yesterday)
+
+    derived = matches_rebuild()
+    assert summary_rows(derived) == {'Beginner': (1, 1, 0, 0, 0)}
+    assert summary_rows(derived, yesterday) == {'Advanced': (1, 0, 0, 1, 0)}
+
+
+def test_imported_class_moves_leave_earlier_attendance_in_place(client, matches_rebuild):
+    import_csv(client, 'student_id,english_name,class_level\nS1,One,Beginner\nS2,Two,Beginner\n')
+    mark(client, {1: 'Present', 2: 'Absent'})
+    import_csv(client, 'student_id,class_level\nS1,Advanced\n')
+    mark(client, {1: 'Absent', 2: 'Present'})
+
+    derived = matches_rebuild()
+    assert summary_rows(derived) == {'Beginner': (2, 1, 1, 0, 0)}
+
+
+def test_trends_bucket_the_summary_by_period_and_class(client):
+    first, second = create_student(client, 'S1'), create_student(client, 'S2', class_level='Advanced')
+    monday = date.today() - timedelta(days=date.today().weekday() + 7)
+    mark(client, {first: 'Present', second: 'Absent'}, day=monday.isoformat())
+    mark(client, {first: 'Present', second: 'Present'}, day=(monday + timedelta(days=1)).isoformat())
+    mark(client, {first: 'Absent'}, day=TODAY)
+
+    body = client.get('/api/analytics/attendance', query_string={
+        'from': monday.isoformat(), 'to': (monday + timedelta(days=6)).isoformat(),
+        'granularity': 'week', 'group_by': 'class_level'
+    }).get_json()
+
+    assert [(row['period'], row['class_level'], row['marked'], row['present'], row['attendance_rate']) for row in body['data']] == [
+        (monday.isoformat(), 'Advanced', 2, 1, 50.0),
+        (monday.isoformat(), 'Beginner', 2, 2, 100.0),
+    ]
+    assert client.get('/api/analytics/attendance?granularity=year').status_code == 400
@@ -0,0 +1,58 @@
+from src.services import attendance_summary
+from helpers import create_student, mark
+
+
+def test_unchanged_resource_answers_304(client):
+    student = create_student(client, 'S1')
+
+    first = client.get(f'/api/students/{student}')
+    again = client.get(f'/api/students/{student}', headers={'If-None-Match': first.headers['ETag']})
+
+    assert first.status_code == 200
+    assert first.headers['Last-Modified']
+    assert again.status_code == 304
+    assert again.get_data() == b''
+
+
+def test_write_changes_the_etag_and_the_cached_body(client):
+    student = create_student(client, 'S1')
+    first = client.get('/api/students?fields=english_name')
+
+    client.put(f'/api/students/{student}', json={'english_name': 'Renamed'})
+    after = client.get('/api/students?fields=english_name', headers={'If-None-Match': first.headers['ETag']})
+
+    assert after.status_code == 200
+    assert after.headers['ETag'] != first.headers['ETag']
+    assert after.get_json()['data'] == [{'english_name': 'Renamed'}]
+
+
+def test_set_based_writes_invalidate_too(client):
+    student = create_student(client, 'S1')
+    mark(client, {student: 'Absent'})
+    first = client.get('/api/attendance')
+
+    mark(client, {student: 'Present'})
+    after = client.get('/api/attendance', headers={'If-None-Match': first.headers['ETag']})
+
+    assert after.status_code == 200
+    assert [record['status'] for record in after.get_json()['data']] == ['Present']
+
+
+def test_writes_to_other_tables_keep_the_etag(client):
+    student = create_student(client, 'S1')
+    first = client.get(f'/api/students/{student}')
+
+    client.post('/api/progress', json={'student_id': student, 'subject': 'Fiqh'})
+
+    assert client.get(f'/api/students/{student}', headers={'If-None-Match': first.headers['ETag']}).status_code == 304
+
+
+def test_summary_rebuild_invalidates_attendance_trends(app, client):
+    student = create_student(client, 'S1')
+    mark(client, {student: 'Present'})
+    first = client.get('/api/analytics/attendance')
+
+    with app.app_context():
+        attendance_summary.rebuild_all()
+
+    assert client.get('/api/analytics/attendance', headers={'If-None-Match': first.headers['ETag']}).status_code == 200
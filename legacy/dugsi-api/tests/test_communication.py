@@ -0,0 +1,110 @@
+from src.models.user import db, User
+from src.models.communication import Message, Notification
+from helpers import create_student
+
+
+def create_users(app, *roles, **fields):
+    """One user per role; returns their ids"""
+    with app.app_context():
+        users = [
+            User(username=f'{role}{number}', email=f'{role}{number}@example.com', password='x', role=role, **fields)
+            for number, role in enumerate(roles, start=User.query.count())
+        ]
+        db.session.add_all(users)
+        db.session.commit()
+        return [user.id for user in users]
+
+
+def notify(app, user_id, count):
+    """Give the user `count` unread notifications; returns their ids, oldest first"""
+    with app.app_context():
+        notifications = [Notification(user_id=user_id, title=f'Notice {number}', message='x') for number in range(count)]
+        db.session.add_all(notifications)
+        db.session.commit()
+        return [notification.id for notification in notifications]
+
+
+def announce(client, author_id, **fields):
+    response = client.post('/api/announcements', json=dict(
+        title='Eid holiday', content='School is closed', author_id=author_id, publish=True, **fields
+    ))
+    assert response.status_code == 202, response.get_json()
+    return response
+
+
+def notified(app, announcement_id):
+    with app.app_context():
+        return sorted(user_id for user_id, in db.session.query(Notification.user_id).filter(
+            Notification.notification_type == 'announcement', Notification.related_id == announcement_id
+        ))
+
+
+def test_fan_out_notifies_the_audience_once(app, client):
+    admin, first_parent, second_parent, teacher = create_users(app, 'admin', 'parent', 'parent', 'teacher')
+    create_users(app, 'parent', is_active=False)
+
+    response = announce(client, admin, target_audience='parents')
+    announcement = response.get_json()['data']['id']
+
+    job = client.get(response.headers['Location']).get_json()['data']
+    assert (job['status'], job['result']) == ('succeeded', 2)
+    assert notified(app, announcement) == [first_parent, second_parent]
+
+    # Publishing again only adds notifications that are missing
+    new_parent, = create_users(app, 'parent')
+    republished = client.post(f'/api/announcements/{announcement}/publish')
+    assert client.get(republished.headers['Location']).get_json()['data']['result'] == 1
+    assert notified(app, announcement) == [first_parent, second_parent, new_parent]
+    assert teacher not in notified(app, announcement)
+
+
+def test_class_announcements_reach_that_class_guardians(app, client):
+    admin, beginner_parent, advanced_parent = create_users(app, 'admin', 'parent', 'parent')
+    create_student(client, 'S1', guardian_email='parent1@example.com')
+    create_student(client, 'S2', class_level='Advanced', guardian_email='parent2@example.com')
+
+    response = announce(client, admin, target_audience='specific_class', target_class_level='Beginner')
+
+    assert notified(app, response.get_json()['data']['id']) == [beginner_parent]
+    assert client.post('/api/announcements', json={
+        'title': 'x', 'content': 'x', 'author_id': admin, 'target_audience': 'specific_class'
+    }).status_code == 400
+
+
+def test_read_all_stops_at_up_to_id(app, client):
+    admin, parent = create_users(app, 'admin', 'parent')
+    seen = notify(app, parent, 3)
+    arrived_later = notify(app, parent, 1)
+    with app.app_context():
+        db.session.add_all([Message(sender_id=admin, recipient_id=parent, content='x'),
+                            Message(sender_id=admin, recipient_id=parent, content='x', status='draft')])
+        db.session.commit()
+
+    assert client.get(f'/api/users/{parent}/unread-count').get_json()['data'] == {
+        'notifications': 4, 'messages': 1, 'total': 5
+    }
+
+    response = client.post(f'/api/users/{parent}/notifications/read-all', json={'up_to_id': seen[-1]})
+    assert response.get_json()['data'] == {'marked_read': 3}
+    unread = client.get(f'/api/users/{parent}/notifications?unread=true').get_json()['data']
+    assert [notification['id'] for notification in unread] == arrived_later
+
+    response = client.post(f'/api/users/{parent}/notifications/read-all')
+    assert response.get_json()['data'] == {'marked_read': 1}
+    assert client.get(f'/api/users/{parent}/unread-count').get_json()['data']['notifications'] == 0
+
+
+def test_inbox_pages_newest_first(app, client):
+    parent, = create_users(app, 'parent')
+    ids = notify(app, parent, 5)
+
+    seen, before_id = [], None
+    while True:
+        url = f'/api/users/{parent}/notifications?limit=2' + (f'&before_id={before_id}' if before_id else '')
+        body = client.get(url).get_json()
+        seen += [notification['id'] for notification in body['data']]
+        before_id = body['next_before_id']
+        if before_id is None:
+            break
+
+    assert seen == ids[::-1]
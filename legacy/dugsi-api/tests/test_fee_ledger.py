@@ -0,0 +1,51 @@
+from datetime import date, timedelta
+
+from src.models.user import db
+from src.models.student import FeeRecord
+from src.services import stats
+from helpers import create_student, create_fee, move, pay
+
+
+def test_fees_stay_with_the_class_they_were_billed_to(app, client, matches_rebuild):
+    student = create_student(client, 'S1')
+    fee = create_fee(app, student, 100)
+    move(client, student, 'Advanced')
+
+    # Paying after the move still counts towards Beginner
+    pay(client, fee, 40, 'R1')
+    create_fee(app, student, 50)
+
+    derived = matches_rebuild()
+    by_class = {row['class_level']: row for row in derived['fee_ledger']['by_class_level']}
+    assert (by_class['Beginner']['billed'], by_class['Beginner']['paid']) == (100.0, 40.0)
+    assert (by_class['Advanced']['billed'], by_class['Advanced']['paid']) == (50.0, 0.0)
+
+
+def test_fully_paid_fees_stay_in_the_ledger_totals(app, client, matches_rebuild):
+    student = create_student(client, 'S1')
+    fee = create_fee(app, student, 60)
+    pay(client, fee, 60, 'R1')
+
+    derived = matches_rebuild()
+    assert derived['fee_ledger']['totals']['billed'] == 60.0
+    assert derived['fee_ledger']['totals']['paid'] == 60.0
+    assert derived['fee_ledger']['totals']['outstanding'] == 0.0
+    assert stats.FEES_OUTSTANDING not in derived['counters']
+
+
+def test_fee_due_today_is_current_everywhere(app, client, matches_rebuild):
+    student = create_student(client, 'S1')
+    due_today = create_fee(app, student, 30)
+    due_yesterday = create_fee(app, student, 20, due_date=date.today() - timedelta(days=1))
+
+    body = client.get('/api/analytics/fees').get_json()
+
+    assert body['overdue_marked'] == 1
+    aging = {bucket['bucket']: bucket for bucket in body['data']['aging']}
+    assert (aging['current']['open_records'], aging['current']['outstanding']) == (1, 30.0)
+    assert (aging['0-30']['open_records'], aging['0-30']['outstanding']) == (1, 20.0)
+    assert body['data']['by_fee_type'][0]['overdue'] == 20.0
+    with app.app_context():
+        assert db.session.get(FeeRecord, due_today).status == 'Pending'
+        assert db.session.get(FeeRecord, due_yesterday).status == 'Overdue'
+    matches_rebuild()
@@ -0,0 +1,46 @@
+import logging
+
+from src.models.user import db
+from src.models.student import Student
+from src.services.instrumentation import registry
+
+
+def instrumented_app(make_app, **settings):
+    app = make_app(INSTRUMENTATION_ENABLED=True, N_PLUS_ONE_THRESHOLD=3, **settings)
+
+    @app.route('/lookups/<int:count>/<int:distinct>')
+    def lookups(count, distinct):
+        for number in range(count):
+            db.session.execute(db.select(Student.id).where(Student.id == number % distinct))
+        return ''
+
+    return app
+
+
+def test_n_plus_one_needs_distinct_parameters(make_app, caplog):
+    client = instrumented_app(make_app).test_client()
+    flagged = registry.n_plus_one['app']
+
+    with caplog.at_level(logging.WARNING, logger='src.services.instrumentation'):
+        # The same lookup repeated is a cache miss, not an N+1
+        response = client.get('/lookups/5/1')
+        assert 'queries' in response.headers['Server-Timing']
+        assert registry.n_plus_one['app'] == flagged
+        assert 'N+1' not in caplog.text
+
+        client.get('/lookups/5/3')
+
+    assert registry.n_plus_one['app'] == flagged + 1
+    assert 'ran with 3 different parameter sets' in caplog.text
+
+
+def test_profile_on_request_is_opt_in(make_app, tmp_path):
+    profiles = tmp_path / 'profiles'
+
+    client = instrumented_app(make_app, PROFILE_DIR=str(profiles)).test_client()
+    assert 'X-Profile' not in client.get('/api/students?profile=1').headers
+
+    client = instrumented_app(make_app, PROFILE_DIR=str(profiles), PROFILE_ON_REQUEST=True).test_client()
+    name = client.get('/api/students?profile=1').headers['X-Profile']
+    assert name.endswith('.prof')
+    assert [path.name for path in profiles.iterdir()] == [name]
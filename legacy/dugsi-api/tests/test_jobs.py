@@ -0,0 +1,86 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.models.user import db
+from src.models.job import Job
+from src.services import jobs
+
+attempts_made = {}
+
+
+@jobs.job('tests.flaky')
+def flaky(key, failures, bad_input=False):
+    """Fails the first `failures` times it runs for key, then returns how many runs that took"""
+    attempts_made[key] = attempts_made.get(key, 0) + 1
+    if attempts_made[key] <= failures:
+        raise (ValueError if bad_input else RuntimeError)(f'attempt {attempts_made[key]}')
+    return attempts_made[key]
+
+
+@pytest.fixture(autouse=True)
+def forget_attempts():
+    attempts_made.clear()
+
+
+def retry(job_id):
+    """Run a queued job again now, as a worker would once its run_after passes"""
+    assert jobs.claim('test-worker', job_id) == job_id
+    before = datetime.utcnow()
+    jobs.execute(job_id)
+    return before, datetime.utcnow()
+
+
+def test_failing_job_backs_off_then_fails(app):
+    base = app.config['JOB_RETRY_SECONDS']
+    with app.app_context():
+        started = datetime.utcnow()
+        job_id = jobs.submit('tests.flaky', key='backoff', failures=10).id
+        queued = db.session.get(Job, job_id)
+        assert (queued.status, queued.attempts) == ('queued', 1)
+        assert started + timedelta(seconds=base) <= queued.run_after <= datetime.utcnow() + timedelta(seconds=base)
+
+        # The delay doubles with each failed attempt
+        before, after = retry(job_id)
+        db.session.expire_all()
+        queued = db.session.get(Job, job_id)
+        assert (queued.status, queued.attempts) == ('queued', 2)
+        assert before + timedelta(seconds=base * 2) <= queued.run_after <= after + timedelta(seconds=base * 2)
+        assert queued.error == 'RuntimeError: attempt 2'
+
+        retry(job_id)
+        db.session.expire_all()
+        failed = db.session.get(Job, job_id)
+        assert (failed.status, failed.attempts) == ('failed', app.config['JOB_MAX_ATTEMPTS'])
+        assert failed.finished_at is not None
+    assert jobs.retry_delay(30, base) == jobs.MAX_RETRY_DELAY_SECONDS
+
+
+def test_bad_input_fails_without_retrying(app):
+    with app.app_context():
+        failed = jobs.submit('tests.flaky', key='bad-input', failures=1, bad_input=True)
+        db.session.refresh(failed)
+        assert (failed.status, failed.attempts, failed.error) == ('failed', 1, 'ValueError: attempt 1')
+
+
+def test_retried_job_reports_its_result(app, client):
+    with app.app_context():
+        job_id = jobs.submit('tests.flaky', key='recovers', failures=1).id
+        retry(job_id)
+
+    data = client.get(f'/api/jobs/{job_id}').get_json()['data']
+    assert (data['status'], data['attempts'], data['result']) == ('succeeded', 2, 2)
+
+
+def test_sweep_requeues_abandoned_jobs(app):
+    with app.app_context():
+        long_ago = datetime.utcnow() - timedelta(seconds=app.config['JOB_LOCK_TIMEOUT_SECONDS'] + 60)
+        abandoned = Job(name='tests.flaky', status='running', attempts=1, max_attempts=3, locked_by='gone', locked_at=long_ago)
+        exhausted = Job(name='tests.flaky', status='running', attempts=3, max_attempts=3, locked_by='gone', locked_at=long_ago)
+        db.session.add_all([abandoned, exhausted])
+        db.session.commit()
+
+        assert jobs.sweep(app.config['JOB_LOCK_TIMEOUT_SECONDS'], app.config['JOB_RETENTION_DAYS']) == (1, 0)
+        db.session.expire_all()
+        assert (abandoned.status, abandoned.locked_by) == ('queued', None)
+        assert exhausted.status == 'failed'
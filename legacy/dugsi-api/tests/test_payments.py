@@ -0,0 +1,91 @@
+import threading
+
+from src.models.user import db
+from src.models.student import FeeRecord, FeePayment
+from src.services import stats
+from helpers import create_student, create_fee, pay
+
+
+def post(client, payments):
+    return client.post('/api/fees/payments/batch', json={'payments': payments})
+
+
+def test_reposting_a_statement_skips_references_already_posted(app, client, matches_rebuild):
+    fee = create_fee(app, create_student(client, 'S1'), 100)
+    statement = [
+        {'fee_record_id': fee, 'amount': 10, 'reference': 'BANK-1'},
+        {'fee_record_id': fee, 'amount': 15, 'reference': 'BANK-2'},
+        # Repeated inside the same batch
+        {'fee_record_id': fee, 'amount': 10, 'reference': 'BANK-1'},
+    ]
+
+    first = post(client, statement).get_json()['data']
+    again = post(client, statement).get_json()['data']
+
+    assert (first['applied'], first['amount_applied'], first['duplicates']) == (2, 25.0, ['BANK-1'])
+    assert (again['applied'], sorted(again['duplicates'])) == (0, ['BANK-1', 'BANK-1', 'BANK-2'])
+    with app.app_context():
+        assert db.session.get(FeeRecord, fee).paid_amount == 25.0
+        assert FeePayment.query.count() == 2
+    matches_rebuild()
+
+
+def test_payments_beyond_the_balance_are_rejected(app, client, matches_rebuild):
+    fee = create_fee(app, create_student(client, 'S1'), 50)
+
+    report = post(client, [
+        {'fee_record_id': fee, 'amount': 30, 'reference': 'R1'},
+        # Only 20.00 is left once R1 is applied
+        {'fee_record_id': fee, 'amount': 25, 'reference': 'R2'},
+        {'fee_record_id': fee, 'amount': 20, 'reference': 'R3'},
+        {'fee_record_id': 999, 'amount': 5, 'reference': 'R4'},
+        {'fee_record_id': fee, 'amount': -5, 'reference': 'R5'},
+    ]).get_json()['data']
+
+    assert (report['applied'], report['amount_applied'], report['statuses']) == (2, 50.0, {'Paid': 1})
+    assert [(rejection['reference'], rejection['error']) for rejection in report['rejected']] == [
+        ('R2', 'Payment of 25.00 exceeds the outstanding balance of 20.00'),
+        ('R4', 'Fee record not found'),
+        ('R5', 'amount must be positive'),
+    ]
+    assert pay(client, fee, 1, 'R6')['rejected'][0]['error'] == 'Payment of 1.00 exceeds the outstanding balance of 0.00'
+    derived = matches_rebuild()
+    assert stats.FEES_OUTSTANDING not in derived['counters']
+
+
+def test_batch_must_be_a_list(client):
+    response = client.post('/api/fees/payments/batch', json={'payments': {'fee_record_id': 1}})
+
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'payments must be a list'
+
+
+def test_concurrent_payments_all_apply(app, matches_rebuild):
+    with app.test_client() as client:
+        student = create_student(client, 'S1')
+    fee = create_fee(app, student, 70)
+    payers = 8
+    barrier = threading.Barrier(payers)
+    responses = []
+
+    def post_payment(number):
+        client = app.test_client()
+        barrier.wait()
+        responses.append(client.post('/api/fees/payments/batch', json={
+            'payments': [{'fee_record_id': fee, 'amount': 5, 'reference': f'R{number}'}]
+        }))
+
+    threads = [threading.Thread(target=post_payment, args=(number,)) for number in range(payers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert [response.status_code for response in responses] == [200] * payers
+    assert sum(response.get_json()['data']['applied'] for response in responses) == payers
+    derived = matches_rebuild()
+    with app.app_context():
+        assert db.session.get(FeeRecord, fee).paid_amount == 40.0
+    assert derived['counters'][stats.FEES_OUTSTANDING] == 30.0
+    assert derived['fee_ledger']['totals']['paid'] == 40.0
+    assert derived['rollups'][student][2] == 30.0
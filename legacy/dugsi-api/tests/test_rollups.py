@@ -0,0 +1,48 @@
+from datetime import date, timedelta
+
+from src.models.user import db
+from src.models.student import Student
+from src.database.migrations import upgrade
+from helpers import create_student, create_fee, mark, pay
+
+
+def test_rollups_follow_each_write_path(app, client, matches_rebuild):
+    student = create_student(client, 'S1')
+    fee = create_fee(app, student, 80)
+    mark(client, {student: 'Present'})
+    mark(client, {student: 'Absent'}, day=(date.today() - timedelta(days=1)).isoformat())
+    assert client.post('/api/progress', json={
+        'student_id': student, 'subject': 'Quran', 'progress_percentage': 42.5
+    }).status_code == 201
+    pay(client, fee, 30, 'R1')
+
+    derived = matches_rebuild()
+    assert derived['rollups'][student] == (50.0, 42.5, 50.0)
+
+
+def test_upgrade_backfills_stale_rollups(app, client, matches_rebuild):
+    student = create_student(client, 'S1')
+    create_fee(app, student, 25)
+    mark(client, {student: 'Present'})
+    with app.app_context():
+        # As on a database from before the rollups were maintained
+        with db.engine.begin() as connection:
+            connection.execute(Student.__table__.update().values(attendance_rate=0.0, outstanding_fees=0.0))
+        upgrade(db.engine)
+
+    derived = matches_rebuild()
+    assert derived['rollups'][student] == (100.0, 0.0, 25.0)
+
+
+def test_rollup_refresh_leaves_updated_at_alone(app, client):
+    student = create_student(client, 'S1')
+    with app.app_context():
+        updated_at = db.session.get(Student, student).updated_at
+    mark(client, {student: 'Present'})
+    fee = create_fee(app, student, 40)
+    pay(client, fee, 10, 'R1')
+
+    with app.app_context():
+        student = db.session.get(Student, student)
+        assert (student.attendance_rate, student.outstanding_fees) == (100.0, 30.0)
+        assert student.updated_at == updated_at
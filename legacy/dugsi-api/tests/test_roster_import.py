@@ -0,0 +1,88 @@
+from sqlalchemy import text
+
+from src.models.user import db
+from src.models.student import Student
+from src.services import roster_import, stats
+from helpers import import_csv
+
+
+def test_import_blank_cells_keep_current_values(app, client, matches_rebuild):
+    report = import_csv(client, 'student_id,english_name,class_level,status\nS1,One,Beginner,Active\nS2,Two,Beginner,Inactive\n')
+    assert (report['created'], report['failed']) == (2, 0)
+
+    report = import_csv(client, 'student_id,english_name,class_level,status\nS1,One Renamed,,\nS2,,Advanced,\nS3,Three,,\nS4,,Beginner,Active\n')
+    assert (report['created'], report['updated'], report['failed']) == (1, 2, 1)
+    assert report['errors'] == [{'row': 5, 'student_id': 'S4', 'errors': ['english_name is required for a new student']}]
+    with app.app_context():
+        students = {student.student_id: student for student in Student.query}
+        assert (students['S1'].english_name, students['S1'].class_level, students['S1'].status) == ('One Renamed', 'Beginner', 'Active')
+        assert (students['S2'].english_name, students['S2'].class_level, students['S2'].status) == ('Two', 'Advanced', 'Inactive')
+        assert students['S3'].status == 'Active'
+    derived = matches_rebuild()
+    assert derived['counters'][stats.STUDENTS_TOTAL] == 3
+    assert derived['counters'][stats.STUDENTS_ACTIVE] == 2
+
+
+def test_import_rejects_repeated_student_ids(app, client, matches_rebuild):
+    report = import_csv(client, 'student_id,english_name,status\nS1,First,Active\nS2,Second,Active\nS1,Again,Inactive\n')
+
+    assert (report['processed'], report['created'], report['failed']) == (3, 2, 1)
+    assert report['errors'] == [{'row': 4, 'student_id': 'S1', 'errors': ['student_id S1 already appears on row 2']}]
+    with app.app_context():
+        assert Student.query.filter_by(student_id='S1').one().english_name == 'First'
+    derived = matches_rebuild()
+    assert derived['counters'][stats.STUDENTS_ACTIVE] == 2
+
+
+def test_report_lists_each_invalid_row(client):
+    report = import_csv(client, (
+        'Student ID,English Name,Date of Birth,Shoe Size\n'
+        'S1,One,2015-02-03,4\n'
+        'S2,Two,03/02/2015,5\n'
+        ',Nobody,,\n'
+        '\n'
+        'S3,Three,,\n'
+    ))
+
+    assert (report['processed'], report['created'], report['failed']) == (4, 2, 2)
+    assert report['ignored_columns'] == ['Shoe Size']
+    assert report['errors'] == [
+        {'row': 3, 'student_id': 'S2', 'errors': ['date_of_birth must be a YYYY-MM-DD date']},
+        {'row': 4, 'student_id': None, 'errors': ['student_id is required']},
+    ]
+
+
+def test_missing_student_id_column_rejects_the_upload(client):
+    response = client.post('/api/students/import', data=b'english_name\nOne\n', content_type='text/csv')
+
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'Missing required column(s): student_id'
+
+
+def test_queued_import_reports_through_the_job(client):
+    response = client.post('/api/students/import?async=1', data=b'student_id,english_name\nS1,One\n', content_type='text/csv')
+
+    assert response.status_code == 202
+    job = client.get(response.headers['Location']).get_json()['data']
+    assert job['status'] == 'succeeded'
+    assert job['result']['created'] == 1
+
+
+def test_failed_batch_is_rolled_back_and_reported(app, client, monkeypatch, matches_rebuild):
+    monkeypatch.setattr(roster_import, 'IMPORT_BATCH_SIZE', 2)
+    with app.app_context():
+        with db.engine.begin() as connection:
+            connection.execute(text(
+                "CREATE TRIGGER reject_bad BEFORE INSERT ON students WHEN new.student_id = 'BAD' "
+                "BEGIN SELECT RAISE(ABORT, 'student rejected'); END"
+            ))
+
+    report = import_csv(client, 'student_id,english_name\nS1,One\nS2,Two\nS3,Three\nBAD,Bad\nS5,Five\n')
+
+    assert (report['processed'], report['created'], report['failed']) == (5, 3, 2)
+    assert [(error['row'], error['student_id']) for error in report['errors']] == [(4, 'S3'), (5, 'BAD')]
+    assert report['errors'][0]['errors'] == ['Not imported: the batch starting at row 4 failed (student rejected)']
+    with app.app_context():
+        assert sorted(student_id for student_id, in db.session.query(Student.student_id)) == ['S1', 'S2', 'S5']
+    derived = matches_rebuild()
+    assert derived['counters'][stats.STUDENTS_TOTAL] == 3
@@ -0,0 +1,36 @@
+import pytest
+from sqlalchemy import event, text
+from sqlalchemy.exc import OperationalError
+
+from src.models.user import db
+from src.database.routing import READ_BIND
+from helpers import create_student
+
+
+def test_reader_engine_rejects_writes(app):
+    with app.app_context():
+        with pytest.raises(OperationalError, match='readonly|read-only|query_only'):
+            with db.engines[READ_BIND].begin() as connection:
+                connection.execute(text("INSERT INTO students (student_id, english_name) VALUES ('S1', 'x')"))
+
+
+def test_reads_go_to_the_reader_and_writes_to_the_writer(app, client):
+    used = []
+
+    def record(name):
+        return lambda conn, cursor, statement, parameters, context, executemany: used.append(name)
+
+    with app.app_context():
+        listeners = [(engine, record(name)) for name, engine in ((READ_BIND, db.engines[READ_BIND]), ('writer', db.engine))]
+    for engine, listener in listeners:
+        event.listen(engine, 'before_cursor_execute', listener)
+    try:
+        student = create_student(client, 'S1')
+        assert set(used) == {'writer'}
+
+        used.clear()
+        assert client.get(f'/api/students/{student}').get_json()['data']['student_id'] == 'S1'
+        assert set(used) == {READ_BIND}
+    finally:
+        for engine, listener in listeners:
+            event.remove(engine, 'before_cursor_execute', listener)
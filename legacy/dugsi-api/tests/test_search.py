@@ -0,0 +1,38 @@
+from src.services.search import normalize_text, match_expression
+from helpers import create_student
+
+
+def search(client, term):
+    body = client.get('/api/students', query_string={'search': term, 'fields': 'student_id'}).get_json()
+    return [row['student_id'] for row in body['data']]
+
+
+def test_normalize_text_folds_arabic_spelling_variants():
+    # Diacritics, tatweel, hamza-on-alef and taa marbuta all fold away
+    assert normalize_text('أَحْمَد') == normalize_text('احمد')
+    assert normalize_text('فاطمـــة') == normalize_text('فاطمه')
+    assert normalize_text('Ahmed') == 'ahmed'
+    assert match_expression('Ah  Yus') == '"ah"* "yus"*'
+
+
+def test_search_matches_prefixes_in_any_indexed_column(client):
+    create_student(client, 'S1', arabic_name='أحمد', guardian_name='Yusuf Ali')
+    create_student(client, 'S2', arabic_name='فاطمة')
+    create_student(client, 'AB3')
+
+    assert search(client, 'احمد') == ['S1']
+    assert search(client, 'yus') == ['S1']
+    assert search(client, 'فاطمه') == ['S2']
+    assert search(client, 'ab') == ['AB3']
+    assert search(client, 'nobody') == []
+
+
+def test_search_index_follows_updates_and_deletes(client):
+    student = create_student(client, 'S1', guardian_name='Yusuf Ali')
+
+    client.put(f'/api/students/{student}', json={'guardian_name': 'Maryam Ali'})
+    assert search(client, 'yusuf') == []
+    assert search(client, 'maryam') == ['S1']
+
+    client.delete(f'/api/students/{student}')
+    assert search(client, 'maryam') == []
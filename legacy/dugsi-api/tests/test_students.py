@@ -0,0 +1,39 @@
+import json
+
+from helpers import create_student
+
+
+def test_keyset_pages_cover_every_student_once(client):
+    ids = [create_student(client, f'S{number}') for number in range(5)]
+
+    seen, after_id, pages = [], None, 0
+    while True:
+        url = '/api/students?limit=2&fields=id,student_id' + (f'&after_id={after_id}' if after_id else '')
+        body = client.get(url).get_json()
+        seen += [row['id'] for row in body['data']]
+        pages += 1
+        after_id = body['next_after_id']
+        if after_id is None:
+            break
+
+    assert seen == ids
+    assert pages == 3
+    assert set(body['data'][0]) == {'id', 'student_id'}
+
+
+def test_ndjson_streams_one_document_per_student(client):
+    ids = [create_student(client, f'S{number}') for number in range(3)]
+
+    response = client.get('/api/students?format=ndjson&fields=student_id&after_id=' + str(ids[0]))
+
+    assert response.mimetype == 'application/x-ndjson'
+    assert [json.loads(line) for line in response.get_data(as_text=True).splitlines()] == [
+        {'student_id': 'S1'}, {'student_id': 'S2'}
+    ]
+
+
+def test_unknown_fields_are_rejected(client):
+    response = client.get('/api/students?fields=id,password')
+
+    assert response.status_code == 400
+    assert 'password' in response.get_json()['error']
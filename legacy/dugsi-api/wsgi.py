@@ -0,0 +1,17 @@
+"""
+WSGI entry point for production servers.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+    waitress-serve --port=4545 --threads=8 wsgi:app
+
+FLASK_ENV selects the config profile and defaults to production here.
+The schema is not created on boot; run `flask --app wsgi upgrade-db` first.
+"""
+
+import os
+
+os.environ.setdefault('FLASK_ENV', 'production')
+
+from src.main import create_app  # noqa: E402
+
+app = application = create_app()